@@ -10,7 +10,8 @@ import json
 from mipqctool.controller.dicomreport import DicomReport
 from mipqctool.controller.tablereport import TableReport
 from mipqctool.controller.inferschema import InferSchema
-from mipqctool.model.qcfrictionless import QcTable, QcSchema, FrictionlessFromDC, CdeDict
+from mipqctool.model.qcfrictionless import QcTable, QcSchema, FrictionlessFromDC, CdeDict, QcCache
+from mipqctool import config
 from mipqctool.config import LOGGER
 
 DIR_PATH = os.path.dirname(os.path.abspath(__file__))
@@ -35,12 +36,24 @@ def main():
 @click.option('-r', '--report', type=click.Choice(['xls','pdf']), default='xls',
               help='Select the report file format.')
 @click.option('-o', '--outlier', type=click.FLOAT, default=3,
-              help='outlier threshold in standard deviations.')
+              help=('outlier threshold in standard deviations, or in the units of the '
+                    'outlierMethod of a field, the outlierThreshold of a field overrides it.'))
+@click.option('--cache', is_flag=True,
+              help='Flag for caching the parsed values of <csv file>. \
+                    Next runs on the same unchanged file skip the parsing.')
+@click.option('--cache_dir', type=click.Path(file_okay=False),
+              help='Cache folder, default ~/.mipqctool/cache')
+@click.option('--chunk-rows', 'chunk_rows', type=click.IntRange(min=1),
+              help='Read <csv file> in blocks of that many rows, for files \
+                    that do not fit in memory.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of processes that parse and validate the columns in parallel.')
 def csv(input_csv, schema_json, clean,
-        metadata, report, outlier):
+        metadata, report, outlier, cache, cache_dir=None, chunk_rows=None, jobs=1):
     """This command produces a validation report for <csv file>.
 
     The report file is stored in the same folder where <csv file> is located.
+    <csv file> can be compressed with gzip, bz2, xz or zstd.
     
     <schema json> file MUST be compliant with frirctionless
       data table-schema specs(https://specs.frictionlessdata.io/table-schema/) or
@@ -50,7 +63,7 @@ def csv(input_csv, schema_json, clean,
     # Get the path of the csv file
     path = os.path.dirname(os.path.abspath(input_csv))
 
-    dataset_name = os.path.splitext(filename)[0]
+    dataset_name = _dataset_name(filename)
     pdfreportfile = os.path.join(path, dataset_name + '_report.pdf')
     xlsxreportfile = os.path.join(path, dataset_name + '_report.xlsx')
     correctedcsvfile = os.path.join(path, dataset_name + '_corrected.csv')
@@ -65,9 +78,11 @@ def csv(input_csv, schema_json, clean,
         dict_schema = FrictionlessFromDC(dict_schema).qcdescriptor
     
     schema = QcSchema(dict_schema)
-    dataset = QcTable(input_csv, schema=schema)
+    if cache:
+        cache = QcCache(cache_dir)
+    dataset = QcTable(input_csv, schema=schema, cache=cache, workers=jobs)
 
-    datasetreport = TableReport(dataset, threshold=outlier)
+    datasetreport = TableReport(dataset, threshold=outlier, chunk_rows=chunk_rows, jobs=jobs)
 
     # Apply data cleaning corrections?
     if clean:
@@ -129,6 +144,10 @@ def dicom(ctx, dicom_folder, report_folder, loris_folder=None):
 @click.option('--sample_rows', type=int, default=100, show_default=True,
               help='Number rows that are going to be used as sample \
                     for infering the dataset metadata (schema)')
+@click.option('--whole_file', is_flag=True,
+              help='Count the values of all the rows for infering the schema, \
+                    variables with too many unique values count the guessed \
+                    type of each value')
 @click.option('--schema_spec', type=click.Choice(['dc', 'qc']), default='dc',
               help='Select "dc" for Data Catalogue spec xlsx file \
                     or "qc" for frictionless spec json.')
@@ -136,30 +155,42 @@ def dicom(ctx, dicom_folder, report_folder, loris_folder=None):
               help='CDE dictionary Excel file (xlsx)')
 @click.option('-t', '--threshold', type=click.FloatRange(min=0.0, max=1.0), default=0.6,
               help='CDE similarity threshold.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of processes that parse the columns in parallel.')
+@click.option('--cache', is_flag=True,
+              help='Flag for caching the parsed values of <csv file>, \
+                    used with --whole_file. Next runs on the same unchanged \
+                    file, also of the csv command, skip the parsing.')
+@click.option('--cache_dir', type=click.Path(file_okay=False),
+              help='Cache folder, default ~/.mipqctool/cache')
 @click.argument('input_csv', type=click.Path(exists=True), metavar='<csv file>')
-def infercsv(input_csv, schema_spec, sample_rows, max_levels, threshold, cde_file=None):
+def infercsv(input_csv, schema_spec, sample_rows, max_levels, threshold, cde_file=None,
+             whole_file=False, jobs=1, cache=False, cache_dir=None):
     """This command infers the schema of the <csv file> it and stored in <output file>.
 
     The <output file> either a json file following the frictionless data specs(https://specs.frictionlessdata.io/table-schema/)
     or an xlsx file following MIP Data Catalogue's format.
-    
+    <csv file> can be compressed with gzip, bz2, xz or zstd.
     """
     filename = os.path.basename(input_csv)
     # Get the path of the csv file
     path = os.path.dirname(os.path.abspath(input_csv))
 
-    dataset_name = os.path.splitext(filename)[0]
+    dataset_name = _dataset_name(filename)
     qcjsonfile = os.path.join(path, dataset_name + '_qcschema.json')
     dcxlsxfile = os.path.join(path, dataset_name + '_dcschema.xlsx')
 
-    dataset = QcTable(input_csv, schema=None)
+    if cache:
+        cache = QcCache(cache_dir)
+    dataset = QcTable(input_csv, schema=None, cache=cache, workers=jobs)
     # Is cde dictionary file available?
     if cde_file:
         cde_dict = CdeDict(cde_file)
     else:
         cde_dict = None
 
-    infer = InferSchema(dataset, dataset_name, sample_rows, max_levels, cde_dict)
+    infer = InferSchema(dataset, dataset_name, sample_rows, max_levels, cde_dict,
+                        whole_file=whole_file)
     
     # suggest cdes and concept paths if cde dictionary is available
     if cde_dict:
@@ -171,5 +202,13 @@ def infercsv(input_csv, schema_spec, sample_rows, max_levels, threshold, cde_fil
         infer.expoct2qcjson(qcjsonfile)
 
 
+def _dataset_name(filename):
+    """Returns the filename without the csv and the compression extensions."""
+    name, extension = os.path.splitext(filename)
+    if extension.lower() in config.COMPRESSED_EXTENSIONS:
+        name = os.path.splitext(name)[0]
+    return name
+
+
 if __name__ == '__main__':
     main()
@@ -54,8 +54,85 @@ MIPMAP_DB_USER = 'mipmap'
 MIPMAP_DB_PASSWORD = 'mipmap'
 
 ERROR = 'qctool.error'
+# validation result codes of a value
+VALID = 0
+DATATYPE = 1
+CONSTRAINT = 2
 REMOTE_SCHEMES = ['http', 'https', 'ftp', 'ftps']
 
+# Native csv reader
+CSV_ENCODING = 'utf-8-sig'
+CSV_DELIMITERS = ',\t;|'
+CSV_SAMPLE_LINES = 100
+CSV_READ_BUFFER = 8 * 1024 * 1024
+# files smaller than that are always parsed serially
+PARSE_PARALLEL_MIN_SIZE = 64 * 1024 * 1024
+# byte ranges per process of the pool
+PARSE_SPLITS_PER_WORKER = 4
+# rows transposed at once while encoding the columns
+ENCODE_BLOCK_ROWS = 65536
+# a column with more distinct values than that ratio of its rows, once it
+# has ENCODE_PLAIN_MIN_ROWS rows, is kept as a plain array of its values
+# instead of dictionary encoded, ie id, date and high cardinality numbers
+ENCODE_MAX_DISTINCT_RATIO = 0.5
+ENCODE_PLAIN_MIN_ROWS = 10000
+
+# Compressed csv files
+COMPRESSED_EXTENSIONS = ['.gz', '.bz2', '.xz', '.zst']
+COMPRESSED_READ_BLOCK = 1024 * 1024
+# max decompressed blocks read ahead
+COMPRESSED_READ_AHEAD = 8
+
+# Parsed datasets cache
+CACHE_DIR = '~/.mipqctool/cache'
+CACHE_MAX_SIZE = 5 * 1024 ** 3
+CACHE_FINGERPRINT_BLOCK = 1024 * 1024
+
+# Whole file schema inference
+# max distinct values counted per column, above that the guessed qctypes are counted
+INFER_MAX_DISTINCT = 10000
+
+# Chunked reports
+# max row numbers kept for the violations and the outliers of a column
+CHUNK_SAMPLE_ROWS = 1000
+CHUNK_RANDOM_SEED = 1
+# rank error bound of the numerical quantiles of the chunked reports,
+# as a fraction of the values, the quantile sketch holds O(1 / error) values
+QUANTILE_ERROR = 0.001
+# max distinct text values counted exactly, above that the distinct values
+# are estimated with HyperLogLog and the top values with Space-Saving
+TEXT_EXACT_VALUES = 10000
+# values kept by the Space-Saving summary of the most frequent text values
+TEXT_TOP_VALUES = 1000
+# distinct text values sampled with their exact rows for the least frequent values
+TEXT_SAMPLE_VALUES = 1000
+# HyperLogLog registers are 2^HLL_PRECISION, about 0.8% error for 14
+HLL_PRECISION = 14
+# max distinct integer or date values counted exactly, above that the mode
+# is kept with Space-Saving and the quartiles come from the quantile sketch
+INTEGER_EXACT_VALUES = 10000
+
+# Outliers of the numerical columns
+# the detection methods, the method and the threshold of a field can be
+# given with the outlierMethod and outlierThreshold descriptor properties
+OUTLIER_METHODS = ['zscore', 'iqr', 'mad']
+DEFAULT_OUTLIER_METHOD = 'zscore'
+
+# Distinct values memo
+# max distinct raw values memoized per column, least recently used
+# values are evicted
+MEMO_MAX_VALUES = 100000
+
+# Violations of chunked reports
+# max distinct invalid values counted in memory per column, above that
+# the counts are spilled to a temporary file
+VIOLATION_MAX_VALUES = 100000
+# max example row numbers kept per distinct invalid value
+VIOLATION_SAMPLE_ROWS = 5
+# max distinct (SubjectID, VisitID) pairs kept in memory while looking for
+# the longitudinal dublicates, above that the pairs are spilled to a temporary file
+LONGITUDINAL_MAX_KEYS = 100000
+
 
 DEFAULT_MISSING_VALUES = ['']
 DEFAULT_QCFIELD_MIPTYPE = 'text'
@@ -151,11 +228,15 @@ PRETTY_STAT_NAMES = {
         'max': 'Maximum value',
         'min': 'Minimum value',
         'bottom5': '5 least frequent values',
-        'top5': '5 most frequent values'}
+        'top5': '5 most frequent values',
+        'years': 'Number of rows per year',
+        'mad': 'Median absolute deviation',
+        'outliermethod': 'Outlier detection method'}
 
 COLUMN_STAT_HEADERS = [
     'mean',
     'std',
+    'mad',
     'max', 
     'min',
     'mode',
@@ -167,6 +248,7 @@ COLUMN_STAT_HEADERS = [
     'unique',
     'top',                      
     'outliers',
+    'outliermethod',
     'upperbound', 
     'lowerbound', 
     'outliersrows', 
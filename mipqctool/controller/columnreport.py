@@ -9,57 +9,94 @@ from __future__ import unicode_literals
 import os
 import sys
 import re
+import datetime
 from pathlib import Path
-from collections import namedtuple, OrderedDict
+from collections import namedtuple, OrderedDict, Counter
+
+import numpy as np
 
 # for testing htlm2pdf columnreport template
 if sys.platform != 'win32':
     from jinja2 import Environment, FileSystemLoader
     from weasyprint import HTML
 
-from mipqctool.model.qcfrictionless import QcField
+from mipqctool.model.qcfrictionless import QcField, CategoricalColumn, PlainColumn, TypedColumn
+from mipqctool.model.qcfrictionless.qcmemo import ValueMemo, VALID, DATATYPE, CONSTRAINT
 from mipqctool.model import qctypes
+from mipqctool.model.qctypes import outlier_indexes, outlier_mask
 from mipqctool import config
 from mipqctool.config import LOGGER, PRETTY_STAT_NAMES
-from mipqctool.exceptions import DataTypeError, ConstraintViolationError
 from mipqctool.helpers.html import list2parag, tupples2table
 
 config.debug(True)
 
 Suggestion = namedtuple('Suggestion', 'row, value, newvalue')
+# the outcome of validating a column, per distinct value, that a worker
+# process sends back instead of the whole ColumnReport
+ValidationResult = namedtuple('ValidationResult',
+                              'level_status, null_levels, suggested, suggestion_totals, '
+                              'stats, not_nulls_total, null_total, outlier_rows')
+_INT64_MIN = int(np.iinfo(np.int64).min)
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
 
 class ColumnReport(object):
     """This class is used to hold statistical and validation data of values
     of a dataset column.
     """
-    def __init__(self, raw_values, qcfield, threshold=3, **options):
+    def __init__(self, raw_values, qcfield, threshold=3, float_numbers=False, **options):
         """Arguments:
         :param raw_values: list of strings representing values of a column
+                           or a CategoricalColumn or PlainColumn with those values
         :param qcfield: QcField object
         :param threshold: outlier threshold - (mean - threshold * std, mean + threshold * std) 
-                          outside this length, a numerical value is considered outlier
+                          outside this length, a numerical value is considered outlier,
+                          the outlierThreshold of the field descriptor overrides it
+        :param float_numbers: if True the values of a number field are casted
+                              straight into a numpy float64 array instead of
+                              Decimal values, the validation stays exact
         """
 
         self.__threshold = threshold
-        # Stores all the values of the column in a list of
-        # tupples (row number, raw value)
-        self.__raw_pairs = enumerate(raw_values, start=1)
+        # Stores all the values of the column dictionary encoded, each
+        # distinct value is validated, corrected and casted only once
+        if isinstance(raw_values, (CategoricalColumn, PlainColumn)):
+            self.__column = raw_values
+        else:
+            self.__column = CategoricalColumn.encode(raw_values)
         self.__corrected = False
 
         self.__stats = {}
-        self.__total_rows = len(raw_values)
+        self.__total_rows = len(self.__column)
         self.__not_nulls = 0
         self.__null_total = 0
-        self.__null_rows = None
-        self.__not_null_rows = None
-        # list of tupples that have been validated
-        self.__validated_pairs = []
-        # list of tupples that have been corrected
-        self.__corrected_pairs = []
-        self.__datatype_violated_pairs = []
-        self.__constraint_violated_pairs = []
-        self.__dsuggestions = None
-        self.__csuggestions = None
+        # validation status of each distinct value and of each row
+        self.__level_status = None
+        self.__status = None
+        # suggested corrections of the distinct values with violations,
+        # dict {level code: suggested value}
+        self.__suggested = {}
+        # casted value of each distinct valid value, they are casted once
+        # and only the corrected values are casted when the stats change
+        self.__casted_levels = None
+        self.__null_levels = None
+        # casted value and null flag of each distinct value as profiled,
+        # with the corrected values when the corrections are applied
+        self.__profiled_levels = None
+        self.__profiled_nulls = None
+        # the distinct values in the order of their first profiled row
+        self.__level_order = None
+        # typed values of the valid (and corrected) rows
+        self.__typed = None
+        # the rows of each distinct value, a tuple (rows sorted by code,
+        # start of each code), built at the first corrected edit
+        self.__level_rows = None
+        # Counter {numpy kind: distinct values} of the filled profiled
+        # values and, for numerical columns, a list [rows, shift, sum,
+        # sum of squares] of their values minus the shift, both kept
+        # up to date by the corrected edits
+        self.__level_kinds = None
+        self.__moments = None
         # stats about datatype, constraint violations and
         # suggested corrections
         self.__success_total_d = 0
@@ -70,10 +107,27 @@ class ColumnReport(object):
         # and functions
         self.__field = qcfield
         self.__miptype = self.__field.miptype
+        # the outlier method and threshold of the field descriptor
+        self.__outlier_method = self.__field.outlier_method
+        if self.__field.outlier_threshold is not None:
+            self.__threshold = self.__field.outlier_threshold
+        # row numbers of the numerical outliers
+        self.__outlier_rows = np.array([], dtype=np.int64)
+        self.__float_numbers = float_numbers and self.__field.type == 'number'
         self.__profile = self.__get_profile_function()
-        self.__cast_value = self.__field.cast_value
+        # each distinct value is validated, casted and corrected once,
+        # also when the corrections change
+        self.__memo = ValueMemo(self.__field)
+        self.__cast_value = self.__memo.cast
         self.__missing_values = self.__field.missing_values
 
+    @property
+    def outlier_rows(self):
+        """numpy int64 array with the row numbers of the outliers of
+        a numerical column.
+        """
+        return self.__outlier_rows
+
     @property
     def qcfield(self):
         """Returns the object QcField"""
@@ -94,12 +148,12 @@ class ColumnReport(object):
     @property
     def datatype_errors(self):
         """Total datatype violations"""
-        return len(self.__datatype_violated_pairs)
+        return len(self.__status_rows(DATATYPE))
 
     @property
     def constraint_errors(self):
         """Total constraint violations"""
-        return len(self.__constraint_violated_pairs)
+        return len(self.__status_rows(CONSTRAINT))
 
     @property
     def stats(self):
@@ -115,25 +169,75 @@ class ColumnReport(object):
         else:
             return None
 
+    @property
+    def typed_values(self):
+        """TypedColumn with the casted values, the rows that are not
+        profiled (invalid and not corrected) are marked as nulls.
+        """
+        if self.__typed is None and self.__level_status is not None:
+            # the values of a restored validation are casted on demand
+            if self.__casted_levels is None:
+                self.__cast_levels()
+            self.__profiled_levels = list(self.__casted_levels)
+            self.__typed = TypedColumn.from_levels(self.__column.codes, self.__profiled_levels,
+                                                   self.__profiled_nulls)
+        return self.__typed
+
+    @property
+    def validation_result(self):
+        """ValidationResult of the validated column, without the corrections."""
+        return ValidationResult(level_status=self.__level_status,
+                                null_levels=self.__null_levels,
+                                suggested=self.__suggested,
+                                suggestion_totals=(self.__success_total_d,
+                                                   self.__failed_total_d,
+                                                   self.__success_total_c,
+                                                   self.__failed_total_c),
+                                stats=self.__stats,
+                                not_nulls_total=self.__not_nulls_total,
+                                null_total=self.__null_total,
+                                outlier_rows=self.__outlier_rows)
+
+
+    @property
+    def invalid_mask(self):
+        """numpy bool array, True for the rows with violations, the first
+        item is the first row.
+        """
+        if self.__status is None:
+            return np.zeros(self.__total_rows, dtype=bool)
+        return self.__status != VALID
+
+    @property
+    def valid_mask(self):
+        """numpy bool array, True for the rows with valid data."""
+        if self.__status is None:
+            return np.zeros(self.__total_rows, dtype=bool)
+        return self.__profiled_mask()
+
+    @property
+    def null_mask(self):
+        """numpy bool array, True for the rows with nulls."""
+        if self.__status is None:
+            return np.zeros(self.__total_rows, dtype=bool)
+        return self.__profiled_mask() & self.__profiled_nulls[self.__column.codes]
+
+    @property
+    def filled_mask(self):
+        """numpy bool array, True for the rows filled with valid values."""
+        if self.__status is None:
+            return np.zeros(self.__total_rows, dtype=bool)
+        return ~self.__profiled_nulls[self.__column.codes]
 
     @property
     def invalid_rows(self):
         """set of row numbers with violations"""
-        vrows = set([pair[0] for pair
-                     in self.__constraint_violated_pairs])
-        vrows.update([pair[0] for pair
-                      in self.__datatype_violated_pairs])
-        return vrows
+        return _row_numbers(self.invalid_mask)
 
     @property
     def valid_rows(self):
         """set of row numbers with valid data"""
-        validrows = set([pair[0] for pair
-                         in self.__validated_pairs])
-        if self.__corrected:
-            validrows.update([pair[0] for pair
-                              in self.__corrected_pairs])
-        return validrows
+        return _row_numbers(self.valid_mask)
 
     @property
     def nulls_total(self):
@@ -148,12 +252,12 @@ class ColumnReport(object):
     @property
     def null_row_numbers(self):
         """Set of row numbers with nulls"""
-        return set(self.__null_rows)
+        return _row_numbers(self.null_mask)
 
     @property
     def filled_row_numbers(self):
         """Set of row numbers filled with valid values"""
-        return set(self.__not_null_rows)
+        return _row_numbers(self.filled_mask)
 
     @property
     def corrected(self):
@@ -164,36 +268,36 @@ class ColumnReport(object):
     def dcorrections(self):
         """Returns the datatype corrections as set of (original, corrected)."""
         null = self.__missing_values[0]
-        correctiontupples = [(sug[1], sug[2])
-                             for sug in self.__dsuggestions
-                             if sug[2] != null]
+        correctiontupples = [(value, newvalue)
+                             for value, newvalue in self.__level_suggestions(DATATYPE)
+                             if newvalue != null]
         return set(correctiontupples)
 
     @property
     def dnulls(self):
         """Returns the values with datatype vialations unable to correct."""
         null = self.__missing_values[0]
-        values = [sug[1]
-                  for sug in self.__dsuggestions
-                  if sug[2] == null]
+        values = [value
+                  for value, newvalue in self.__level_suggestions(DATATYPE)
+                  if newvalue == null]
         return set(values)
 
     @property
     def ccorrections(self):
         "Returns the constraint corrections as set of (original, corrected)."
         null = self.__missing_values[0]
-        correctiontupples = [(sug[1], sug[2])
-                             for sug in self.__csuggestions
-                             if sug[2] != null]
+        correctiontupples = [(value, newvalue)
+                             for value, newvalue in self.__level_suggestions(CONSTRAINT)
+                             if newvalue != null]
         return set(correctiontupples)
 
     @property
     def cnulls(self):
         """Returns the values with constraint vialations unable to correct."""
         null = self.__missing_values[0]
-        values = [sug[1]
-                  for sug in self.__csuggestions
-                  if sug[2] == null]
+        values = [value
+                  for value, newvalue in self.__level_suggestions(CONSTRAINT)
+                  if newvalue == null]
         return set(values)
 
     @property
@@ -219,9 +323,7 @@ class ColumnReport(object):
     @property
     def corrected_values(self):
         if self.__corrected:
-            pairs = sorted(self.__validated_pairs + self.__corrected_pairs,
-                           key=lambda tup: tup[0])
-            return [pair[1] for pair in pairs]
+            return self.__column.replace(self.__suggested).tolist()
         else:
             return None
 
@@ -261,172 +363,148 @@ class ColumnReport(object):
             prettydict[pretty_key] = value
         return prettydict
 
-    def validate(self):
-        """Search for datatype and constraint violations."""
-        for raw_pair in self.__raw_pairs:
-            try:
-                self.__field.validate(raw_pair[1])
-                self.__validated_pairs.append(raw_pair)
-            except DataTypeError:
-                self.__datatype_violated_pairs.append(raw_pair)
-                continue
-            except ConstraintViolationError:
-                self.__constraint_violated_pairs.append(raw_pair)
-                continue
+    def validate(self, result=None):
+        """Search for datatype and constraint violations.
+        Arguments:
+        :param result: ValidationResult of the same column, ie from a worker
+                       process, that is used instead of validating the values
+                       again, the valid values are casted when they are needed
+        """
+        if result is not None:
+            self.__restore(result)
+            return True
+        # each distinct value is validated once and all together
+        level_status = self.__memo.statuses(self.__column.levels)
+        self.__level_status = level_status
+        self.__status = level_status[self.__column.codes]
+        self.__order_levels()
+        self.__cast_levels()
         self.__suggest_corrections()
         self.__calc_stats()
         return True
 
     def update_correction(self, value, newvalue):
         """Update given correction"""
-        self.__reset_sugg_stats()
         # check if the incoming new value is NULL 
         # and replace it with the default missing value
         if newvalue == "NULL":
             newvalue = self.__missing_values[0]
 
-        new_csuggestions = [Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=newvalue) 
-                            if sugg.value==value else
-                            Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=sugg.newvalue)
-                            for sugg in self.__csuggestions]
-
-        new_dsuggestions = [Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=newvalue) 
-                            if sugg.value==value else
-                            Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=sugg.newvalue)
-                            for sugg in self.__dsuggestions]
-
-        self.__csuggestions = new_csuggestions
-        self.__dsuggestions = new_dsuggestions
-        self.__calc_stats()
+        # the rows of a plain column are levels of their own
+        for code in self.__column.value_codes(value):
+            if code in self.__suggested:
+                self.__set_correction(code, newvalue)
 
     def delete_correction(self, value):
         """Delete given correction"""
-        self.__reset_sugg_stats()
-
-        new_csuggestions = [Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=sugg.value) 
-                            if sugg.value==value else
-                            Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=sugg.newvalue)
-                            for sugg in self.__csuggestions]
-
-        new_dsuggestions = [Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=sugg.value) 
-                            if sugg.value==value else
-                            Suggestion(sugg.row,
-                                       value=sugg.value,
-                                       newvalue=sugg.newvalue)
-                            for sugg in self.__dsuggestions]
-
-        self.__csuggestions = new_csuggestions
-        self.__dsuggestions = new_dsuggestions
-        self.__calc_stats()
+        for code in self.__column.value_codes(value):
+            if code in self.__suggested:
+                self.__set_correction(code, value)
 
     def apply_corrections(self):
         """Apply the suggested corrections for both types of violations"""
         # NOTE corrections may include null values as suggestions
-        datatypes = [(sd.row, sd.newvalue) for sd in self.__dsuggestions]
-        constraints = [(sc.row, sc.newvalue) for sc in self.__csuggestions]
-        self.__corrected_pairs = datatypes + constraints
         self.__corrected = True
         self.__calc_stats()
 
+    def example_rows(self, value):
+        """Returns a list with the first row numbers of the given value,
+        at most config.VIOLATION_SAMPLE_ROWS.
+        """
+        rows = self.__column.rows(value)[:config.VIOLATION_SAMPLE_ROWS]
+        return (rows + 1).tolist()
+
     def printpdf(self, filepath):
-        app_path = os.path.abspath(os.path.dirname(__file__))
-        path = Path(app_path)
-        parentpath = str(path.parent)
-        env_path = os.path.join(parentpath, 'data', 'html')
-        css_path = os.path.join(env_path, 'style.css')
-        env = Environment(loader=FileSystemLoader(env_path))
-        template = env.get_template('column_report.html')
-        if self.__corrected:
-            status = 'Applied'
-            null_replaced = 'have been'
-        else:
-            status = 'Suggested'
-            null_replaced = 'will be'
-        template_vars = {
-            'cname': self.qcfield.name,
-            'gen_stat_table': tupples2table(self.prettygeneral.items()),
-            'stat_table': tupples2table(self.prettystats.items()),
-            'status': status,
-            'null_replaced': null_replaced,
-            'dcorrections_table': tupples2table(self.dcorrections),
-            'ccorrections_table': tupples2table(self.ccorrections),
-            'removed_values': list2parag(self.cnulls | self.dnulls),
-        }
-        html_out = template.render(template_vars)
-        document = HTML(string=html_out).render(stylesheets=[css_path])
-        document.write_pdf(target=filepath)
+        printpdf(self, filepath)
 
     def to_html(self):
-        app_path = os.path.abspath(os.path.dirname(__file__))
-        path = Path(app_path)
-        parentpath = str(path.parent)
-        env_path = os.path.join(parentpath, 'data', 'html')
-        env = Environment(loader=FileSystemLoader(env_path))
-        template = env.get_template('column_report.html')
-        if self.__corrected:
-            status = 'Applied'
-            null_replaced = 'have been'
-        else:
-            status = 'Suggested'
-            null_replaced = 'will be'
-        template_vars = {
-            'cname': self.qcfield.name,
-            'gen_stat_table': tupples2table(self.prettygeneral.items()),
-            'stat_table': tupples2table(self.prettystats.items()),
-            'status': status,
-            'null_replaced': null_replaced,
-            'dcorrections_table': tupples2table(self.dcorrections),
-            'ccorrections_table': tupples2table(self.ccorrections),
-            'removed_values': list2parag(self.cnulls | self.dnulls),
-        }
-        return template.render(template_vars)
+        return to_html(self)
 
 
     # Private
+    @property
+    def __validated_pairs(self):
+        """List of tupples (row number, value) of the valid rows."""
+        return self.__pairs(VALID)
+
+    @property
+    def __datatype_violated_pairs(self):
+        return self.__pairs(DATATYPE)
+
+    @property
+    def __constraint_violated_pairs(self):
+        return self.__pairs(CONSTRAINT)
+
+    @property
+    def __dsuggestions(self):
+        """List of Suggestion of the rows with datatype violations."""
+        return self.__suggestions(DATATYPE)
+
+    @property
+    def __csuggestions(self):
+        return self.__suggestions(CONSTRAINT)
+
     def __get_profile_function(self):
         return getattr(qctypes, 'profile_%s' % self.miptype)
 
-    def __suggestd(self, value):
+    def __status_rows(self, *statuses):
+        """numpy array with the indexes of the rows with the given
+        statuses, in the order of the statuses and then of the rows.
+        """
+        if self.__status is None:
+            return np.array([], dtype=np.int64)
+        return np.concatenate([np.flatnonzero(self.__status == status)
+                               for status in statuses])
+
+    def __pairs(self, status):
+        rows = self.__status_rows(status)
+        return list(zip((rows + 1).tolist(), self.__column.take(rows)))
+
+    def __suggestions(self, status):
+        rows = self.__status_rows(status)
+        codes = self.__column.codes[rows].tolist()
+        levels = self.__column.levels
+        return [Suggestion(row=row, value=levels[code], newvalue=self.__suggested[code])
+                for row, code in zip((rows + 1).tolist(), codes)]
+
+    def __level_suggestions(self, status):
+        """Returns a list of tupples (value, suggested value) of the
+        distinct values with the given violation status.
+        """
+        levels = self.__column.levels
+        return [(levels[code], newvalue)
+                for code, newvalue in self.__suggested.items()
+                if self.__level_status[code] == status]
+
+    def __suggestd(self, value, rows=1):
         """Suggest a new value in case of datatype violation.
         Arguments:
         :param value: string
+        :param rows: number of rows with that value
         :returns: string
         """
         null_string = self.__missing_values[0]
-        suggested_value = self.__field.suggestd(value)
+        suggested_value = self.__memo.suggest(value, DATATYPE)
         if suggested_value != null_string:
-            self.__success_total_d += 1
+            self.__success_total_d += rows
         else:
-            self.__failed_total_d += 1
+            self.__failed_total_d += rows
 
         return suggested_value
 
-    def __suggestc(self, value):
+    def __suggestc(self, value, rows=1):
         """Suggest a new value in case of constraint violation.
         Arguments:
         :param value: string
+        :param rows: number of rows with that value
         :returns: string
         """
         null_string = self.__missing_values[0]
-        suggested_value = self.__field.suggestc(value)
+        suggested_value = self.__memo.suggest(value, CONSTRAINT)
         if suggested_value != null_string:
-            self.__success_total_c += 1
+            self.__success_total_c += rows
         else:
-            self.__failed_total_c += 1
+            self.__failed_total_c += rows
 
         return suggested_value
 
@@ -436,45 +514,369 @@ class ColumnReport(object):
         self.__failed_total_d = 0
         self.__failed_total_c = 0
 
+    def __restore(self, result):
+        """Takes the validation of the column from a ValidationResult."""
+        self.__level_status = result.level_status
+        self.__status = result.level_status[self.__column.codes]
+        self.__null_levels = result.null_levels
+        self.__profiled_nulls = result.null_levels.copy()
+        self.__suggested = dict(result.suggested)
+        (self.__success_total_d, self.__failed_total_d,
+         self.__success_total_c, self.__failed_total_c) = result.suggestion_totals
+        self.__stats = result.stats
+        self.__not_nulls_total = result.not_nulls_total
+        self.__null_total = result.null_total
+        self.__outlier_rows = result.outlier_rows
+
     def __calc_stats(self):
         """Calcs statistics about the valid values."""
-        profiler = self.__get_profile_function()
-        raw_pairs = self.__validated_pairs + self.__corrected_pairs
-        casted_pairs = []
-        rows_with_nulls = []
-        rows_with_no_nulls = []
-        total_rows_with_nulls = 0
-        for pair in raw_pairs:
-            casted_value = self.__field.cast_value(pair[1])
-            if casted_value:
-                casted_pairs.append((pair[0], casted_value))
-                rows_with_no_nulls.append(pair[0])
-            else:
-                rows_with_nulls.append(pair[0])
-                total_rows_with_nulls += 1
-        if len(casted_pairs) == 0:
+        if self.__casted_levels is None:
+            self.__cast_levels()
+        # the profiled rows are the valid ones followed by the corrected
+        # ones, first the datatype and then the constraint corrections
+        casted_levels = list(self.__casted_levels)
+        null_levels = self.__null_levels.copy()
+        if self.__corrected:
+            # the valid values are already casted, only the corrected
+            # values are casted
+            for code, newvalue in self.__suggested.items():
+                casted_levels[code], null_levels[code] = self.__cast_correction(newvalue)
+        self.__profiled_levels = casted_levels
+        self.__profiled_nulls = null_levels
+        self.__typed = TypedColumn.from_levels(self.__column.codes, casted_levels, null_levels)
+        self.__level_kinds = None
+        self.__moments = None
+        self.__profile_levels()
+
+    def __profile_levels(self):
+        """Calcs the stats from the profiled distinct values, the row
+        totals are sums of the rows of each distinct value.
+        """
+        counts = self.__column.counts
+        filled = ~self.__profiled_nulls
+        if self.__corrected:
+            statuses = [VALID, DATATYPE, CONSTRAINT]
+        else:
+            statuses = [VALID]
+        profiled = np.isin(self.__level_status, statuses)
+        self.__not_nulls_total = int(counts[filled].sum())
+        self.__null_total = int(counts[profiled & ~filled].sum())
+        self.__outlier_rows = np.array([], dtype=np.int64)
+        if self.__not_nulls_total == 0:
             # all values are null
             stats = {}
+        elif self.__miptype in ['nominal', 'text']:
+            if self.__level_order is None:
+                self.__order_levels()
+            casted_levels = self.__profiled_levels
+            counts_by_value = Counter()
+            for code in self.__level_order.tolist():
+                if filled[code]:
+                    counts_by_value[casted_levels[code]] += int(counts[code])
+            stats = self.__profile(None, counts=counts_by_value, threshold=self.__threshold)
         else:
-            stats = profiler(casted_pairs, threshold=self.__threshold)
-        self.__not_nulls_total = len(casted_pairs)
-        self.__null_total = total_rows_with_nulls
-        self.__null_rows = rows_with_nulls
-        self.__not_null_rows = rows_with_no_nulls
+            rows = self.__status_rows(*statuses)
+            rows_with_no_nulls = rows[filled[self.__column.codes[rows]]]
+            values = self.__typed.values[rows_with_no_nulls]
+            casted_pairs = list(zip((rows_with_no_nulls + 1).tolist(), values.tolist()))
+            if self.__miptype == 'numerical':
+                # converted once for the stats and the outliers
+                values = values.astype(np.float64)
+            if values.dtype.kind in ('i', 'f', 'M'):
+                # int64, float64 or datetime64 values are not converted again
+                stats = self.__profile(casted_pairs, threshold=self.__threshold,
+                                       values=values, method=self.__outlier_method)
+            else:
+                stats = self.__profile(casted_pairs, threshold=self.__threshold,
+                                       method=self.__outlier_method)
+            if self.__miptype == 'numerical':
+                outliers = outlier_indexes(values, stats['lowerbound'], stats['upperbound'],
+                                           self.__outlier_method)
+                self.__outlier_rows = rows_with_no_nulls[outliers] + 1
         self.__stats = stats
 
+    def __profiled_mask(self):
+        """numpy bool array, True for the profiled rows, the valid rows
+        and, when the corrections are applied, the corrected ones.
+        """
+        if self.__corrected:
+            return np.ones(self.__total_rows, dtype=bool)
+        return self.__status == VALID
+
+    def __set_correction(self, code, newvalue):
+        """Replaces the correction of a distinct value. The correction
+        counts, and with the corrections applied the row totals, the
+        numerical moments and the typed values of the value's rows, are
+        updated by removing the old corrected value and adding the new
+        one. The other stats are calculated again from the rows of each
+        distinct value, so an edit costs time in the distinct values and
+        not in the rows of the column.
+        """
+        if self.__corrected:
+            casted_value, null = self.__cast_correction(newvalue)
+        rows = int(self.__column.counts[code])
+        self.__count_correction(code, -rows)
+        self.__suggested[code] = newvalue
+        self.__count_correction(code, rows)
+        # the stats include the corrected values only when they are applied
+        if not self.__corrected:
+            return
+        if self.__level_kinds is None:
+            self.__count_levels()
+        was_null = bool(self.__profiled_nulls[code])
+        if not was_null:
+            self.__add_level(self.__profiled_levels[code], -rows)
+        self.__profiled_levels[code] = casted_value
+        self.__profiled_nulls[code] = null
+        if not null:
+            self.__add_level(casted_value, rows)
+        self.__patch_typed(code, casted_value, null)
+        self.__not_nulls_total += rows * (int(was_null) - int(null))
+        self.__null_total = self.__total_rows - self.__not_nulls_total
+        self.__profile_counts()
+
+    def __count_levels(self):
+        """Counts the numpy kinds of the filled profiled values and the
+        moments of the numerical ones.
+        """
+        filled = np.flatnonzero(~self.__profiled_nulls)
+        values = [self.__profiled_levels[code] for code in filled.tolist()]
+        self.__level_kinds = Counter(_value_kind(value) for value in values)
+        if self.__miptype == 'numerical':
+            numbers = np.asarray([float(value) for value in values], dtype=np.float64)
+            weights = self.__column.counts[filled]
+            # the values are shifted by the first one, for the precision
+            # of the sum of squares
+            shift = float(numbers[0]) if len(numbers) else 0.0
+            differences = numbers - shift
+            self.__moments = [int(weights.sum()), shift,
+                              float(np.dot(weights, differences)),
+                              float(np.dot(weights, differences * differences))]
+
+    def __add_level(self, value, rows):
+        """Adds the given rows of a filled profiled value, or removes
+        them when rows is negative, from the kinds and the moments.
+        """
+        self.__level_kinds[_value_kind(value)] += 1 if rows > 0 else -1
+        if self.__moments is not None:
+            difference = float(value) - self.__moments[1]
+            self.__moments[0] += rows
+            self.__moments[2] += rows * difference
+            self.__moments[3] += rows * difference * difference
+
+    def __patch_typed(self, code, value, null):
+        """Writes the new typed value of a distinct value into its rows,
+        the typed values are built again only when their numpy type changes.
+        """
+        kinds = [kind for kind, levels in self.__level_kinds.items() if levels > 0]
+        kind = kinds[0] if len(kinds) == 1 else 'O'
+        typed = self.__typed
+        if typed.values.dtype.kind != kind:
+            self.__typed = TypedColumn.from_levels(self.__column.codes, self.__profiled_levels,
+                                                   self.__profiled_nulls)
+            return
+        code_rows = self.__code_rows(code)
+        if not null:
+            if kind == 'O':
+                # numpy does not look into the value
+                fill = np.empty(1, dtype=object)
+                fill[0] = value
+                value = fill
+            try:
+                typed.values[code_rows] = value
+            except (TypeError, ValueError, OverflowError):
+                self.__typed = TypedColumn.from_levels(self.__column.codes,
+                                                       self.__profiled_levels,
+                                                       self.__profiled_nulls)
+                return
+        typed.nulls[code_rows] = null
+
+    def __code_rows(self, code):
+        """numpy array with the sorted indexes of the rows of a distinct
+        value, from an index that is built once.
+        """
+        if isinstance(self.__column, PlainColumn):
+            # each row is a distinct value of its own
+            return np.array([code], dtype=np.int64)
+        if self.__level_rows is None:
+            order = np.argsort(self.__column.codes, kind='stable')
+            starts = np.zeros(len(self.__column.levels) + 1, dtype=np.int64)
+            np.cumsum(self.__column.counts, out=starts[1:])
+            self.__level_rows = (order, starts)
+        order, starts = self.__level_rows
+        return order[starts[code]:starts[code + 1]]
+
+    def __profile_counts(self):
+        """Calcs the stats from the rows of each filled profiled distinct
+        value, like __profile_levels but without expanding the values to
+        the rows of the column. The row totals are already up to date.
+        """
+        if self.__not_nulls_total == 0 or self.__miptype in ['nominal', 'text']:
+            self.__profile_levels()
+            return
+        if self.__level_order is None:
+            self.__order_levels()
+        order = self.__level_order
+        codes = order[~self.__profiled_nulls[order]]
+        values = [self.__profiled_levels[code] for code in codes.tolist()]
+        options = {}
+        if self.__miptype == 'date':
+            keys = np.asarray(values, dtype='datetime64[D]').astype(np.int64).tolist()
+        elif self.__miptype == 'numerical':
+            keys = [float(value) for value in values]
+            rows, shift, total, squares = self.__moments
+            options['moments'] = (rows, shift + total / rows, squares - total * total / rows)
+        else:
+            keys = [int(value) for value in values]
+        # in the order of the first profiled row of each value, for the mode
+        counts_by_value = Counter()
+        for key, rows in zip(keys, self.__column.counts[codes].tolist()):
+            counts_by_value[key] += rows
+        stats = self.__profile(None, counts=counts_by_value, threshold=self.__threshold,
+                               method=self.__outlier_method, **options)
+        self.__outlier_rows = np.array([], dtype=np.int64)
+        if self.__miptype == 'numerical':
+            outliers = outlier_mask(keys, stats['lowerbound'], stats['upperbound'],
+                                    self.__outlier_method)
+            rows = np.concatenate([self.__code_rows(code) for code in codes[outliers].tolist()] +
+                                  [np.array([], dtype=np.int64)])
+            row_codes = self.__column.codes[rows]
+            # like the profiled rows, by status and then by row
+            ordering = np.lexsort((rows, self.__level_status[row_codes]))
+            rows, row_codes = rows[ordering], row_codes[ordering]
+            levels = self.__profiled_levels
+            stats['outliersrows'] = [(row + 1, levels[code])
+                                     for row, code in zip(rows.tolist(), row_codes.tolist())]
+            stats['outliers'] = len(rows)
+            self.__outlier_rows = rows + 1
+        self.__stats = stats
+
+    def __cast_correction(self, newvalue):
+        """Returns a tuple (casted value, null flag) of a corrected value."""
+        casted_value = self.__cast_value(newvalue)
+        if self.__float_numbers and casted_value is not None:
+            casted_value = float(casted_value)
+        return casted_value, not casted_value
+
+    def __count_correction(self, code, rows):
+        """Adds the given rows to the successful or the failed correction
+        attempts, according to the correction of the given distinct value.
+        """
+        null_string = self.__missing_values[0]
+        success = self.__suggested[code] != null_string
+        if self.__level_status[code] == DATATYPE:
+            if success:
+                self.__success_total_d += rows
+            else:
+                self.__failed_total_d += rows
+        else:
+            if success:
+                self.__success_total_c += rows
+            else:
+                self.__failed_total_c += rows
+
+    def __cast_levels(self):
+        """Casts each distinct valid value once, the other values are
+        marked as nulls.
+        """
+        levels = self.__column.levels
+        casted_levels = [None] * len(levels)
+        null_levels = np.ones(len(levels), dtype=bool)
+        valid_codes = np.flatnonzero(self.__level_status == VALID).tolist()
+        if self.__float_numbers:
+            # all the valid values are parsed together into floats
+            floats = self.__field.cast_floats([levels[code] for code in valid_codes])
+            for code, casted_value in zip(valid_codes, floats.tolist()):
+                if not np.isnan(casted_value):
+                    casted_levels[code] = casted_value
+                if casted_value and not np.isnan(casted_value):
+                    null_levels[code] = False
+        else:
+            for code in valid_codes:
+                casted_value = self.__cast_value(levels[code])
+                casted_levels[code] = casted_value
+                if casted_value:
+                    null_levels[code] = False
+        self.__casted_levels = casted_levels
+        self.__null_levels = null_levels
+
+    def __order_levels(self):
+        """Orders the distinct values like the profiled rows, by status
+        and then by the number of their first row.
+        """
+        codes = self.__column.codes
+        first_rows = np.full(len(self.__column.levels), len(codes), dtype=np.int64)
+        unique_codes, unique_first_rows = np.unique(codes, return_index=True)
+        first_rows[unique_codes] = unique_first_rows
+        self.__level_order = np.lexsort((first_rows, self.__level_status))
+
     def __suggest_corrections(self):
         """Try to suggest corrections for the violeted values."""
         self.__reset_sugg_stats()
+        levels = self.__column.levels
+        counts = self.__column.counts
+        suggested = {}
+        for code in np.flatnonzero(self.__level_status != VALID).tolist():
+            rows = int(counts[code])
+            if self.__level_status[code] == DATATYPE:
+                suggested[code] = self.__suggestd(levels[code], rows)
+            else:
+                suggested[code] = self.__suggestc(levels[code], rows)
+        self.__suggested = suggested
+
+
 
-        dsuggestions = [Suggestion(row=pair[0],
-                                   value=pair[1],
-                                   newvalue=self.__suggestd(pair[1]))
-                        for pair in self.__datatype_violated_pairs]
-
-        csuggestions = [Suggestion(row=pair[0],
-                                   value=pair[1],
-                                   newvalue=self.__suggestc(pair[1]))
-                        for pair in self.__constraint_violated_pairs]
-        self.__dsuggestions = dsuggestions
-        self.__csuggestions = csuggestions
+def _row_numbers(mask):
+    """Returns the set of the row numbers of a row mask."""
+    return set((np.flatnonzero(mask) + 1).tolist())
+
+
+def _value_kind(value):
+    """Returns the numpy kind of the array of typed_array for a value."""
+    if type(value) is int:
+        return 'i' if _INT64_MIN <= value <= _INT64_MAX else 'O'
+    if type(value) is float:
+        return 'f'
+    if type(value) is datetime.date:
+        return 'M'
+    return 'O'
+
+
+def to_html(columnreport):
+    """Renders the html page of a column report. The column report
+    can be a ColumnReport or a PartialColumnReport object.
+    """
+    app_path = os.path.abspath(os.path.dirname(__file__))
+    path = Path(app_path)
+    parentpath = str(path.parent)
+    env_path = os.path.join(parentpath, 'data', 'html')
+    env = Environment(loader=FileSystemLoader(env_path))
+    template = env.get_template('column_report.html')
+    if columnreport.corrected:
+        status = 'Applied'
+        null_replaced = 'have been'
+    else:
+        status = 'Suggested'
+        null_replaced = 'will be'
+    template_vars = {
+        'cname': columnreport.qcfield.name,
+        'gen_stat_table': tupples2table(columnreport.prettygeneral.items()),
+        'stat_table': tupples2table(columnreport.prettystats.items()),
+        'status': status,
+        'null_replaced': null_replaced,
+        'dcorrections_table': tupples2table(columnreport.dcorrections),
+        'ccorrections_table': tupples2table(columnreport.ccorrections),
+        'removed_values': list2parag(columnreport.cnulls | columnreport.dnulls),
+    }
+    return template.render(template_vars)
+
+
+def printpdf(columnreport, filepath):
+    """Writes the pdf page of a column report."""
+    app_path = os.path.abspath(os.path.dirname(__file__))
+    path = Path(app_path)
+    parentpath = str(path.parent)
+    css_path = os.path.join(parentpath, 'data', 'html', 'style.css')
+    html_out = to_html(columnreport)
+    document = HTML(string=html_out).render(stylesheets=[css_path])
+    document.write_pdf(target=filepath)
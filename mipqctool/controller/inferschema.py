@@ -6,7 +6,8 @@ from mipqctool.controller.tablereport import TableReport
 
 class InferSchema(object):   
 
-    def __init__(self, table, csvname, sample_rows=100, maxlevels=10, cdedict=None, na_empty_strings_only=False):
+    def __init__(self, table, csvname, sample_rows=100, maxlevels=10, cdedict=None, na_empty_strings_only=False,
+                 whole_file=False):
         """Class for infering a dataset's schema which comes in csv file.
          Arguments:
          :param table: a QcTable holding the dataset csv data.
@@ -16,10 +17,12 @@ class InferSchema(object):
                           above that number the variable will be considered as a text data type.
          :param cdedict: A CdeDict object containg info about all CDE variables
          :param na_empty_strings_only: boolean to infer only empty strings as NAs
+         :param whole_file: if True the schema is inferred from all the rows of the dataset
         """
         self.__table = table
         self.__csvname = csvname
-        self.__table.infer(limit=sample_rows, maxlevels=maxlevels, na_empty_strings_only=na_empty_strings_only)
+        self.__table.infer(limit=sample_rows, maxlevels=maxlevels, na_empty_strings_only=na_empty_strings_only,
+                           whole_file=whole_file)
         self.__suggestions = None
         if cdedict:
             self.__cdedict = cdedict
@@ -76,7 +79,8 @@ class InferSchema(object):
         self.__table.schema.save(filename)
 
     @classmethod
-    def from_disc(cls, csvpath,  sample_rows=100, maxlevels=10, cdedict=None, na_empty_strings_only=False):
+    def from_disc(cls, csvpath,  sample_rows=100, maxlevels=10, cdedict=None, na_empty_strings_only=False,
+                  whole_file=False, jobs=1, cache=None):
         """
         Constructs an InferSchema from loading a csv file from local disc.
         Arguments:
@@ -85,13 +89,18 @@ class InferSchema(object):
         :param maxlevel: number of unique values in order to one infered variable to be considered as nominal(categorical)
                          above that number the variable will be considered as a text data type.
         :param cdedict: A CdeDict object containg info about all CDE variables
+        :param whole_file: if True the schema is inferred from all the rows of the dataset
+        :param jobs: number of worker processes that parse the columns
+        :param cache: QcCache object, True for the default cache or None,
+                      the whole file mode counts the cached columns
         """
         
-        dataset = QcTable(csvpath, schema=None)
+        dataset = QcTable(csvpath, schema=None, cache=cache, workers=jobs)
         csvname = os.path.basename(csvpath)
         return cls(table=dataset, csvname=csvname,
                    sample_rows=sample_rows,maxlevels=maxlevels,
-                   cdedict=cdedict, na_empty_strings_only=na_empty_strings_only)
+                   cdedict=cdedict, na_empty_strings_only=na_empty_strings_only,
+                   whole_file=whole_file)
 
 
 
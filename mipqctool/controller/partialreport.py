@@ -0,0 +1,433 @@
+# -*- coding: utf-8 -*-
+# partialreport.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import OrderedDict, Counter
+
+import numpy as np
+
+from mipqctool import config
+from mipqctool.config import PRETTY_STAT_NAMES
+from mipqctool.model.qcfrictionless.qcmemo import ValueMemo, DATATYPE, CONSTRAINT
+from mipqctool.model.qcfrictionless.qcviolations import ViolationCounter
+from mipqctool.model.qctypes import NumericalSummary, profile_numerical, outlier_indexes
+from mipqctool.model.qctypes import TextSummary, profile_text, profile_integer, profile_date
+from mipqctool.model.qctypes import IntegerSummary
+from mipqctool.controller.columnreport import to_html, printpdf
+
+
+class PartialColumnReport(object):
+    """This class holds the validation and statistical data of a dataset
+    column that is read in blocks of rows. Each block updates a state of
+    counters, numerical moments and bounded samples, so the memory does
+    not depend on the number of rows, and the states of different blocks
+    can be merged. It has the same reporting interface as ColumnReport.
+
+    A PartialColumnReport is used in three steps, update() with each block,
+    finalize() for calculating the suggestions and the statistics and, only
+    for numerical columns, update_outliers() with each block again.
+    """
+    def __init__(self, qcfield, threshold=3, corrections=None, **options):
+        """Arguments:
+        :param qcfield: QcField object
+        :param threshold: outlier threshold - (mean - threshold * std, mean + threshold * std)
+                          outside this length, a numerical value is considered outlier,
+                          the outlierThreshold of the field descriptor overrides it
+        :param corrections: dict {invalid value: corrected value}, if given the
+                            corrected values are included in the statistics
+        """
+        self.__field = qcfield
+        self.__miptype = qcfield.miptype
+        self.__threshold = threshold
+        # the outlier method and threshold of the field descriptor
+        self.__outlier_method = qcfield.outlier_method
+        if qcfield.outlier_threshold is not None:
+            self.__threshold = qcfield.outlier_threshold
+        self.__missing_values = qcfield.missing_values
+        self.__corrections = corrections
+        self.__corrected = corrections is not None
+        # each distinct value is validated and casted once for all blocks
+        self.__memo = ValueMemo(qcfield)
+        self.__total_rows = 0
+        self.__null_total = 0
+        self.__not_nulls_total = 0
+        # the rows and some example row numbers of each invalid raw value
+        self.__dviolations = ViolationCounter()
+        self.__cviolations = ViolationCounter()
+        # the first row numbers with violations
+        self.__violated_rows = []
+        # Counter with the casted values, for nominal
+        self.__values = Counter()
+        # exact counts or sketches of the integers and of the day numbers of the dates
+        self.__integers = IntegerSummary()
+        # Counter {year: rows} of the dates
+        self.__years = Counter()
+        # exact counts or sketches of the text values
+        self.__text = TextSummary()
+        # moments, min, max and quantile sketch of the numerical values
+        self.__summary = NumericalSummary()
+        self.__dsuggestions = None
+        self.__csuggestions = None
+        self.__success_total_d = 0
+        self.__success_total_c = 0
+        self.__failed_total_d = 0
+        self.__failed_total_c = 0
+        self.__stats = {}
+
+    @property
+    def qcfield(self):
+        """Returns the object QcField"""
+        return self.__field
+
+    @property
+    def name(self):
+        return self.qcfield.name
+
+    @property
+    def miptype(self):
+        return self.__miptype
+
+    @property
+    def total_rows(self):
+        return self.__total_rows
+
+    @property
+    def datatype_errors(self):
+        """Total datatype violations"""
+        return self.__dviolations.total
+
+    @property
+    def constraint_errors(self):
+        """Total constraint violations"""
+        return self.__cviolations.total
+
+    @property
+    def stats(self):
+        """Statistics dictionary, different keys per qctype"""
+        return self.__stats
+
+    @property
+    def value_range(self):
+        """Value range derived from stats."""
+        if self.miptype == 'nominal':
+            return self.stats['categories']
+        elif self.miptype in ['integer', 'numerical']:
+            return [self.stats['min'], self.stats['max']]
+        else:
+            return None
+
+    @property
+    def invalid_rows(self):
+        """set with the first row numbers with violations, at most
+        config.CHUNK_SAMPLE_ROWS rows are kept.
+        """
+        return set(self.__violated_rows)
+
+    @property
+    def outlier_rows(self):
+        """numpy int64 array with the first row numbers of the outliers
+        of a numerical column, at most config.CHUNK_SAMPLE_ROWS rows.
+        """
+        rows = [row for row, _ in self.__stats.get('outliersrows', [])]
+        return np.asarray(rows, dtype=np.int64)
+
+    @property
+    def nulls_total(self):
+        """Total number of rows with nulls"""
+        return self.__null_total
+
+    @property
+    def not_nulls_total(self):
+        """Total number of rows with no nulls"""
+        return self.__not_nulls_total
+
+    @property
+    def corrected(self):
+        """Are the violation corrections applied?"""
+        return self.__corrected
+
+    @property
+    def corrections(self):
+        """Returns a dict {invalid value: suggested value} for both
+        types of violations.
+        """
+        corrections = dict(self.__dsuggestions)
+        corrections.update(self.__csuggestions)
+        return corrections
+
+    @property
+    def dcorrections(self):
+        """Returns the datatype corrections as set of (original, corrected)."""
+        null = self.__missing_values[0]
+        return set((value, newvalue)
+                   for value, newvalue in self.__dsuggestions.items()
+                   if newvalue != null)
+
+    @property
+    def dnulls(self):
+        """Returns the values with datatype vialations unable to correct."""
+        null = self.__missing_values[0]
+        return set(value
+                   for value, newvalue in self.__dsuggestions.items()
+                   if newvalue == null)
+
+    @property
+    def ccorrections(self):
+        "Returns the constraint corrections as set of (original, corrected)."
+        null = self.__missing_values[0]
+        return set((value, newvalue)
+                   for value, newvalue in self.__csuggestions.items()
+                   if newvalue != null)
+
+    @property
+    def cnulls(self):
+        """Returns the values with constraint vialations unable to correct."""
+        null = self.__missing_values[0]
+        return set(value
+                   for value, newvalue in self.__csuggestions.items()
+                   if newvalue == null)
+
+    @property
+    def all_corrections(self):
+        """Returns all types of corrections in printabple format."""
+        all_sugg = []
+        for corrpair in self.dcorrections:
+            all_sugg.append(' -> '.join(corrpair))
+        for corrpair in self.ccorrections:
+            all_sugg.append(' -> '.join(corrpair))
+        for invalidval in self.dnulls:
+            all_sugg.append(' -> '.join([invalidval, 'NULL']))
+        for invalidval in self.cnulls:
+            all_sugg.append(' -> '.join([invalidval, 'NULL']))
+        return all_sugg
+
+    @property
+    def filledpercentage(self):
+        return round(self.not_nulls_total / self.total_rows * 100, 2)
+
+    @property
+    def prettygeneral(self):
+        """Returns a dict with row stats with readable keys"""
+        dictrows = OrderedDict()
+        dictrows['Type'] = self.miptype
+        dictrows['Total number of rows'] = self.total_rows
+        dictrows['Number of rows with data'] = self.not_nulls_total
+        dictrows['Completion percentage'] = str(self.filledpercentage) + '%'
+        dictrows['Number of rows with constraint violations'] = self.constraint_errors
+        dictrows['Number of rows with datatype violations'] = self.datatype_errors
+        if self.__corrected:
+            dictrows['Data Cleansing applied?'] = 'Yes'
+            dictrows['Number of successful correction attempts of constraint violations'] = self.__success_total_c
+            dictrows['Number of successful correction attempts of datatype violations'] = self.__success_total_d
+            dictrows['Total number of violations replaced by null'] = self.__failed_total_c + self.__failed_total_d
+        else:
+            dictrows['Data Cleansing applied?'] = 'No'
+
+        return dictrows
+
+    @property
+    def prettystats(self, decimals=3):
+        prettydict = OrderedDict()
+        for key in self.stats.keys():
+            pretty_key = PRETTY_STAT_NAMES.get(key, key)
+            value = self.stats[key]
+            if isinstance(value, float):
+                value = round(value, decimals)
+            prettydict[pretty_key] = value
+        return prettydict
+
+    def update(self, raw_values, start_row=1):
+        """Validates a block of values and updates the state.
+        Arguments:
+        :param raw_values: list of strings, a block of the column's values
+        :param start_row: the row number of the first value of the block
+        :returns: tupple with the lists of the invalid and of the null
+                  value indexes in the block
+        """
+        invalid = []
+        nulls = []
+        casted_values = []
+        statuses = self.__memo.statuses(raw_values)
+        for index, (value, status) in enumerate(zip(raw_values, statuses.tolist())):
+            if status == DATATYPE:
+                value = self.__add_violation(self.__dviolations, index, value, start_row)
+                invalid.append(index)
+                if not self.__corrected:
+                    continue
+            elif status == CONSTRAINT:
+                value = self.__add_violation(self.__cviolations, index, value, start_row)
+                invalid.append(index)
+                if not self.__corrected:
+                    continue
+            casted_value = self.__memo.cast(value)
+            if casted_value:
+                casted_values.append(casted_value)
+            else:
+                nulls.append(index)
+        self.__total_rows += len(raw_values)
+        self.__null_total += len(nulls)
+        self.__not_nulls_total += len(casted_values)
+        self.__add_values(casted_values)
+        return invalid, nulls
+
+    def merge(self, other):
+        """Merges the state of an other PartialColumnReport of the same
+        column, with rows that follow the rows of this one.
+        """
+        self.__total_rows += other.__total_rows
+        self.__null_total += other.__null_total
+        self.__not_nulls_total += other.__not_nulls_total
+        self.__dviolations.update(other.__dviolations)
+        self.__cviolations.update(other.__cviolations)
+        free_rows = config.CHUNK_SAMPLE_ROWS - len(self.__violated_rows)
+        self.__violated_rows.extend(other.__violated_rows[:free_rows])
+        self.__values.update(other.__values)
+        self.__integers.merge(other.__integers)
+        self.__years.update(other.__years)
+        self.__text.merge(other.__text)
+        self.__summary.merge(other.__summary)
+
+    def finalize(self):
+        """Calculates the suggested corrections and the statistics."""
+        self.__dsuggestions = self.__suggest(self.__dviolations, self.__field.suggestd)
+        self.__csuggestions = self.__suggest(self.__cviolations, self.__field.suggestc)
+        self.__calc_success_totals()
+        self.__stats = self.__calc_stats()
+
+    def update_outliers(self, raw_values, start_row=1):
+        """Counts the outliers of a block of values, the statistics must
+        have been calculated with finalize() first.
+        """
+        if self.miptype != 'numerical' or not self.__stats:
+            return
+        high = self.__stats['upperbound']
+        low = self.__stats['lowerbound']
+        outliersrows = self.__stats['outliersrows']
+        statuses = self.__memo.statuses(raw_values)
+        rows = []
+        casted_values = []
+        for index, (value, status) in enumerate(zip(raw_values, statuses.tolist())):
+            if status in (DATATYPE, CONSTRAINT):
+                if not self.__corrected:
+                    continue
+                value = self.__corrections.get(value, value)
+            casted_value = self.__memo.cast(value)
+            if casted_value:
+                rows.append(start_row + index)
+                casted_values.append(casted_value)
+        outliers = outlier_indexes([float(value) for value in casted_values], low, high,
+                                   self.__outlier_method)
+        self.__stats['outliers'] += len(outliers)
+        free_rows = config.CHUNK_SAMPLE_ROWS - len(outliersrows)
+        for index in outliers[:free_rows].tolist():
+            outliersrows.append((rows[index], casted_values[index]))
+
+    def update_correction(self, value, newvalue):
+        """Update given correction"""
+        # check if the incoming new value is NULL
+        # and replace it with the default missing value
+        if newvalue == "NULL":
+            newvalue = self.__missing_values[0]
+        for suggestions in [self.__dsuggestions, self.__csuggestions]:
+            if value in suggestions:
+                suggestions[value] = newvalue
+        self.__calc_success_totals()
+
+    def delete_correction(self, value):
+        """Delete given correction"""
+        self.update_correction(value, value)
+
+    def example_rows(self, value):
+        """Returns a sorted list with some of the row numbers of the
+        given invalid value, at most config.VIOLATION_SAMPLE_ROWS.
+        """
+        if value in self.__dviolations:
+            return self.__dviolations.rows(value)
+        return self.__cviolations.rows(value)
+
+    def printpdf(self, filepath):
+        printpdf(self, filepath)
+
+    def to_html(self):
+        return to_html(self)
+
+    # Private
+    def __add_violation(self, violations, index, value, start_row):
+        """Records a violation and returns the value used for
+        the statistics, the corrected one if corrections are given.
+        """
+        violations.add(value, start_row + index)
+        if len(self.__violated_rows) < config.CHUNK_SAMPLE_ROWS:
+            self.__violated_rows.append(start_row + index)
+        if self.__corrected:
+            return self.__corrections.get(value, value)
+        return value
+
+    def __add_values(self, casted_values):
+        if self.miptype == 'text':
+            self.__text.update(casted_values)
+        elif self.miptype == 'numerical':
+            self.__summary.update([float(value) for value in casted_values])
+        elif self.miptype == 'integer':
+            self.__integers.update(casted_values)
+        elif self.miptype == 'date':
+            days = np.asarray(casted_values, dtype='datetime64[D]')
+            years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+            self.__years.update(years.tolist())
+            self.__integers.update(days.astype(np.int64).tolist())
+        else:
+            self.__values.update(casted_values)
+
+    def __suggest(self, violations, suggest_function):
+        """Returns an OrderedDict {invalid value: suggested value}."""
+        suggestions = OrderedDict()
+        for value in violations:
+            if self.__corrected:
+                suggestions[value] = self.__corrections.get(value, value)
+            else:
+                suggestions[value] = suggest_function(value)
+        return suggestions
+
+    def __calc_success_totals(self):
+        null = self.__missing_values[0]
+        self.__success_total_d = self.__failed_total_d = 0
+        self.__success_total_c = self.__failed_total_c = 0
+        for value, rows in self.__dviolations.items():
+            if self.__dsuggestions[value] != null:
+                self.__success_total_d += rows
+            else:
+                self.__failed_total_d += rows
+        for value, rows in self.__cviolations.items():
+            if self.__csuggestions[value] != null:
+                self.__success_total_c += rows
+            else:
+                self.__failed_total_c += rows
+
+    def __calc_stats(self):
+        """Calcs the same statistics as the qctypes profile functions."""
+        result = OrderedDict()
+        if self.__not_nulls_total == 0:
+            # all values are null
+            return {}
+        c = self.__values
+        if self.miptype == 'integer':
+            result = profile_integer(None, summary=self.__integers)
+        elif self.miptype == 'numerical':
+            # the outliers are counted with update_outliers
+            result = profile_numerical(None, self.__threshold, summary=self.__summary,
+                                       method=self.__outlier_method)
+        elif self.miptype == 'date':
+            result = profile_date(None, summary=self.__integers, years=self.__years)
+        elif self.miptype == 'nominal':
+            result['top'], result['freq'] = c.most_common(1)[0]
+            categories = list(c)
+            categories.sort()
+            result['categories'] = categories
+            result['categories_num'] = len(categories)
+        elif self.miptype == 'text':
+            result = profile_text(None, summary=self.__text)
+        return result
@@ -9,9 +9,15 @@ from __future__ import unicode_literals
 import os
 import sys
 import csv
+import json
+import sqlite3
+import tempfile
+import weakref
 from datetime import datetime
 from pathlib import Path
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 import pandas as pd
 
@@ -25,35 +31,52 @@ from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.utils import get_column_letter
 from collections import namedtuple, Counter, defaultdict
 
-from mipqctool.model.qcfrictionless import QcSchema, QcTable, FrictionlessFromDC
+import numpy as np
+
+from mipqctool.model.qcfrictionless import QcSchema, QcTable, QcField, FrictionlessFromDC
+from mipqctool.model.qcfrictionless import CategoricalColumn, PlainColumn
 from mipqctool.exceptions import TableReportError, QCToolException
 from mipqctool.controller.columnreport import ColumnReport
-from mipqctool.model.qcfrictionless import QcTable
+from mipqctool.controller.partialreport import PartialColumnReport
 from mipqctool.model import qctypes
 from mipqctool import config, __version__
 from mipqctool.config import LOGGER, COLUMN_STAT_HEADERS
 
-
+# separator of the levels of the columns sent to the validating processes
+_SEP = '\x00'
 
 
 class TableReport(object):
     """This class is for creating a report in pdf and csv files
     """
 
-    def __init__(self, table, id_column=1, threshold=3, **options):
+    def __init__(self, table, id_column=1, threshold=3, chunk_rows=None,
+                 float_numbers=False, jobs=1, **options):
         """ Arguments:
             :param table: a QcTable object
             :param id_column: column number of dataset's primary key (id)
             :param threshold: outlier threshold - (mean - threshold * std, mean + threshold * std) 
                               outside this length, a numerical value is considered outlier
+            :param chunk_rows: if given the dataset is read in blocks of chunk_rows rows
+                               and the column reports are PartialColumnReport objects,
+                               so the memory is bounded by the block size
+            :param float_numbers: if True the values of the number fields are
+                                  profiled as numpy floats instead of Decimals
+            :param jobs: number of worker processes that validate and profile
+                         the columns, it is ignored when chunk_rows is given
         """
         self.__threshold = threshold
+        self.__float_numbers = float_numbers
+        self.__jobs = jobs
+        self.__chunk_rows = chunk_rows
         self.__missing_headers = []
         self.__valid_headers = []
         self.__invalid_headers = []
         self.__longnitudinal_columns = ['subjectid', 'visitid']
         
-        self.__total_rows = table.total_rows
+        # in chunked mode the rows are counted while reading the blocks
+        if not chunk_rows:
+            self.__total_rows = table.total_rows
 
         # check if table has a schema else infer
         if not table.schema:
@@ -81,10 +104,17 @@ class TableReport(object):
         self.__total_dublicates_long = None
         self.__tvalid_columns = None
         self.__tfilled_columns = None
+        # numpy arrays with the number of rows per number of valid
+        # (or filled) columns, the index is the number of columns
+        self.__valid_hist = None
+        self.__filled_hist = None
         self.__corrected = False
 
-        self.__create_reports()
-        self.__collect_row_stats()
+        if chunk_rows:
+            self.__create_partial_reports()
+        else:
+            self.__create_reports()
+            self.__collect_row_stats()
 
     @property
     def table(self):
@@ -106,6 +136,11 @@ class TableReport(object):
         """Are the correction applied?"""
         return self.__corrected
 
+    @property
+    def chunk_rows(self):
+        """Rows of each block in chunked mode, None otherwise"""
+        return self.__chunk_rows
+
     @property
     def total_columns(self):
         """Number of dataset's columns"""
@@ -121,6 +156,18 @@ class TableReport(object):
         """Dict with rows data completion overall stats"""
         return self.__filled_rows_stats
 
+    @property
+    def valid_columns_distribution(self):
+        """OrderedDict {number of valid columns: number of rows} for each
+        number of columns from 0 to the total columns."""
+        return OrderedDict(enumerate(self.__valid_hist.tolist()))
+
+    @property
+    def filled_columns_distribution(self):
+        """OrderedDict {number of filled columns: number of rows} for each
+        number of columns from 0 to the total columns."""
+        return OrderedDict(enumerate(self.__filled_hist.tolist()))
+
     @property
     def missing_headers(self):
         return self.__missing_headers
@@ -143,13 +190,21 @@ class TableReport(object):
 
     def apply_corrections(self):
         """Applies the suggestions of invalid values to the dataset."""
-        for name, columnreport in self.__columnreports.items():
-            columnreport.apply_corrections()
-        self.__collect_row_stats()
+        if self.__chunk_rows:
+            # the dataset is read again with the corrections
+            corrections = {name: columnreport.corrections
+                           for name, columnreport in self.__columnreports.items()}
+            self.__create_partial_reports(corrections)
+        else:
+            for name, columnreport in self.__columnreports.items():
+                columnreport.apply_corrections()
+            self.__collect_row_stats()
         self.__corrected = True
 
     def save_corrected(self, path):
-        if self.__corrected:
+        if self.__corrected and self.__chunk_rows:
+            self.__save_corrected_chunks(path)
+        elif self.__corrected:
             list_new_values = (col.corrected_values for name, col in self.__columnreports.items())
             new_values = zip(*list_new_values)
             with open(path, 'w') as out:
@@ -254,6 +309,27 @@ class TableReport(object):
         chart2.shame = 4
         ws2.add_chart(chart2, 'D20')
 
+        ## Rows per number of columns Sheet ##
+        ws5 = wb.create_sheet("Columns per Row")
+        ws5.row_dimensions[1].font = Font(bold=True)
+        ws5.append(['Number of columns', 'Rows with that many columns filled',
+                    'Rows with that many columns valid'])
+        for ncolumns, filled_rows in self.filled_columns_distribution.items():
+            ws5.append([ncolumns, filled_rows, self.valid_columns_distribution[ncolumns]])
+        for i in range(1, 4):
+            ws5.column_dimensions[get_column_letter(i)].width = 35
+
+        chart3 = BarChart()
+        chart3.type = 'col'
+        chart3.style = 10
+        chart3.x_axis.title = '# of columns'
+        chart3.y_axis.title = '# of rows'
+        chart3.title = 'Number of rows per number of filled and valid columns'
+        values3 = Reference(ws5, min_col=2, min_row=1, max_row=self.total_columns + 2, max_col=3)
+        chart3.add_data(values3, titles_from_data=True)
+        chart3.set_categories(Reference(ws5, min_col=1, min_row=2, max_row=self.total_columns + 2))
+        ws5.add_chart(chart3, 'E1')
+
         ## Column Statistics Sheet ## 
         ws3 = wb.create_sheet("Column Statistics")
         # make bold the first column 
@@ -279,11 +355,13 @@ class TableReport(object):
         start_col = 1
         for name, colreport in self.__columnreports.items():
             if len(colreport.all_corrections) > 0:
-                end_col = start_col + 1
+                rows_col = start_col + 1
+                end_col = start_col + 2
                 ws4.column_dimensions[get_column_letter(start_col)].width = 15
+                ws4.column_dimensions[get_column_letter(rows_col)].width = 15
                 ws4.column_dimensions[get_column_letter(end_col)].width = 15
 
-                # merge the two cells in the first row and put the variable name as title
+                # merge the three cells in the first row and put the variable name as title
                 ws4.merge_cells(start_row=1, start_column=start_col, end_row=1, end_column=end_col)
                 header = ws4.cell(row=1,column=start_col, value=colreport.qcfield.name)
                 header.border = header_border
@@ -291,6 +369,7 @@ class TableReport(object):
                 header.font = Font(bold=True)
                 # add also the subtitlles
                 ws4.cell(row=2, column=start_col, value='Invalid Value').border = left_border
+                ws4.cell(row=2, column=rows_col, value='Example Rows')
                 ws4.cell(row=2, column=end_col, value='Corrected Value').border = right_border
                 # collect all the correction suggestions for invalid values
                 # constraint violations
@@ -307,10 +386,12 @@ class TableReport(object):
                 for pair in corrections:
                     left = ws4.cell(row=start_row, column=start_col, value=pair[0])
                     left.border = left_border
+                    example_rows = ', '.join(str(row) for row in colreport.example_rows(pair[0]))
+                    ws4.cell(row=start_row, column=rows_col, value=example_rows)
                     right = ws4.cell(row=start_row, column=end_col, value=pair[1])
                     right.border = right_border
                     start_row += 1
-                start_col += 2  
+                start_col += 3
         # Longitudinal data dublicate rows
         ws4 = wb.create_sheet('Rows with dublicate longitudinal data')
         ws4.append(['Row number']) 
@@ -322,47 +403,184 @@ class TableReport(object):
     # private
     def __create_reports(self):
         """Create column reports."""
+        if self.__jobs > 1:
+            self.__create_reports_parallel()
+            return
         for header_name in self.__table.actual_headers:
             try:
                 field_index = self.__table.schema.field_names.index(header_name)
                 qcfield = self.__table.schema.fields[field_index]
-                raw_values = self.__table.column_values(qcfield.name)
-                column_report = ColumnReport(raw_values, qcfield, threshold=self.__threshold)
+                raw_values = self.__table.encoded_column(qcfield.name)
+                column_report = ColumnReport(raw_values, qcfield, threshold=self.__threshold,
+                                             float_numbers=self.__float_numbers)
                 column_report.validate()
                 self.__columnreports[qcfield.name] = column_report
             except (ValueError, QCToolException) as e:
                 pass
 
+    def __create_reports_parallel(self):
+        """Validate the columns in a pool of worker processes. The codes
+        and the joined levels of the columns reach the workers through
+        shared memory, the workers send back only the compact
+        ValidationResult of each column and the ColumnReport objects
+        are assembled here.
+        """
+        qcfields = []
+        columns = []
+        for header_name in self.__table.actual_headers:
+            try:
+                field_index = self.__table.schema.field_names.index(header_name)
+                qcfield = self.__table.schema.fields[field_index]
+                columns.append(self.__table.encoded_column(qcfield.name))
+                qcfields.append(qcfield)
+            except (ValueError, QCToolException) as e:
+                pass
+        if not columns:
+            return
+        # the rows of the plain columns are their levels, they have no codes
+        encoded = [index for index, column in enumerate(columns)
+                   if not isinstance(column, PlainColumn)]
+        shape = (len(encoded), len(columns[0]))
+        texts = [_SEP.join(column.levels).encode('utf-8') for column in columns]
+        codes_block = shared_memory.SharedMemory(create=True,
+                                                 size=max(1, 4 * shape[0] * shape[1]))
+        levels_block = shared_memory.SharedMemory(create=True,
+                                                  size=max(1, sum(len(text) for text in texts)))
+        try:
+            codes = np.ndarray(shape, dtype=np.int32, buffer=codes_block.buf)
+            for row, index in enumerate(encoded):
+                codes[row] = columns[index].codes
+            del codes
+            # {column index: row of its codes}
+            encoded = {index: row for row, index in enumerate(encoded)}
+            tasks = []
+            start = 0
+            for index, (qcfield, column, text) in enumerate(zip(qcfields, columns, texts)):
+                if text.count(_SEP.encode('utf-8')) != max(len(column.levels) - 1, 0):
+                    # values with the separator char are pickled
+                    levels = column.levels
+                else:
+                    levels_block.buf[start:start + len(text)] = text
+                    levels = (start, start + len(text), len(column.levels))
+                start += len(text)
+                codes_row = encoded.get(index)
+                tasks.append((codes_block.name, levels_block.name, shape, codes_row, levels,
+                              qcfield.descriptor, qcfield.missing_values,
+                              self.__threshold, self.__float_numbers))
+            with ProcessPoolExecutor(max_workers=self.__jobs) as executor:
+                # the results come back in the order of the columns
+                results = list(executor.map(_validate_column, tasks))
+        finally:
+            for block in [codes_block, levels_block]:
+                block.close()
+                block.unlink()
+        for qcfield, column, result in zip(qcfields, columns, results):
+            if result is None:
+                continue
+            try:
+                column_report = ColumnReport(column, qcfield, threshold=self.__threshold,
+                                             float_numbers=self.__float_numbers)
+                column_report.validate(result)
+            except (ValueError, QCToolException) as e:
+                continue
+            self.__columnreports[qcfield.name] = column_report
+
+    def __create_partial_reports(self, corrections=None):
+        """Create column reports and row stats reading the dataset in blocks.
+        Arguments:
+        :param corrections: dict {column name: dict {invalid value: corrected value}}
+        """
+        columnreports = OrderedDict()
+        indexes = []
+        for index, header_name in enumerate(self.__table.actual_headers):
+            if header_name not in self.__table.schema.field_names or header_name in columnreports:
+                continue
+            field_index = self.__table.schema.field_names.index(header_name)
+            qcfield = self.__table.schema.fields[field_index]
+            column_corrections = corrections.get(qcfield.name) if corrections else None
+            columnreports[qcfield.name] = PartialColumnReport(qcfield, threshold=self.__threshold,
+                                                              corrections=column_corrections)
+            indexes.append(index)
+
+        total_columns = self.total_columns
+        # histograms, rows per number of valid (or filled) columns
+        valid_hist = np.zeros(total_columns + 1, dtype=np.int64)
+        filled_hist = np.zeros(total_columns + 1, dtype=np.int64)
+        total_rows = 0
+        total_invalid_rows = 0
+        long_duplicates = _LongitudinalDuplicates(self.__table.actual_headers,
+                                                  self.__longnitudinal_columns)
+        for start_row, columns in self.__table.iter_column_chunks(self.__chunk_rows):
+            chunk_size = len(columns[0]) if columns else 0
+            invalid_columns = np.zeros(chunk_size, dtype=np.int64)
+            null_columns = np.zeros(chunk_size, dtype=np.int64)
+            for index, columnreport in zip(indexes, columnreports.values()):
+                invalid, nulls = columnreport.update(columns[index], start_row)
+                invalid_columns[invalid] += 1
+                null_columns[nulls] += 1
+            valid_hist += np.bincount(total_columns - invalid_columns, minlength=total_columns + 1)
+            filled_hist += np.bincount(total_columns - null_columns, minlength=total_columns + 1)
+            total_invalid_rows += np.count_nonzero(invalid_columns)
+            total_rows += chunk_size
+            long_duplicates.update(columns, start_row)
+
+        for columnreport in columnreports.values():
+            columnreport.finalize()
+        # numerical outliers need the mean and std of the whole column
+        numerical = [(index, columnreport)
+                     for index, columnreport in zip(indexes, columnreports.values())
+                     if columnreport.miptype == 'numerical' and columnreport.stats]
+        if numerical:
+            for start_row, columns in self.__table.iter_column_chunks(self.__chunk_rows):
+                for index, columnreport in numerical:
+                    columnreport.update_outliers(columns[index], start_row)
+
+        self.__columnreports = columnreports
+        self.__total_rows = total_rows
+        self.__total_invalid_rows = total_invalid_rows
+        self.__set_rows_per_columns(valid_hist, filled_hist)
+        self.__valid_rows_stats = self.__calc_rstat_dict(columns='valid')
+        self.__filled_rows_stats = self.__calc_rstat_dict(columns='filled')
+        if long_duplicates.enabled:
+            self.__rows_with_dublicates_long = long_duplicates.rows
+            self.__total_dublicates_long = len(self.__rows_with_dublicates_long)
+            long_duplicates.close()
+
+    def __save_corrected_chunks(self, path):
+        """Writes the corrected dataset reading it again in blocks."""
+        indexes = [self.__table.actual_headers.index(name)
+                   for name in self.__columnreports.keys()]
+        corrections = [columnreport.corrections
+                       for columnreport in self.__columnreports.values()]
+        with open(path, 'w') as out:
+            csv_out = csv.writer(out, quoting=csv.QUOTE_ALL)
+            csv_out.writerow(self.__table.headers)
+            for start_row, columns in self.__table.iter_column_chunks(self.__chunk_rows):
+                new_values = ([column_corrections.get(value, value) for value in columns[index]]
+                              for index, column_corrections in zip(indexes, corrections))
+                csv_out.writerows(zip(*new_values))
+
     def __collect_row_stats(self):
        
         total_rows = self.__total_rows
-        rows_invalid = []
-        rows_nulls = []
+        # number of invalid and of null columns per row, the column
+        # reports give their rows as bool masks that are summed up
+        invalid_columns = np.zeros(total_rows, dtype=np.int32)
+        null_columns = np.zeros(total_rows, dtype=np.int32)
         # for each column
         for name, report in self.__columnreports.items():
-            rows_invalid.extend(list(report.invalid_rows))
-            rows_nulls.extend(list(report.null_row_numbers))
-
-        total_invalid_rows = len(set(rows_invalid))
-        invalid_counter = Counter(rows_invalid)
-        null_counter = Counter(rows_nulls)
-        max_columns_per_row_ = {row: self.total_columns
-                                for row in range(1, total_rows + 1)}
-        # initialize valid and filled counters with max column
-        # number per row. aka each row has all columns filled and valid
-        valid_counter = Counter(max_columns_per_row_)
-        filled_counter = Counter(max_columns_per_row_)
-
-        # subtract the invalid to find the valid columns per row
-        valid_counter.subtract(invalid_counter)
-        # subtract the nulls to find the filled columns per row
-        filled_counter.subtract(null_counter)
+            invalid_columns += report.invalid_mask
+            null_columns += report.null_mask
+
+        total_invalid_rows = int(np.count_nonzero(invalid_columns))
 
         self.__total_rows = total_rows
         self.__total_invalid_rows = total_invalid_rows
 
-        self.__tvalid_columns = self.__calc_rows_per_columns(dict(valid_counter))
-        self.__tfilled_columns = self.__calc_rows_per_columns(dict(filled_counter))
+        # subtract the invalid (or null) columns from the total columns
+        # to find the valid (or filled) columns per row
+        self.__set_rows_per_columns(self.__calc_rows_per_columns(self.total_columns - invalid_columns),
+                                    self.__calc_rows_per_columns(self.total_columns - null_columns))
         self.__valid_rows_stats = self.__calc_rstat_dict(columns='valid')
         self.__filled_rows_stats = self.__calc_rstat_dict(columns='filled')
         if set(self.__longnitudinal_columns) <= set(self.table.actual_headers):
@@ -396,46 +614,44 @@ class TableReport(object):
         cquantiles['p24'] = cquantiles['p25'] - 1
         self.__columns_quantiles = cquantiles
 
-    def __calc_rows_per_columns(self, d):
+    def __calc_rows_per_columns(self, columns):
         """
         Arguments:
-        :param d: dictionary with row number as keys and values 
-                  the number of valid (or filled) columns that this row has
-        :return: dictionary with number of valid (or filled ) columns as keys
-                 and values the number of rows that have the same 
-                 valid (or filled) number of columns 
+        :param columns: numpy array with the number of valid (or filled)
+                        columns of each row
+        :return: numpy array with the number of rows that have the same
+                 valid (or filled) number of columns, the index is the
+                 number of columns
         """
-        res = defaultdict(list)
-        for key, val in d.items():
-            res[val].append(key)
-        result = {k: len(v) for (k, v) in res.items()}
-        return result
+        return np.bincount(columns, minlength=self.total_columns + 1)
+
+    def __set_rows_per_columns(self, valid_hist, filled_hist):
+        """Stores the numbers of rows per number of valid and filled
+        columns, also as dicts with only the numbers of columns that
+        some rows have.
+        """
+        self.__valid_hist = valid_hist
+        self.__filled_hist = filled_hist
+        self.__tvalid_columns = {columns: int(rows) for columns, rows in enumerate(valid_hist) if rows}
+        self.__tfilled_columns = {columns: int(rows) for columns, rows in enumerate(filled_hist) if rows}
 
     def __calc_rstat_dict(self, columns='filled'):
         stats = {}
         if columns == 'filled':
-            dict_column = self.__tfilled_columns
+            rows = self.__filled_hist
         elif columns == 'valid':
-            dict_column = self.__tvalid_columns
-
-        for i in range(0, self.__columns_quantiles['p25']):
-            key = columns + '_' + '0_24'
-            stats[key] = stats.get(key, 0) + dict_column.get(i, 0)
-
-        for i in range(self.__columns_quantiles['p25'], self.__columns_quantiles['p50']):
-            key = columns + '_' + '25_49'
-            stats[key] = stats.get(key, 0) + dict_column.get(i, 0)
-
-        for i in range(self.__columns_quantiles['p50'], self.__columns_quantiles['p75']):
-            key = columns + '_' + '50_74'
-            stats[key] = stats.get(key, 0) + dict_column.get(i, 0)
-
-        for i in range(self.__columns_quantiles['p75'], self.__total_columns):
-            key = columns + '_' + '75_99'
-            stats[key] = stats.get(key, 0) + dict_column.get(i, 0)
+            rows = self.__valid_hist
+        quantiles = self.__columns_quantiles
+        # sums of the rows of the ranges of number of columns
+        ranges = [('0_24', 0, quantiles['p25']),
+                  ('25_49', quantiles['p25'], quantiles['p50']),
+                  ('50_74', quantiles['p50'], quantiles['p75']),
+                  ('75_99', quantiles['p75'], self.__total_columns)]
+        for name, start, end in ranges:
+            stats[columns + '_' + name] = int(rows[start:max(start, end)].sum())
 
         key = columns + '_' + '100'
-        stats[key] = dict_column.get(self.total_columns, 0)
+        stats[key] = int(rows[self.total_columns])
 
         return stats
 
@@ -468,6 +684,10 @@ class TableReport(object):
         html_vars.update(self.filled_rows_stats)
         html_vars.update(self.valid_rows_stats)
         html_vars.update(self.__columns_quantiles)
+        # the number of rows for each number of filled and valid columns
+        html_vars['columns_distribution'] = list(zip(self.filled_columns_distribution.keys(),
+                                                     self.filled_columns_distribution.values(),
+                                                     self.valid_columns_distribution.values()))
 
         # calc the percentages for valid and filled row stats
         for item in self.filled_rows_stats.items():
@@ -529,7 +749,8 @@ class TableReport(object):
 
 
     @classmethod
-    def from_disc(cls, csvpath, dict_schema, schema_type='qc', id_column=1, threshold=3):
+    def from_disc(cls, csvpath, dict_schema, schema_type='qc', id_column=1, threshold=3,
+                  chunk_rows=None, float_numbers=False, jobs=1):
         """
         Constucts a TableReport from a csvfile and a given schema.
         Arguments:
@@ -539,6 +760,9 @@ class TableReport(object):
         :param id_column: column number of dataset's primary key (id)
         :param threshold: outlier threshold - (mean - threshold * std, mean + threshold * std) 
                           outside this length, a numerical value is considered outlier
+        :param chunk_rows: if given the dataset is read in blocks of chunk_rows rows
+        :param float_numbers: if True the number fields are profiled as numpy floats
+        :param jobs: number of worker processes that parse and validate the columns
         """
         if schema_type == 'qc':
             dataset_schema = QcSchema(dict_schema)
@@ -546,6 +770,127 @@ class TableReport(object):
             LOGGER.info('Transating from Data Catalogue to Frictionless json format...')
             qcdict_schema = FrictionlessFromDC(dict_schema).qcdescriptor
             dataset_schema = QcSchema(qcdict_schema)
-        dataset = QcTable(csvpath, schema=dataset_schema)
-        return cls(dataset, id_column=id_column, threshold=threshold)
+        dataset = QcTable(csvpath, schema=dataset_schema, workers=jobs)
+        return cls(dataset, id_column=id_column, threshold=threshold, chunk_rows=chunk_rows,
+                   float_numbers=float_numbers, jobs=jobs)
 
+
+# Internal
+
+def _validate_column(task):
+    """Validates a column in a worker process, the codes and the levels
+    of the column are read from the shared memory. Returns the
+    ValidationResult of the column or None if it can't be validated.
+    """
+    (codes_name, levels_name, shape, codes_row, levels, descriptor,
+     missing_values, threshold, float_numbers) = task
+    if not isinstance(levels, list):
+        start, end, total_levels = levels
+        block = shared_memory.SharedMemory(name=levels_name)
+        try:
+            levels = str(block.buf[start:end], 'utf-8').split(_SEP) if total_levels else []
+        finally:
+            block.close()
+    if codes_row is None:
+        column = PlainColumn(levels)
+    else:
+        block = shared_memory.SharedMemory(name=codes_name)
+        try:
+            codes = np.ndarray(shape, dtype=np.int32, buffer=block.buf)[codes_row].copy()
+        finally:
+            block.close()
+        column = CategoricalColumn(codes, levels)
+    try:
+        qcfield = QcField(descriptor, missing_values=missing_values)
+        column_report = ColumnReport(column, qcfield,
+                                     threshold=threshold, float_numbers=float_numbers)
+        column_report.validate()
+    except (ValueError, QCToolException) as e:
+        return None
+    return column_report.validation_result
+
+
+class _LongitudinalDuplicates(object):
+    """Finds the rows with dublicate pairs of SubjectID and VisitID
+    in a dataset that is read in blocks. When there are more than
+    max_keys pairs in memory, the first row of each pair is spilled to
+    a temporary sqlite file, so the memory does not grow with the file,
+    only the row numbers of the dublicates are kept.
+
+    Arguments:
+    :param headers: list with the headers of the dataset
+    :param longnitudinal_columns: list with the names of the key columns
+    :param max_keys: max distinct pairs kept in memory
+    """
+    def __init__(self, headers, longnitudinal_columns,
+                 max_keys=config.LONGITUDINAL_MAX_KEYS):
+        self.__enabled = set(longnitudinal_columns) <= set(headers)
+        if self.__enabled:
+            self.__indexes = [headers.index(name) for name in longnitudinal_columns]
+        self.__max_keys = max_keys
+        # {(subjectid, visitid): first row number} of the pairs not yet spilled
+        self.__first_rows = {}
+        self.__rows = set()
+        self.__disk = None
+        self.__finalizer = None
+
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    @property
+    def spilled(self):
+        """Are the pairs spilled to disk?"""
+        return self.__disk is not None
+
+    @property
+    def rows(self):
+        """Sorted list with the row numbers of the dublicate rows."""
+        if self.__disk is not None:
+            self.__flush()
+        return sorted(self.__rows)
+
+    def update(self, columns, start_row):
+        if not self.__enabled:
+            return
+        keys = zip(*[columns[index] for index in self.__indexes])
+        for row, key in enumerate(keys, start=start_row):
+            first_row = self.__first_rows.setdefault(key, row)
+            if first_row != row:
+                self.__rows.update([first_row, row])
+        if len(self.__first_rows) > self.__max_keys:
+            self.__flush()
+
+    def close(self):
+        """Deletes the temporary file of the spilled pairs."""
+        if self.__finalizer is not None:
+            self.__finalizer()
+
+    def __flush(self):
+        """Moves the pairs in memory to the sqlite file, the pairs that
+        are already there are dublicates of their earlier first row.
+        """
+        if self.__disk is None:
+            fd, path = tempfile.mkstemp(suffix='.sqlite')
+            os.close(fd)
+            self.__disk = sqlite3.connect(path)
+            self.__disk.execute('CREATE TABLE pairs (key TEXT PRIMARY KEY, row INTEGER)')
+            self.__disk.execute('CREATE TEMP TABLE block (key TEXT PRIMARY KEY, row INTEGER)')
+            self.__finalizer = weakref.finalize(self, _remove_database, self.__disk, path)
+        self.__disk.executemany('INSERT INTO block VALUES (?, ?)',
+                                ((json.dumps(key), row)
+                                 for key, row in self.__first_rows.items()))
+        cursor = self.__disk.execute('SELECT pairs.row, block.row FROM block '
+                                     'JOIN pairs ON pairs.key = block.key')
+        for first_row, row in cursor:
+            self.__rows.update([first_row, row])
+        self.__disk.execute('INSERT OR IGNORE INTO pairs SELECT key, row FROM block')
+        self.__disk.execute('DELETE FROM block')
+        self.__disk.commit()
+        self.__first_rows.clear()
+
+
+def _remove_database(connection, path):
+    connection.close()
+    if os.path.exists(path):
+        os.remove(path)
\ No newline at end of file
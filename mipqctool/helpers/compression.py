@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# compression.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import bz2
+import gzip
+import lzma
+import zlib
+import queue
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from mipqctool import config
+from mipqctool.exceptions import QCToolException
+
+# magic numbers of the supported compression formats
+_MAGIC_NUMBERS = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+]
+
+
+def detect_compression(path):
+    """Returns the compression format of a file from its first bytes,
+    one of 'gzip', 'bz2', 'xz', 'zstd' or None for not compressed files.
+    """
+    with open(path, 'rb') as binary_file:
+        head = binary_file.read(6)
+    for magic, compression in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_binary(path, compression=None):
+    """Opens a file for reading bytes. A compressed file is decompressed
+    in a background thread that reads ahead, so the decompression runs
+    in parallel with the parsing of the data (zlib, bz2 and lzma release
+    the GIL while decompressing). Multi-member gzip and multi-stream bz2
+    and xz files are read as one stream.
+
+    Arguments:
+    :param path: the file path
+    :param compression: compression format as returned by detect_compression
+    :returns: binary file object
+    """
+    if compression is None:
+        return open(path, 'rb', buffering=config.CSV_READ_BUFFER)
+    if compression == 'gzip':
+        stream = gzip.open(path, 'rb')
+    elif compression == 'bz2':
+        stream = bz2.open(path, 'rb')
+    elif compression == 'xz':
+        stream = lzma.open(path, 'rb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise QCToolException('The zstandard package is needed for reading '
+                                  '"{}", install it with pip install zstandard'.format(path))
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'),
+                                                            read_across_frames=True,
+                                                            closefd=True)
+    else:
+        raise QCToolException('Unknown compression "{}"'.format(compression))
+    return io.BufferedReader(ReadAheadReader(stream, name=path),
+                             buffer_size=config.CSV_READ_BUFFER)
+
+
+def open_text(path, encoding, compression=None):
+    """Opens a file, compressed or not, for reading text."""
+    return io.TextIOWrapper(open_binary(path, compression), encoding=encoding)
+
+
+class ReadAheadReader(io.RawIOBase):
+    """Raw reader that reads blocks of a stream in a background thread.
+    Truncated or corrupt compressed data is raised as a QCToolException.
+
+    Arguments:
+    :param stream: binary file object, it is closed with the reader
+    :param block_size: bytes of each read of the stream
+    :param depth: max number of blocks read ahead
+    :param name: the file path for the error messages
+    """
+    def __init__(self, stream, block_size=config.COMPRESSED_READ_BLOCK,
+                 depth=config.COMPRESSED_READ_AHEAD, name=None):
+        super().__init__()
+        self.__stream = stream
+        self.__name = name
+        self.__block_size = block_size
+        self.__blocks = queue.Queue(maxsize=depth)
+        self.__stop = threading.Event()
+        self.__block = memoryview(b'')
+        self.__eof = False
+        self.__thread = threading.Thread(target=self.__read_ahead, daemon=True)
+        self.__thread.start()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.__block and not self.__eof:
+            block = self.__blocks.get()
+            if isinstance(block, BaseException):
+                self.__eof = True
+                raise block
+            if not block:
+                self.__eof = True
+            self.__block = memoryview(block)
+        size = min(len(buffer), len(self.__block))
+        buffer[:size] = self.__block[:size]
+        self.__block = self.__block[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.__stop.set()
+            # unblock the thread if it waits for free space
+            while self.__thread.is_alive():
+                try:
+                    self.__blocks.get_nowait()
+                except queue.Empty:
+                    self.__thread.join(0.01)
+            self.__stream.close()
+        super().close()
+
+    # Private
+    def __read_ahead(self):
+        try:
+            while not self.__stop.is_set():
+                block = self.__stream.read(self.__block_size)
+                self.__put(block)
+                if not block:
+                    break
+        except _READ_ERRORS as e:
+            self.__put(QCToolException('Could not read "{}": {}'.format(self.__name, e)))
+        except Exception as e:
+            self.__put(e)
+
+    def __put(self, item):
+        while not self.__stop.is_set():
+            try:
+                self.__blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+
+# Internal
+
+# errors of truncated or corrupt compressed data, gzip.BadGzipFile is an OSError
+_READ_ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError)
+if zstandard is not None:
+    _READ_ERRORS += (zstandard.ZstdError,)
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+# csvscan.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import csv
+from array import array
+from functools import partial
+
+import numpy as np
+
+from mipqctool import config
+from mipqctool.helpers.compression import open_binary
+
+
+def count_records(path, dialect, compression=None):
+    """Count the records of a csv file without parsing it.
+
+    The file is scanned in binary chunks and only the quote characters
+    are inspected, so line breaks inside quoted values are not counted.
+    The result is the number of rows csv.reader would return for the
+    file, headers row included.
+
+    Arguments:
+    :param path: csv file path
+    :param dialect: csv dialect of the file
+    :param compression: compression format of the file or None
+    :returns: int
+    """
+    return _scan_file(path, RecordScanner(dialect), compression)
+
+
+def index_records(path, dialect):
+    """Find the byte offsets where the records of a csv file end.
+
+    The offset at position i is where the record i ends and the
+    record i+1 starts, so for a file with headers the data row i
+    (0 for the first data row) spans the bytes offsets[i]:offsets[i+1].
+
+    Arguments:
+    :param path: csv file path
+    :param dialect: csv dialect of the file
+    :returns: numpy int64 array with one offset per record
+    """
+    scanner = RecordScanner(dialect, index=True)
+    _scan_file(path, scanner)
+    return scanner.offsets
+
+
+class RecordScanner(object):
+    """Finds the record boundaries of a csv byte stream.
+
+    It follows the csv.reader rules for quoting, a quote char opens
+    a quoted value only at the start of a field, and inside a quoted
+    value a doubled quote char is an escaped one. Escape chars are not
+    supported, for those dialects use csv.reader instead.
+
+    Arguments:
+    :param dialect: csv dialect of the stream
+    :param index: if True the end offsets of the records are kept
+    """
+    def __init__(self, dialect, index=False):
+        if isinstance(dialect, str):
+            dialect = csv.get_dialect(dialect)
+        quotechar = dialect.quotechar
+        if dialect.quoting == csv.QUOTE_NONE or not quotechar:
+            self.__quote = None
+        else:
+            self.__quote = quotechar.encode('utf-8')
+        self.__delimiter = dialect.delimiter.encode('utf-8')
+        self.__skipspace = dialect.skipinitialspace
+        self.__records = 0
+        # the scanner state between chunks
+        self.__inquote = False
+        self.__field_start = True
+        self.__last_cr = False
+        self.__last_byte = b''
+        self.__carry = b''
+        # bytes scanned so far
+        self.__position = 0
+        self.__offsets = array('q') if index else None
+
+    @property
+    def records(self):
+        """Records with a line terminator found so far."""
+        return self.__records
+
+    @property
+    def offsets(self):
+        """numpy int64 array with the end offset of each record found
+        so far or None if the scanner does not keep an index.
+        """
+        if self.__offsets is None:
+            return None
+        return np.frombuffer(self.__offsets, dtype=np.int64).copy()
+
+    def feed(self, chunk):
+        """Scan the next chunk of bytes."""
+        data = self.__carry + chunk
+        self.__carry = b''
+        if not data:
+            return
+        quote = self.__quote
+        # fast path, no quotes to take care of
+        if not self.__inquote and (quote is None or quote not in data):
+            self.__scan_unquoted(data, self.__position)
+            self.__last_byte = data[-1:]
+            self.__position += len(data)
+            return
+        # keep trailing quotes for the next chunk, they could be
+        # the first half of an escaped quote
+        stripped = data.rstrip(quote)
+        if len(stripped) != len(data):
+            self.__carry = data[len(stripped):]
+            data = stripped
+            if not data:
+                return
+        self.__scan_quoted(data)
+        self.__last_byte = data[-1:]
+        self.__position += len(data)
+
+    def close(self):
+        """Finish the scanning and return the total number of records."""
+        if self.__carry:
+            carry = self.__carry
+            self.__carry = b''
+            self.__scan_quoted(carry)
+            self.__last_byte = carry[-1:]
+            self.__position += len(carry)
+        # last record without line terminator
+        if self.__last_byte and (self.__inquote or self.__last_byte not in b'\r\n'):
+            self.__records += 1
+            self.__last_byte = b'\n'
+            if self.__offsets is not None:
+                self.__offsets.append(self.__position)
+        return self.__records
+
+    # Private
+
+    def __scan_quoted(self, data):
+        quote = self.__quote
+        parts = data.split(quote)
+        last = len(parts) - 1
+        index = 0
+        # offset of the current part
+        offset = self.__position
+        # the first part is always outside of a quote split
+        self.__scan_part(parts[0], offset)
+        while index < last:
+            offset += len(parts[index]) + 1
+            index += 1
+            part = parts[index]
+            if self.__inquote:
+                if part == b'' and index < last:
+                    # escaped quote char, stay in the quoted value
+                    offset += 1
+                    index += 1
+                    self.__scan_part(parts[index], offset)
+                    continue
+                # closing quote
+                self.__inquote = False
+                self.__field_start = False
+                self.__last_cr = False
+                self.__scan_part(part, offset)
+            elif self.__field_start:
+                # opening quote
+                self.__inquote = True
+                self.__last_cr = False
+                self.__scan_part(part, offset)
+            else:
+                # a quote char in the middle of a field is a literal
+                self.__scan_part(part, offset)
+
+    def __scan_part(self, part, offset):
+        if self.__inquote or not part:
+            return
+        self.__scan_unquoted(part, offset)
+
+    def __scan_unquoted(self, data, offset):
+        newlines = data.count(b'\n')
+        carriages = data.count(b'\r')
+        if carriages:
+            # \r\n is one line terminator, a single \r is another one
+            newlines += carriages - data.count(b'\r\n')
+        joined_crlf = self.__last_cr and data[:1] == b'\n'
+        if joined_crlf:
+            newlines -= 1
+        self.__records += newlines
+        if self.__offsets is not None:
+            self.__index_terminators(data, offset, carriages, joined_crlf)
+        self.__last_cr = data[-1:] == b'\r'
+        self.__field_start = self.__ends_at_field_start(data)
+
+    def __index_terminators(self, data, offset, carriages, joined_crlf):
+        """Append the end offsets of the line terminators in data."""
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(buffer == 10)
+        if carriages:
+            crs = np.flatnonzero(buffer == 13)
+            following = buffer[np.minimum(crs + 1, len(buffer) - 1)]
+            # keep the single \r, a \r at the end of data is a single one
+            # until the next data starts with \n
+            crs = crs[(crs == len(buffer) - 1) | (following != 10)]
+            ends = np.union1d(ends, crs)
+        ends = ends.astype(np.int64) + offset + 1
+        if joined_crlf:
+            # the \n completes the \r of the previous data
+            self.__offsets[-1] += 1
+            ends = ends[1:]
+        self.__offsets.frombytes(ends.tobytes())
+
+    def __ends_at_field_start(self, data):
+        if self.__skipspace:
+            data = data.rstrip(b' ')
+            if not data:
+                return self.__field_start
+        return data[-1:] in (self.__delimiter, b'\n', b'\r')
+
+
+# Internal
+
+def _scan_file(path, scanner, compression=None):
+    with open_binary(path, compression) as binary_file:
+        read = partial(binary_file.read, config.CSV_READ_BUFFER)
+        for chunk in iter(read, b''):
+            scanner.feed(chunk)
+    return scanner.close()
@@ -17,7 +17,8 @@ class CsvDB(DataDB):
         self.__dbtype = 'CSV'
         self.__schematype = schematype
 
-        tables = [QcTable(fpath, schema=None) for fpath in filepaths]
+        # only the headers are needed for the mapping
+        tables = [QcTable(fpath, schema=None, headers_only=True) for fpath in filepaths]
 
         # store QcTable objects in a dictionary with filename as key
         self.__tables = {table.filename: table for table in tables}
@@ -1,5 +1,9 @@
 from .qcfield import QcField
 from .qcschema import QcSchema
+from .qccolumn import CategoricalColumn, PlainColumn, TypedColumn
+from .qcmemo import ValueMemo
+from .qcviolations import ViolationCounter
+from .qccache import QcCache
 from .qctable import QcTable
 from .frictionlessfromdc import FrictionlessFromDC
 from .cde import CdeDict
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+# qccache.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import json
+import mmap
+import shutil
+import hashlib
+import tempfile
+
+import numpy as np
+
+from mipqctool import config
+from mipqctool.config import LOGGER
+from mipqctool.model.qcfrictionless.qccolumn import CategoricalColumn, PlainColumn
+
+CACHE_VERSION = 2
+# separator of the levels in a column levels file
+_SEP = '\x00'
+_OFFSETS_FILE = 'row_offsets.npy'
+
+
+class QcCache(object):
+    """On disk cache with the parsed values of csv files.
+
+    Each csv file has an entry, a folder named <filename>-<key>.qccache
+    with a meta.json file and two files per column holding the column's
+    raw values dictionary encoded, a numpy file with the code of each row
+    and a file with the levels, a plain column has only the file with its
+    values, and optionally a row_offsets.npy file with the
+    byte offsets of the rows. An entry is valid as long as the size, the modification
+    time and the content fingerprint of the csv file have not changed.
+    The fingerprint hashes the whole content of the file, so an in place
+    edit that restores the size and the modification time is still caught.
+    A reader can compute it once with fingerprint() and pass it to load,
+    store and store_offsets, so the file is hashed only once.
+    When the total size of the cache exceeds max_size, the least
+    recently used entries are removed.
+
+    Arguments:
+    :param cache_dir: folder of the cache, default ~/.mipqctool/cache
+    :param max_size: max total size of the cache in bytes
+    """
+    def __init__(self, cache_dir=None, max_size=config.CACHE_MAX_SIZE):
+        if cache_dir is None:
+            cache_dir = os.path.expanduser(config.CACHE_DIR)
+        self.__cache_dir = cache_dir
+        self.__max_size = max_size
+
+    @property
+    def cache_dir(self):
+        return self.__cache_dir
+
+    @property
+    def max_size(self):
+        return self.__max_size
+
+    def entry_path(self, source):
+        """Returns the folder of the cache entry for the given csv file."""
+        source = os.path.abspath(source)
+        key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+        name = '{}-{}.qccache'.format(os.path.basename(source), key)
+        return os.path.join(self.__cache_dir, name)
+
+    def fingerprint(self, source):
+        """Returns the content fingerprint of the given csv file."""
+        return _fingerprint(source, os.stat(source).st_size)
+
+    def load(self, source, encoding, fingerprint=None):
+        """Returns the valid QcCacheEntry of the given csv file or None,
+        the file is hashed only if the fingerprint is not given and the
+        cheap properties of the entry match.
+        """
+        path = self.entry_path(source)
+        try:
+            with open(os.path.join(path, 'meta.json')) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        if not _is_valid(meta, source, encoding, fingerprint):
+            LOGGER.debug('Cache entry of "{}" is stale'.format(source))
+            return None
+        # mark the entry as recently used
+        os.utime(os.path.join(path, 'meta.json'))
+        return QcCacheEntry(path, meta)
+
+    def store(self, source, encoding, headers, columns, fingerprint=None):
+        """Stores the columns of the given csv file and returns
+        the QcCacheEntry or None if the columns can not be cached.
+
+        Arguments:
+        :param source: csv file path
+        :param encoding: the encoding used for reading the file
+        :param headers: list with the headers of the file
+        :param columns: list with the values of each column, a list,
+                        a CategoricalColumn or a PlainColumn per column
+        :param fingerprint: the fingerprint of the file, if already computed
+        """
+        total_rows = len(columns[0]) if columns else 0
+        meta = _describe_source(source, encoding, fingerprint)
+        meta.update({
+            'source': os.path.abspath(source),
+            'headers': headers,
+            'total_rows': total_rows,
+        })
+        path = self.entry_path(source)
+        # keep the row offsets of a still valid entry
+        old_entry = self.load(source, encoding, meta['fingerprint'])
+        tmp_path = self.__make_tmp()
+        if tmp_path is None:
+            return None
+        try:
+            if old_entry is not None and old_entry.has_offsets:
+                shutil.copy(os.path.join(path, _OFFSETS_FILE), tmp_path)
+                meta['offsets'] = True
+            for index, column in enumerate(columns):
+                if not isinstance(column, (CategoricalColumn, PlainColumn)):
+                    column = CategoricalColumn.encode(column)
+                text = _SEP.join(column.levels)
+                # values with the separator char can not be cached
+                if text.count(_SEP) != max(len(column.levels) - 1, 0):
+                    LOGGER.info('Column "{}" can not be cached'.format(headers[index]))
+                    return None
+                if isinstance(column, CategoricalColumn):
+                    np.save(_codes_path(tmp_path, index), column.codes)
+                with open(_levels_path(tmp_path, index), 'wb') as levels_file:
+                    levels_file.write(text.encode('utf-8'))
+            self.__replace_entry(tmp_path, path, meta)
+        except OSError as e:
+            LOGGER.warning('Could not write the cache entry: {}'.format(e))
+            return None
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=path)
+        return QcCacheEntry(path, meta)
+
+    def store_offsets(self, source, encoding, offsets, fingerprint=None):
+        """Stores the row offsets of the given csv file in its entry,
+        the cached columns of a valid entry are kept. Returns the
+        QcCacheEntry or None if the offsets could not be cached.
+
+        Arguments:
+        :param source: csv file path
+        :param encoding: the encoding used for reading the file
+        :param offsets: numpy int64 array with the end offset of each record
+        :param fingerprint: the fingerprint of the file, if already computed
+        """
+        path = self.entry_path(source)
+        if fingerprint is None:
+            fingerprint = self.fingerprint(source)
+        entry = self.load(source, encoding, fingerprint)
+        if entry is not None:
+            meta = dict(entry.meta, offsets=True)
+        else:
+            meta = _describe_source(source, encoding, fingerprint)
+            meta.update({
+                'source': os.path.abspath(source),
+                'headers': None,
+                'total_rows': max(len(offsets) - 1, 0),
+                'offsets': True,
+            })
+        tmp_path = self.__make_tmp()
+        if tmp_path is None:
+            return None
+        try:
+            if entry is not None:
+                # move the column files of the valid entry
+                for filename in os.listdir(path):
+                    if filename.startswith('column_'):
+                        os.rename(os.path.join(path, filename),
+                                  os.path.join(tmp_path, filename))
+            np.save(os.path.join(tmp_path, _OFFSETS_FILE),
+                    np.asarray(offsets, dtype=np.int64))
+            self.__replace_entry(tmp_path, path, meta)
+        except OSError as e:
+            LOGGER.warning('Could not write the cache entry: {}'.format(e))
+            return None
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=path)
+        return QcCacheEntry(path, meta)
+
+    def evict(self, keep=None):
+        """Removes the least recently used entries until the total
+        size of the cache is below max_size.
+        """
+        entries = self.__entries()
+        total_size = sum(size for used, size, path in entries)
+        for used, size, path in sorted(entries):
+            if total_size <= self.__max_size:
+                break
+            if path == keep:
+                continue
+            LOGGER.debug('Removing cache entry "{}"'.format(path))
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        """Removes all the entries of the cache."""
+        for used, size, path in self.__entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    def __make_tmp(self):
+        """Creates a temporary folder for writing a new entry."""
+        try:
+            os.makedirs(self.__cache_dir, exist_ok=True)
+            return tempfile.mkdtemp(dir=self.__cache_dir, suffix='.tmp')
+        except OSError as e:
+            LOGGER.warning('Could not create the cache folder: {}'.format(e))
+            return None
+
+    def __replace_entry(self, tmp_path, path, meta):
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+
+    def __entries(self):
+        """Returns a list with (last used time, size, path) of each entry."""
+        entries = []
+        try:
+            names = os.listdir(self.__cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            path = os.path.join(self.__cache_dir, name)
+            if not name.endswith('.qccache') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, filename))
+                       for filename in os.listdir(path))
+            try:
+                used = os.path.getmtime(os.path.join(path, 'meta.json'))
+            except OSError:
+                used = 0
+            entries.append((used, size, path))
+        return entries
+
+
+class QcCacheEntry(object):
+    """A valid cache entry, the columns are read through a memory map."""
+    def __init__(self, path, meta):
+        self.__path = path
+        self.__meta = meta
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def meta(self):
+        return dict(self.__meta)
+
+    @property
+    def headers(self):
+        """The headers of the cached columns, None if the entry
+        holds only the row offsets.
+        """
+        return self.__meta['headers']
+
+    @property
+    def total_rows(self):
+        return self.__meta['total_rows']
+
+    @property
+    def has_offsets(self):
+        return bool(self.__meta.get('offsets'))
+
+    @property
+    def offsets(self):
+        """Memory mapped numpy array with the row offsets or None."""
+        if not self.has_offsets:
+            return None
+        return np.load(os.path.join(self.__path, _OFFSETS_FILE), mmap_mode='r')
+
+    def column(self, index):
+        """Returns the list of the raw values of the column."""
+        return self.encoded_column(index).tolist()
+
+    def encoded_column(self, index):
+        """Returns the CategoricalColumn, or the PlainColumn, with the
+        raw values of the column.
+        """
+        if not self.total_rows:
+            return CategoricalColumn([], [])
+        with open(_levels_path(self.__path, index), 'rb') as levels_file:
+            if os.fstat(levels_file.fileno()).st_size == 0:
+                levels = ['']
+            else:
+                with mmap.mmap(levels_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    levels = str(mapped, 'utf-8').split(_SEP)
+        if not os.path.exists(_codes_path(self.__path, index)):
+            return PlainColumn(levels)
+        codes = np.load(_codes_path(self.__path, index), mmap_mode='r')
+        return CategoricalColumn(codes, levels)
+
+
+# Internal
+
+def _codes_path(path, index):
+    return os.path.join(path, 'column_{}.npy'.format(index))
+
+
+def _levels_path(path, index):
+    return os.path.join(path, 'column_{}.levels'.format(index))
+
+
+def _describe_source(source, encoding, fingerprint=None):
+    """Returns the properties that validate a cache entry."""
+    stat = os.stat(source)
+    if fingerprint is None:
+        fingerprint = _fingerprint(source, stat.st_size)
+    return {
+        'version': CACHE_VERSION,
+        'encoding': encoding,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'fingerprint': fingerprint,
+    }
+
+
+def _is_valid(meta, source, encoding, fingerprint=None):
+    """Checks the cheap properties first and then the fingerprint."""
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return False
+    if (meta.get('version') != CACHE_VERSION or
+            meta.get('encoding') != encoding or
+            meta.get('size') != stat.st_size or
+            meta.get('mtime_ns') != stat.st_mtime_ns):
+        return False
+    if fingerprint is None:
+        fingerprint = _fingerprint(source, stat.st_size)
+    return meta.get('fingerprint') == fingerprint
+
+
+def _fingerprint(source, size):
+    """Hash of the size and the whole content of the file, read in blocks."""
+    block = config.CACHE_FINGERPRINT_BLOCK
+    digest = hashlib.blake2b(str(size).encode('ascii'), digest_size=16)
+    with open(source, 'rb') as binary_file:
+        for data in iter(lambda: binary_file.read(block), b''):
+            digest.update(data)
+    return digest.hexdigest()
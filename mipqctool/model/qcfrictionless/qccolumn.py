@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+# qccolumn.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import datetime
+from array import array
+
+import numpy as np
+
+from mipqctool import config
+
+
+class CategoricalColumn(object):
+    """A dictionary encoded column. The distinct values are stored once
+    in the levels list, in the order of their first appearance, and
+    each row holds only the integer code of its value, aka the index
+    of the value in the levels.
+
+    Arguments:
+    :param codes: numpy int32 array with the code of each row
+    :param levels: list with the distinct values of the column
+    """
+    def __init__(self, codes, levels):
+        self.__codes = np.asarray(codes, dtype=np.int32)
+        self.__levels = list(levels)
+        self.__counts = None
+        self.__lookup = None
+
+    @classmethod
+    def encode(cls, values):
+        """Returns the CategoricalColumn of the given values, or a
+        PlainColumn if they have too many distinct values.
+        """
+        encoder = ColumnEncoder()
+        encoder.extend(values)
+        return encoder.column()
+
+    @property
+    def codes(self):
+        return self.__codes
+
+    @property
+    def levels(self):
+        return self.__levels
+
+    @property
+    def counts(self):
+        """numpy array with the number of rows of each level."""
+        if self.__counts is None:
+            self.__counts = np.bincount(self.__codes, minlength=len(self.__levels))
+        return self.__counts
+
+    def code(self, value):
+        """Returns the code of the given value or None if the value
+        is not among the levels.
+        """
+        if self.__lookup is None:
+            self.__lookup = {level: code for code, level in enumerate(self.__levels)}
+        return self.__lookup.get(value)
+
+    def value_codes(self, value):
+        """Returns a list with the codes of the given value."""
+        code = self.code(value)
+        return [] if code is None else [code]
+
+    def rows(self, value):
+        """Returns a numpy array with the indexes of the rows
+        with the given value, 0 is the first row.
+        """
+        code = self.code(value)
+        if code is None:
+            return np.array([], dtype=np.int64)
+        return np.flatnonzero(self.__codes == code)
+
+    def take(self, indexes):
+        """Returns a list with the values of the given row indexes,
+        0 is the first row.
+        """
+        return _object_array(self.__levels)[self.__codes[indexes]].tolist()
+
+    def tolist(self):
+        """Returns a list with the value of each row."""
+        return self.take(slice(None))
+
+    def replace(self, replacements):
+        """Returns a new CategoricalColumn with the levels of the given
+        codes replaced, levels that end up equal are merged.
+        Arguments:
+        :param replacements: dict {level code: new value}
+        """
+        encoder = ColumnEncoder(max_distinct_ratio=None)
+        mapping = encoder.extend(replacements.get(code, level)
+                                 for code, level in enumerate(self.__levels))
+        mapping = np.asarray(mapping, dtype=np.int32)
+        return CategoricalColumn(mapping[self.__codes], encoder.levels)
+
+    def __len__(self):
+        return len(self.__codes)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        return self.__levels[self.__codes[index]]
+
+
+class PlainColumn(object):
+    """A column of high cardinality that holds the value of each row,
+    with the interface of a CategoricalColumn. Each row is a level of
+    its own, so the code of a row is its index and the levels are not
+    distinct, a value may be the level of many rows.
+
+    Arguments:
+    :param values: list with the value of each row
+    """
+    def __init__(self, values):
+        self.__levels = list(values)
+        self.__codes = None
+        # {value: list with the row indexes}, built on the first lookup
+        self.__lookup = None
+
+    @property
+    def codes(self):
+        if self.__codes is None:
+            self.__codes = np.arange(len(self.__levels), dtype=np.int32)
+        return self.__codes
+
+    @property
+    def levels(self):
+        return self.__levels
+
+    @property
+    def counts(self):
+        """numpy array with the number of rows of each level."""
+        return np.ones(len(self.__levels), dtype=np.int64)
+
+    def code(self, value):
+        """Returns the code of the first row with the given value or
+        None if the value is not in the column.
+        """
+        codes = self.value_codes(value)
+        return codes[0] if codes else None
+
+    def value_codes(self, value):
+        """Returns a list with the codes of the given value."""
+        if self.__lookup is None:
+            lookup = {}
+            for code, level in enumerate(self.__levels):
+                lookup.setdefault(level, []).append(code)
+            self.__lookup = lookup
+        return self.__lookup.get(value, [])
+
+    def rows(self, value):
+        """Returns a numpy array with the indexes of the rows
+        with the given value, 0 is the first row.
+        """
+        return np.asarray(self.value_codes(value), dtype=np.int64)
+
+    def take(self, indexes):
+        """Returns a list with the values of the given row indexes,
+        0 is the first row.
+        """
+        return _object_array(self.__levels)[indexes].tolist()
+
+    def tolist(self):
+        """Returns a list with the value of each row."""
+        return list(self.__levels)
+
+    def replace(self, replacements):
+        """Returns a new PlainColumn with the values of the given
+        codes replaced.
+        Arguments:
+        :param replacements: dict {row code: new value}
+        """
+        values = list(self.__levels)
+        for code, value in replacements.items():
+            values[code] = value
+        return PlainColumn(values)
+
+    def __len__(self):
+        return len(self.__levels)
+
+    def __iter__(self):
+        return iter(self.__levels)
+
+    def __getitem__(self, index):
+        return self.__levels[index]
+
+
+class TypedColumn(object):
+    """The typed values of a column with a null mask. Integer columns
+    are int64 arrays, float columns float64 arrays, date columns
+    datetime64[D] arrays and any other type an object array.
+
+    Arguments:
+    :param values: numpy array with the value of each row, the values
+                   of the null rows are undefined
+    :param nulls: numpy bool array, True for the null rows
+    """
+    def __init__(self, values, nulls):
+        self.__values = values
+        self.__nulls = np.asarray(nulls, dtype=bool)
+
+    @classmethod
+    def from_levels(cls, codes, levels, nulls):
+        """Expands the typed levels of a dictionary encoded column.
+        Arguments:
+        :param codes: numpy array with the level code of each row
+        :param levels: list with the typed value of each level
+        :param nulls: numpy bool array, True for the null levels
+        """
+        return cls(typed_array(levels, nulls)[codes], np.asarray(nulls, dtype=bool)[codes])
+
+    @property
+    def values(self):
+        return self.__values
+
+    @property
+    def nulls(self):
+        return self.__nulls
+
+    @property
+    def not_nulls_total(self):
+        return len(self.__nulls) - int(np.count_nonzero(self.__nulls))
+
+    def __len__(self):
+        return len(self.__values)
+
+
+class ColumnEncoder(object):
+    """Builds a CategoricalColumn from values that are given in blocks,
+    so a column is encoded without holding all its raw values. When the
+    distinct values pass max_distinct_ratio of the rows, after min_rows
+    rows, the dictionary does not pay off and the values are kept as
+    they are, the column is then a PlainColumn.
+
+    Arguments:
+    :param max_distinct_ratio: max ratio of distinct values to rows of
+                               a dictionary encoded column, None for
+                               always encoding the column
+    :param min_rows: rows before the ratio is checked
+    """
+    def __init__(self, max_distinct_ratio=config.ENCODE_MAX_DISTINCT_RATIO,
+                 min_rows=config.ENCODE_PLAIN_MIN_ROWS):
+        self.__max_distinct_ratio = max_distinct_ratio
+        self.__min_rows = min_rows
+        self.__lookup = {}
+        self.__codes = array('i')
+        # the values of a plain column, None while it is encoded
+        self.__values = None
+
+    @property
+    def levels(self):
+        if self.__values is not None:
+            return self.__values
+        return list(self.__lookup)
+
+    @property
+    def plain(self):
+        """Is the column kept as plain values?"""
+        return self.__values is not None
+
+    def extend(self, values):
+        """Encodes the given values and returns their codes."""
+        if self.__values is not None:
+            start = len(self.__values)
+            self.__values.extend(values)
+            return list(range(start, len(self.__values)))
+        lookup = self.__lookup
+        setdefault = lookup.setdefault
+        # the code of a new value is the number of the levels before it
+        codes = [setdefault(value, len(lookup)) for value in values]
+        self.__codes.extend(codes)
+        self.__check_ratio()
+        return codes
+
+    def extend_encoded(self, codes, levels):
+        """Appends the rows of an encoded block of the same column."""
+        codes = np.asarray(codes, dtype=np.int32)
+        if self.__values is not None:
+            if len(codes):
+                self.__values.extend(_object_array(levels)[codes].tolist())
+            return
+        lookup = self.__lookup
+        mapping = np.asarray([lookup.setdefault(level, len(lookup)) for level in levels],
+                             dtype=np.int32)
+        if len(codes):
+            self.__codes.frombytes(mapping[codes].tobytes())
+        self.__check_ratio()
+
+    def column(self):
+        if self.__values is not None:
+            return PlainColumn(self.__values)
+        codes = np.frombuffer(self.__codes, dtype=np.int32).copy()
+        return CategoricalColumn(codes, self.levels)
+
+    def __check_ratio(self):
+        """Turns the encoded column into plain values when there
+        are too many distinct values.
+        """
+        rows = len(self.__codes)
+        if (self.__max_distinct_ratio is None or rows < self.__min_rows or
+                len(self.__lookup) <= self.__max_distinct_ratio * rows):
+            return
+        codes = np.frombuffer(self.__codes, dtype=np.int32)
+        self.__values = _object_array(list(self.__lookup))[codes].tolist()
+        self.__lookup = {}
+        self.__codes = array('i')
+
+
+def typed_array(values, nulls=None):
+    """Returns a numpy array with the given typed values, int64 for
+    integers, float64 for floats, datetime64[D] for dates and object
+    for anything else.
+    Arguments:
+    :param values: list with the typed values
+    :param nulls: numpy bool array, True for the values to ignore
+    """
+    if nulls is None:
+        nulls = np.zeros(len(values), dtype=bool)
+    present = [value for value, null in zip(values, nulls) if not null]
+    if present and all(type(value) is int for value in present):
+        fill = [0 if null else value for value, null in zip(values, nulls)]
+        try:
+            return np.asarray(fill, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif present and all(type(value) is float for value in present):
+        fill = [0.0 if null else value for value, null in zip(values, nulls)]
+        return np.asarray(fill, dtype=np.float64)
+    elif present and all(type(value) is datetime.date for value in present):
+        fill = [None if null else value for value, null in zip(values, nulls)]
+        return np.asarray(fill, dtype='datetime64[D]')
+    return _object_array(values)
+
+
+# Internal
+
+def _object_array(values):
+    """numpy object array, without numpy looking into sequence values."""
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    return result
@@ -13,8 +13,9 @@ from tableschema.config import DEFAULT_FIELD_FORMAT
 from mipqctool import config
 from mipqctool.model import qctypes
 from mipqctool.exceptions import DataTypeError, ConstraintViolationError
-from mipqctool.config import LOGGER
+from mipqctool.config import LOGGER, VALID, DATATYPE
 from mipqctool.helpers import expand_qcfield_descriptor
+from mipqctool.model.qcfrictionless.qcvalidator import compile_validator
 
 config.debug(True)
 
@@ -39,6 +40,8 @@ class QcField(Field):
         self._Field__descriptor = descriptor
         self.__suggestd_function = self.__get_suggestd_function()
         self.__suggestc_function = self.__get_suggestc_function()
+        self.__validate_function = self.__get_validate_function()
+        self.__validator = compile_validator(self)
 
     @property
     def miptype(self):
@@ -48,18 +51,80 @@ class QcField(Field):
     def missing_values(self):
         return self._Field__missing_values
 
+    @property
+    def outlier_method(self):
+        """The outlier method of a numerical field, the outlierMethod
+        property of the descriptor or config.DEFAULT_OUTLIER_METHOD.
+        """
+        return self.descriptor.get('outlierMethod', config.DEFAULT_OUTLIER_METHOD)
+
+    @property
+    def outlier_threshold(self):
+        """The outlierThreshold property of the descriptor or None, then
+        the threshold of the report is used.
+        """
+        return self.descriptor.get('outlierThreshold')
+
+    @property
+    def validator(self):
+        """The compiled validator of the field, a function that returns
+        a tuple (result code, casted value) for a raw value.
+        """
+        return self.__validator
+
     def validate(self, value):
-        type_error_msg = ('Field "{field.name}" can\'t cast value "{value}" '
-                          'for type "{field.type}" with format "{field.format}"'
-                          ).format(field=self, value=value)
+        result = self.__validator(value)[0]
+        if result == VALID:
+            return value
+        # only an invalid value is casted again for the error message
         try:
             self.cast_value(value, constraints=True)
-            return value
+            message = 'Field "{}" value "{}" is not valid'.format(self.name, value)
         except CastError as e:
-            if str(e) == type_error_msg:
-                raise DataTypeError(str(e))
-            else:
-                raise ConstraintViolationError(str(e))
+            message = str(e)
+        if result == DATATYPE:
+            raise DataTypeError(message)
+        else:
+            raise ConstraintViolationError(message)
+
+    def validate_values(self, values):
+        """Validates a list of values at once, the values are casted
+        and checked with numpy and only the few values that the batch
+        validator can't decide are validated with the compiled validator.
+
+        Arguments:
+        :param values: list with string values
+        :return: tuple with the numpy bool masks of the values with
+                 datatype violations and of the values with constraint
+                 violations
+        """
+        cast = self._Field__cast_function
+        # the constraints are already casted for the type of the field
+        constraints = {name: check.args[0]
+                       for name, check in self._Field__check_functions.items()}
+        return self.__validate_function(values,
+                                        type=self.type,
+                                        format=cast.args[0],
+                                        cast_options=cast.keywords,
+                                        missing_values=self._Field__missing_values,
+                                        constraints=constraints,
+                                        fallback=self.__validator)
+
+    def cast_floats(self, values):
+        """Casts a list of raw values of a number field straight into a
+        numpy float64 array, instead of the Decimal values of cast_value.
+        The values are not checked against the constraints.
+
+        Arguments:
+        :param values: list with string values
+        :return: numpy float64 array, nan for the missing values and
+                 for the values that are not numbers
+        """
+        cast_options = self._Field__cast_function.keywords
+        return qctypes.parse_numbers(values,
+                                     missing_values=self._Field__missing_values,
+                                     suffix=self.descriptor.get('suffix'),
+                                     **cast_options)
 
     def suggestc(self, value):
         """Returns a suggestion in case of a constraint violation
@@ -93,9 +158,23 @@ class QcField(Field):
             suggestedfinal = self.suggestc(suggested)
         return suggestedfinal
 
+    def __reduce__(self):
+        # the compiled validator can't be pickled, so the field is built
+        # again from its descriptor, ie in the worker processes
+        return (_build_qcfield, (self.descriptor, self.missing_values))
+
     # Private
     def __get_suggestd_function(self):
         return getattr(qctypes, 'suggestd_%s' % self.miptype)
 
     def __get_suggestc_function(self):
         return getattr(qctypes, 'suggestc_%s' % self.miptype)
+
+    def __get_validate_function(self):
+        return getattr(qctypes, 'validate_%s' % self.miptype)
+
+
+# Internal
+
+def _build_qcfield(descriptor, missing_values):
+    return QcField(descriptor, missing_values=missing_values)
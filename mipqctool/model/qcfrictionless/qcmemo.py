@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# qcmemo.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+import numpy as np
+from mipqctool import config
+from mipqctool.config import VALID, DATATYPE, CONSTRAINT
+from mipqctool.model.qcfrictionless.qcvalidator import compile_validator
+
+
+class ValueMemo(object):
+    """Memo of the validation status, the casted value and the suggested
+    correction of the distinct raw values of a column, so each distinct
+    value is validated, casted and corrected only once. When the memo is
+    full the least recently used values are evicted, so columns with many
+    distinct values, ie free text, don't hold all of them.
+
+    Arguments:
+    :param field: QcField object, a tableschema Field is enough for
+                  validate() and cast()
+    :param maxsize: max number of distinct values in the memo
+    """
+    def __init__(self, field, maxsize=config.MEMO_MAX_VALUES):
+        self.__field = field
+        self.__validator = getattr(field, 'validator', None) or compile_validator(field)
+        self.__maxsize = maxsize
+        # dict {raw value: [status, (casted value,), suggestion]}
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def field(self):
+        return self.__field
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    def statuses(self, values):
+        """Returns a numpy int8 array with the validation status of each
+        of the given values. The values that are not in the memo are
+        validated all together with QcField.validate_values.
+        """
+        lookup = {}
+        new_values = []
+        for value in dict.fromkeys(values):
+            status = self.__get(value, _STATUS)
+            if status is None:
+                new_values.append(value)
+            else:
+                lookup[value] = status
+        if new_values:
+            datatype, constraint = self.__field.validate_values(new_values)
+            new_statuses = np.full(len(new_values), VALID, dtype=np.int8)
+            new_statuses[datatype] = DATATYPE
+            new_statuses[constraint] = CONSTRAINT
+            for value, status in zip(new_values, new_statuses.tolist()):
+                lookup[value] = status
+                self.__set(value, _STATUS, status)
+        return np.fromiter((lookup[value] for value in values), dtype=np.int8,
+                           count=len(values))
+
+    def validate(self, value):
+        """Returns a tuple (result code, casted value) of the compiled
+        validator of the field for the given value.
+        """
+        entry = self.__entries.get(value)
+        if entry is not None and entry[_CASTED] is not None:
+            self.__hits += 1
+            self.__entries.move_to_end(value)
+            return entry[_STATUS], entry[_CASTED][0]
+        self.__misses += 1
+        status, casted_value = self.__validator(value)
+        self.__set(value, _STATUS, status)
+        # in a tuple, since the casted value of a missing value is None
+        self.__set(value, _CASTED, (casted_value,))
+        return status, casted_value
+
+    def cast(self, value):
+        """Returns the casted value like Field.cast_value, an invalid
+        value raises the CastError of Field.cast_value.
+        """
+        status, casted_value = self.validate(value)
+        if status != VALID:
+            return self.__field.cast_value(value)
+        return casted_value
+
+    def suggest(self, value, status):
+        """Returns the suggested correction of a value with the given
+        violation status, DATATYPE or CONSTRAINT.
+        """
+        suggested_value = self.__get(value, _SUGGESTION)
+        if suggested_value is None:
+            if status == DATATYPE:
+                suggested_value = self.__field.suggestd(value)
+            else:
+                suggested_value = self.__field.suggestc(value)
+            self.__set(value, _SUGGESTION, suggested_value)
+        return suggested_value
+
+    def clear(self):
+        self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, value):
+        return value in self.__entries
+
+    def __getstate__(self):
+        # the compiled validator can't be pickled, it is compiled again
+        state = self.__dict__.copy()
+        del state['_ValueMemo__validator']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__validator = getattr(self.__field, 'validator', None) or compile_validator(self.__field)
+
+    # Private
+    def __get(self, value, slot):
+        entry = self.__entries.get(value)
+        if entry is None or entry[slot] is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        self.__entries.move_to_end(value)
+        return entry[slot]
+
+    def __set(self, value, slot, result):
+        entry = self.__entries.get(value)
+        if entry is None:
+            entry = [None, None, None]
+            self.__entries[value] = entry
+            if len(self.__entries) > self.__maxsize:
+                self.__entries.popitem(last=False)
+        entry[slot] = result
+
+
+# Internal
+
+# slots of a memo entry
+_STATUS = 0
+_CASTED = 1
+_SUGGESTION = 2
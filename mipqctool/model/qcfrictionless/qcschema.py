@@ -5,7 +5,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
-from collections import namedtuple
+from collections import namedtuple, Counter
 
 import re
 
@@ -48,6 +48,13 @@ class QcSchema(Schema):
         """
         return [field.name for field in self.fields]
 
+    @property
+    def validators(self):
+        """dict {field name: compiled validator of the field}, each
+        validator returns a tuple (result code, casted value).
+        """
+        return {field.name: field.validator for field in self.fields if field}
+
     @property
     def invalid_header_names(self):
         """Returns header names containg invalid characters"""
@@ -75,6 +82,33 @@ class QcSchema(Schema):
         elif not isinstance(headers, list):
             headers = []
 
+        LOGGER.info('{} of sample rows are used for table schema inference'.format(len(rows)))
+        return self.infer_counts(_count_values(rows, len(headers)), headers,
+                                 confidence=confidence,
+                                 maxlevels=maxlevels,
+                                 na_empty_strings_only=na_empty_strings_only)
+
+    @staticmethod
+    def guess_qctype(value, na_empty_strings_only=False):
+        """Returns the guessed (name, pattern, priority) Result of a stripped value."""
+        return _QcTypeGuesser().infer(value, na_empty_strings_only=na_empty_strings_only)
+
+    def infer_counts(self, value_counts, headers,
+                     confidence=0.75, maxlevels=10,
+                     na_empty_strings_only=False, type_counts=None):
+        """Infers the schema from the counts of the values of each column,
+        the result is the same as infering it from the rows with these values.
+        Arguments:
+        :param value_counts: list with a Counter {raw value: rows} per column
+        :param headers: list with the headers
+        :param confidence: float how many casting errors are allowed
+        :param maxlevels: number of levels or enumeration for nominal qctypes
+        :param na_empty_strings_only: boolean to infer only empty strings as NAs
+        :param type_counts: optional list with a Counter {Result: rows} per column
+                            with the guessed qctypes of the values that are
+                            not counted in value_counts, see guess_qctype
+        :returns: dict Table Schema descriptor
+        """
         if len(headers) > 0:
             self.__check_header_names(headers)
 
@@ -85,40 +119,31 @@ class QcSchema(Schema):
         type_matches = {}
         unique_values = {}
         missingvalues = set()
+        # the guessed type of each stripped value
+        guessed = {}
         for header in headers:
             descriptor['fields'].append({'name': header})
-        LOGGER.info('{} of sample rows are used for table schema inference'.format(len(rows)))
-        for row_number, row in enumerate(rows):
-            # Normalize rows with invalid dimensions for sanity
-            row_length = len(row)
-            headers_length = len(headers)
-            if row_length > headers_length:
-                row = row[:len(headers)]
-            if row_length < headers_length:
-                diff = headers_length - row_length
-                fill = [''] * diff
-                row = row + fill
+        for index, counts in enumerate(value_counts):
             # build a column-wise lookup of type matches
-            for index, value in enumerate(row):
+            for value, rows in counts.items():
                 # remove leading and trailing whitespacing
                 value = value.strip()
-                rv = guesser.infer(value, na_empty_strings_only=na_empty_strings_only)
+                rv = guessed.get(value)
+                if rv is None:
+                    rv = guesser.infer(value, na_empty_strings_only=na_empty_strings_only)
+                    guessed[value] = rv
                 name = rv[0]
                 pattern = rv[1]
                 # collect unique values for possible nominal variable
                 if pattern == 'text' or name == 'integer':
-                    if unique_values.get(index):
-                        unique_values[index].add(value)
-                    else:
-                        unique_values[index] = set()
-                        unique_values[index].add(value)
+                    unique_values.setdefault(index, set()).add(value)
                 # collect the nans
                 elif pattern == 'nan':
                     missingvalues.add(value)
-                if type_matches.get(index):
-                    type_matches[index].append(rv)
-                else:
-                    type_matches[index] = [rv]
+                type_matches.setdefault(index, Counter())[rv] += rows
+        for index, counts in enumerate(type_counts or []):
+            if counts:
+                type_matches.setdefault(index, Counter()).update(counts)
         # choose a type/format for each column based on the matches
         for index, results in type_matches.items():
             uniques = unique_values.get(index)
@@ -249,12 +274,17 @@ class _QcTypeGuesser(object):
 class _QcTypeResolver(object):
     def get(self, results, uniques, maxlevels, confidence=0.75):
         """Guess the field type and returns a field descriptor dict.
+        Arguments:
+        :param results: list with the guessed Result of each value
+                        or Counter {Result: rows} of the guessed types
         """
-        variants = set(results)
+        if not isinstance(results, Counter):
+            results = Counter(results)
         # only one candidate... that's easy.
-        if len(variants) == 1:
-            name = results[0].name
-            pattern = results[0].pattern
+        if len(results) == 1:
+            result = next(iter(results))
+            name = result.name
+            pattern = result.pattern
             describe = getattr(qctypes, 'describe_%s' % name)
             # all are null, special case, infer it as text
             if pattern == 'nan':
@@ -268,16 +298,10 @@ class _QcTypeResolver(object):
                               uniques=uniques,
                               maxlevels=maxlevels)
         else:
-            counts = {}
             # {(name, pattern, priority):counts}
-            for result in results:
-                # filter out the NANs
-                if result.pattern == 'nan':
-                    continue
-                elif counts.get(result):
-                    counts[result] += 1
-                else:
-                    counts[result] = 1
+            # filter out the NANs
+            counts = {result: rows for result, rows in results.items()
+                      if result.pattern != 'nan'}
 
             # tuple representation of 'counts' dict sorted by values
             # outputs a sorted list of tuples [(result:counts)]
@@ -303,6 +327,21 @@ class _QcTypeResolver(object):
                           maxlevels=maxlevels)
         return rv
 
+
+def _count_values(rows, width):
+    """Returns a list with a Counter {raw value: rows} per column.
+    Rows with invalid dimensions are normalized, longer rows are
+    truncated and shorter ones are filled with empty strings.
+    """
+    value_counts = [Counter() for _ in range(width)]
+    for row in rows:
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        for counts, value in zip(value_counts, row):
+            counts[value] += 1
+    return value_counts
+
+
 def _checkInt(str):
     try:
         int(str)
@@ -6,48 +6,82 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import io
 import os
+import codecs
 import re
-from csv import DictReader, Sniffer
-from collections import OrderedDict
+import csv
+import mmap
+import multiprocessing
+from itertools import islice
+from collections import OrderedDict, Counter
+from urllib.parse import urlparse
 
+import numpy as np
 from tableschema import Table
 
+from mipqctool import config
+from mipqctool.config import LOGGER
 from mipqctool.model.qcfrictionless import QcSchema
+from mipqctool.model.qcfrictionless.qccache import QcCache
+from mipqctool.model.qcfrictionless.qccolumn import ColumnEncoder, PlainColumn
 from mipqctool.exceptions import QCToolException
+from mipqctool.helpers.csvscan import count_records, index_records
+from mipqctool.helpers.compression import detect_compression, open_text
+
+# separator of the values of the columns sent by the parsing processes
+_SEP = '\x00'
 
 
 class QcTable(Table):
     """This class is designed for csv files only.
     """
-    def __init__(self, source, schema, **kargs):
+    def __init__(self, source, schema, headers_only=False, cache=None, workers=1, **kargs):
+        """Arguments:
+        :param source: csv file path
+        :param schema: QcSchema object, dict descriptor or None
+        :param headers_only: if True only the headers of the file are read,
+                             any access to the data raises QCToolException
+        :param cache: QcCache object for storing the parsed columns, or True
+                      for using the default cache, None for no caching
+        :param workers: number of processes for parsing large files,
+                        None for using all the cpus
+        """
         super().__init__(source, **kargs)
         self.__source = source
         self.__filename = os.path.basename(source)
         self.__headers_4_mipmap = OrderedDict()
-        # if csv file get headers (tabulator aka csv file)
-        if not self._Table__storage:
-            # used encoding utf-8-sig to remove the byte order mask (BOM)
-            with open(source, 'r', encoding='utf-8-sig') as csv_file:
-                # find the dialect of the csv file
-                try:
-                    dialect = Sniffer().sniff(csv_file.read(1024))
-                except:
-                    dialect = 'excel'
-                # reset the seeker to the start of the file
-                csv_file.seek(0)
-                reader = DictReader(csv_file, dialect=dialect)
-                self.__actual_headers = reader.fieldnames
-                # reset the seeker to the start of the file
-                csv_file.seek(0)
-                # assuming the first row is dedicated for the headers
-                total_rows = len(list(reader.reader)) - 1 
-                if total_rows >= 0:
-                    self.__total_rows = total_rows
-                # case there are no rows 
-                else:
-                    self.__total_rows = 0
-        else:
+        # columnar store with the raw values, filled on the first access
+        self.__columns = None
+        self.__dialect = None
+        self.__total_rows = None
+        self.__row_offsets = None
+        self.__headers_only = headers_only
+        self.__workers = workers or os.cpu_count() or 1
+        if cache is True:
+            cache = QcCache()
+        self.__cache = cache or None
+        self.__cache_entry = None
+        # the file is hashed at most once for the cache
+        self.__fingerprint = None
+        self.__cache_missed = False
+        self.__encoding = kargs.get('encoding') or config.CSV_ENCODING
+        # local csv files are read with the native reader, remote
+        # sources and storages go through tabulator
+        self.__native = not self._Table__storage and _is_local_file(source)
+        # compressed files are decompressed while reading
+        self.__compression = detect_compression(source) if self.__native else None
+        if self.__native:
+            try:
+                self.__probe_native()
+            except UnicodeDecodeError:
+                LOGGER.warning('Could not decode "{}" as {}, falling back '
+                               'to tabulator'.format(source, self.__encoding))
+                self.__native = False
+        if not self.__native and not self._Table__storage:
+            with self._Table__stream as stream:
+                self.__actual_headers = stream.headers
+        elif self._Table__storage:
             self.__actual_headers = None
 
         if self.__actual_headers:
@@ -75,12 +109,46 @@ class QcTable(Table):
 
     @property
     def raw_rows(self):
-        return [row for row in self.iter(cast=False)]
+        return [row for row in self.__iter_rows()]
+
+    @property
+    def compression(self):
+        """Compression format of the file or None"""
+        return self.__compression
+
+    @property
+    def native(self):
+        """True if the file is read with the native csv reader"""
+        return self.__native
     
     @property
     def total_rows(self):
+        """Number of data rows, counted on the first access."""
+        if self.__total_rows is None:
+            self.__total_rows = self.__count_rows()
         return self.__total_rows
 
+    @property
+    def row_offsets(self):
+        """numpy int64 array with the byte offsets of the data rows,
+        the data row i spans the bytes row_offsets[i]:row_offsets[i+1].
+        The index is built with one scan of the file on the first
+        access and it is stored in the cache, if one is used.
+        """
+        if self.__row_offsets is None:
+            self.__row_offsets = self.__build_row_offsets()
+        return self.__row_offsets
+
+    @property
+    def workers(self):
+        """Number of processes used for parsing the file"""
+        return self.__workers
+
+    @property
+    def headers_only(self):
+        """True if the table was opened for reading only the headers"""
+        return self.__headers_only
+
     @property
     def with_metadata(self):
         """True if a schema metadata json is used"""
@@ -108,21 +176,70 @@ class QcTable(Table):
         """Returns header names containg invalid characters"""
         return self._Table__schema.invalid_header_names
 
-    def infer(self, limit=100, maxlevels=10, confidence=0.75, na_empty_strings_only=False):
+    def infer(self, limit=100, maxlevels=10, confidence=0.75, na_empty_strings_only=False,
+              whole_file=False):
         """Tries to infer the table schema only for csv file.
         Arguments:
-        :param limit: number of rows to be used for infer
+        :param limit: number of rows to be used for infer, not used in whole file mode
         :param maxlevels: number of levels or enumeration for nominal qctypes
         :param confidence: float how many casting errors are allowed
                            (as a ratio, between 0 and 1)
         :param na_empty_strings_only: boolean to infer only empty strings as NAs
+        :param whole_file: if True all the rows are read in one pass, the values
+                           of each column are counted and the schema is inferred
+                           from the counts, for columns with too many distinct values
+                           the guessed qctypes of the values are counted instead
+                           or, with a cache, the values of the cached columns
+                           are counted
 
         :returns: dict Table Schema descriptor
         """
+        self.__check_body_access()
         if self._Table__schema is None or self._Table__headers is None:
 
+            # Infer (whole file, native csv reader or tabulator)
+            if whole_file and not self._Table__storage:
+                if self.__native:
+                    headers = self.__native_headers()
+                else:
+                    with self._Table__stream as stream:
+                        headers = stream.headers
+                if self._Table__schema is None and self.__cache and self.__native:
+                    # the columns are counted from the cache, or parsed
+                    # once and cached for the next runs
+                    value_counts = [self.__column_counts(index)
+                                    for index in range(len(headers))]
+                    type_counts = None
+                elif self._Table__schema is None:
+                    value_counts, type_counts = self.__count_values(headers,
+                                                                    na_empty_strings_only)
+                if self._Table__schema is None:
+                    self._Table__schema = QcSchema()
+                    self._Table__schema.infer_counts(value_counts,
+                                                     headers=headers,
+                                                     maxlevels=maxlevels,
+                                                     confidence=confidence,
+                                                     na_empty_strings_only=na_empty_strings_only,
+                                                     type_counts=type_counts)
+                if self._Table__headers is None:
+                    self._Table__headers = headers
+
+            # Infer (native csv reader)
+            elif self.__native:
+                headers = self.__native_headers()
+                if self._Table__schema is None:
+                    self._Table__schema = QcSchema()
+                    sample = list(islice(self.__iter_rows(), limit))
+                    self._Table__schema.infer(sample,
+                                              headers=headers,
+                                              maxlevels=maxlevels,
+                                              confidence=confidence,
+                                              na_empty_strings_only=na_empty_strings_only)
+                if self._Table__headers is None:
+                    self._Table__headers = headers
+
             # Infer (tabulator aka csv file)
-            if not self._Table__storage:
+            elif not self._Table__storage:
                 with self._Table__stream as stream:
                     if self._Table__schema is None:
                         self._Table__schema = QcSchema()
@@ -142,15 +259,434 @@ class QcTable(Table):
         return self._Table__schema.descriptor
 
     def column_values(self, name):
-        """Return a list of all values of the given column."""
+        """Return a list of all values of the given column.
+
+        The dataset is parsed only once, on the first call, and
+        kept in the table's columnar store.
+        """
+        return self.encoded_column(name).tolist()
+
+    def encoded_column(self, name):
+        """Return the CategoricalColumn with the values of the given column,
+        each distinct value is stored once and the rows hold integer codes.
+        The column is shared with the table's columnar store.
+        """
         try:
             column_index = self.actual_headers.index(name)
         except ValueError:
             raise QCToolException('"{}" is not a column name among headers.'.format(name))
 
-        return [row[column_index] for row in self.raw_rows]
+        return self.__column(column_index)
+
+    @property
+    def columns(self):
+        """List with the raw values of each column in headers order."""
+        return [self.__column(index).tolist()
+                for index in range(len(self.actual_headers or []))]
+
+    def fetch_rows(self, rows):
+        """Return the raw values of the given rows, read straight from
+        a memory map of the file with the help of the row offsets index.
+
+        Arguments:
+        :param rows: list with row numbers, 1 is the first data row
+                     as in the row numbers of the reports
+        :returns: list with the raw values of each row
+        """
+        offsets = self.row_offsets
+        total_rows = len(offsets) - 1
+        result = []
+        if total_rows <= 0:
+            if rows:
+                raise QCToolException('Row {} is out of range.'.format(rows[0]))
+            return result
+        with open(self.__source, 'rb') as binary_file:
+            with mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for row in rows:
+                    if not 1 <= row <= total_rows:
+                        raise QCToolException('Row {} is out of range.'.format(row))
+                    text = mapped[offsets[row - 1]:offsets[row]].decode(self.__encoding)
+                    # translate newlines like the text mode reader of the columns
+                    reader = csv.reader(io.StringIO(text, newline=None), dialect=self.__dialect)
+                    result.append(next(reader, []))
+        return result
+
+    def fetch_row(self, row):
+        """Return the raw values of the given row, 1 is the first data row."""
+        return self.fetch_rows([row])[0]
+
+    def iter_column_chunks(self, chunk_rows):
+        """Iterate over the dataset in blocks of rows, without keeping
+        the whole dataset in memory.
+
+        Arguments:
+        :param chunk_rows: max number of rows of each block
+        :returns: generator of tupples (row number of the first row
+                  of the block, list with the raw values of each column)
+        """
+        if chunk_rows < 1:
+            raise QCToolException('The chunk rows must be a positive number.')
+        width = len(self.actual_headers or [])
+        rows = self.__iter_rows()
+        if self.__native and self._Table__headers is None:
+            self._Table__headers = self.__native_headers()
+        start_row = 1
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            yield start_row, _transpose(chunk, width)
+            start_row += len(chunk)
+
+    def clear_columns(self):
+        """Release the columnar store, next access will re-parse the file."""
+        self.__columns = None
+
+    def __column(self, index):
+        if self.__columns is None:
+            if self.__cached() is not None:
+                # columns are read from the cache one by one on demand
+                self.__columns = [None] * len(self.actual_headers)
+            else:
+                self.__columns = self.__load_columns()
+                self.__store_cache()
+        if self.__columns[index] is None:
+            self.__columns[index] = self.__cached().encoded_column(index)
+        return self.__columns[index]
+
+    def __column_counts(self, index):
+        """Counter {raw value: rows} of the column."""
+        column = self.__column(index)
+        if isinstance(column, PlainColumn):
+            return Counter(column.levels)
+        return Counter({level: int(rows) for level, rows
+                        in zip(column.levels, column.counts) if rows})
+
+    def __cached(self):
+        """Returns the valid cache entry of the file or None, a
+        missing or stale entry is looked up only once.
+        """
+        if (self.__cache_entry is None and self.__cache and self.__native and
+                not self.__cache_missed):
+            self.__check_body_access()
+            entry = self.__cache.load(self.__source, self.__encoding, self.__fingerprint)
+            if entry is not None:
+                self.__fingerprint = entry.meta['fingerprint']
+            if entry is not None and entry.headers == self.actual_headers:
+                LOGGER.info('Using the cached values of "{}"'.format(self.__filename))
+                self.__cache_entry = entry
+            else:
+                self.__cache_missed = True
+        return self.__cache_entry
+
+    def __cache_fingerprint(self):
+        """The fingerprint of the file, computed once on the first use."""
+        if self.__fingerprint is None:
+            self.__fingerprint = self.__cache.fingerprint(self.__source)
+        return self.__fingerprint
+
+    def __store_cache(self):
+        if self.__cache and self.__native and self.__columns:
+            self.__cache_entry = self.__cache.store(self.__source,
+                                                    self.__encoding,
+                                                    self.actual_headers,
+                                                    self.__columns,
+                                                    self.__cache_fingerprint())
+
+    def __load_columns(self):
+        """Parse the dataset in one pass and transpose it into dictionary
+        encoded columns. Rows shorter than the headers are padded with
+        empty strings and extra trailing cells are ignored.
+        """
+        width = len(self.actual_headers or [])
+        columns = None
+        if self.__parallel():
+            try:
+                columns = self.__load_columns_parallel(width)
+            except UnicodeDecodeError:
+                LOGGER.warning('Could not decode "{}" as {} in parallel, '
+                               'parsing it serially'.format(self.__source, self.__encoding))
+        if columns is None:
+            columns = _encode(self.__iter_rows(), width)
+        if self.__native and self._Table__headers is None:
+            self._Table__headers = self.__native_headers()
+        return columns
+
+    def __count_values(self, headers, na_empty_strings_only=False):
+        """Counts the values of each column in one pass over the file.
+        Each Counter keeps at most config.INFER_MAX_DISTINCT values, the
+        values of a column that exceeds it are guessed one by one and
+        the rows of each guessed qctype are counted instead, the missing
+        values are always counted so they end in the missingValues.
+        :returns: tuple with a Counter {raw value: rows} per column and
+                  a Counter {guessed qctype: rows} per column
+        """
+        max_distinct = config.INFER_MAX_DISTINCT
+        width = len(headers)
+        value_counts = [Counter() for _ in range(width)]
+        type_counts = [Counter() for _ in range(width)]
+        total_rows = 0
+        for row in self.__iter_rows():
+            if len(row) < width:
+                row = row + [''] * (width - len(row))
+            for counts, types, value in zip(value_counts, type_counts, row):
+                if value in counts or len(counts) < max_distinct:
+                    counts[value] += 1
+                    continue
+                guessed = QcSchema.guess_qctype(value.strip(), na_empty_strings_only)
+                if guessed.pattern == 'nan':
+                    counts[value] += 1
+                else:
+                    types[guessed] += 1
+            total_rows += 1
+        LOGGER.info('{} rows are used for table schema inference'.format(total_rows))
+        for header, types in zip(headers, type_counts):
+            if types:
+                LOGGER.info('Column "{}" has more than {} distinct values, the guessed '
+                            'qctypes of the rest are counted'.format(header, max_distinct))
+        return value_counts, type_counts
+
+    def __parallel(self):
+        """Large local files are parsed in parallel if workers > 1."""
+        if self.__workers < 2 or not self.__native or self.__compression:
+            return False
+        if not _is_scannable(self.__dialect, self.__encoding):
+            return False
+        return os.path.getsize(self.__source) >= config.PARSE_PARALLEL_MIN_SIZE
+
+    def __load_columns_parallel(self, width):
+        """Split the file in byte ranges aligned to the row offsets and
+        parse them in a pool of processes. The columns of the ranges are
+        joined in the file order, so the row numbers are the same as
+        in the serial parsing.
+        """
+        offsets = self.row_offsets
+        total_rows = len(offsets) - 1
+        splits = min(self.__workers * config.PARSE_SPLITS_PER_WORKER, max(total_rows, 1))
+        bounds = np.linspace(0, total_rows, splits + 1).astype(np.int64)
+        dialect = _dialect_params(self.__dialect)
+        ranges = [(self.__source, int(offsets[start]), int(offsets[end]),
+                   self.__encoding, dialect, width)
+                  for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+        encoders = [ColumnEncoder() for _ in range(width)]
+        with multiprocessing.Pool(min(self.__workers, len(ranges) or 1)) as pool:
+            for range_columns in pool.imap(_parse_range, ranges):
+                for encoder, (codes, levels) in zip(encoders, range_columns):
+                    if isinstance(levels, str):
+                        levels = levels.split(_SEP)
+                    if codes is None:
+                        # plain values of a high cardinality column
+                        encoder.extend(levels)
+                    else:
+                        encoder.extend_encoded(np.frombuffer(codes, dtype=np.int32), levels)
+        return [encoder.column() for encoder in encoders]
+
+    def __probe_native(self):
+        """Find the dialect and the headers, the body is not read."""
+        # used encoding utf-8-sig to remove the byte order mask (BOM)
+        with self.__open() as csv_file:
+            # find the dialect of the csv file, in headers only mode
+            # only the first line is used
+            if self.__headers_only:
+                sample_lines = 1
+            else:
+                sample_lines = config.CSV_SAMPLE_LINES
+            self.__dialect = _sniff_dialect(csv_file, sample_lines)
+        # read the headers from the start of the file, compressed
+        # streams can not seek
+        with self.__open() as csv_file:
+            reader = csv.reader(csv_file, dialect=self.__dialect)
+            self.__actual_headers = next(reader, None)
+
+    def __build_row_offsets(self):
+        self.__check_body_access()
+        # the offsets of a compressed file can not be used for seeking
+        if (not self.__native or self.__compression or
+                not _is_scannable(self.__dialect, self.__encoding)):
+            raise QCToolException('Row offsets index is not supported for "{}".'
+                                  .format(self.__filename))
+        entry = self.__cache_entry
+        if entry is None and self.__cache:
+            # the same fingerprint validates the entry and stores the offsets
+            entry = self.__cache.load(self.__source, self.__encoding,
+                                      self.__cache_fingerprint())
+        if entry is not None and entry.has_offsets:
+            return entry.offsets
+        try:
+            offsets = index_records(self.__source, self.__dialect)
+        except OSError as e:
+            raise QCToolException('Could not read "{}": {}'.format(self.__source, e))
+        if len(offsets) == 0:
+            # empty file, there is not even a headers row
+            offsets = np.zeros(1, dtype=np.int64)
+        if self.__cache:
+            self.__cache.store_offsets(self.__source, self.__encoding, offsets,
+                                       self.__cache_fingerprint())
+        return offsets
+
+    def __count_rows(self):
+        """Count the rows, assuming the first row is dedicated for the headers."""
+        self.__check_body_access()
+        # the cheap paths first, the cache lookup hashes the whole file
+        if self.__cache_entry is not None:
+            return self.__cache_entry.total_rows
+        if self.__row_offsets is not None:
+            return len(self.__row_offsets) - 1
+        if self.__columns is not None:
+            return len(self.__columns[0]) if self.__columns else 0
+        if self.__native and _is_scannable(self.__dialect, self.__encoding):
+            try:
+                records = count_records(self.__source, self.__dialect, self.__compression)
+            except OSError as e:
+                raise QCToolException('Could not read "{}": {}'.format(self.__source, e))
+        elif self.__cached() is not None:
+            return self.__cached().total_rows
+        else:
+            records = sum(1 for _ in self.__iter_rows()) + 1
+        # case there are no rows
+        return max(records - 1, 0)
+
+    def __check_body_access(self):
+        if self.__headers_only:
+            raise QCToolException('"{}" is opened only for reading the headers.'
+                                  .format(self.__filename))
+
+    def __iter_rows(self):
+        """Iterate over the raw rows of the dataset, headers excluded."""
+        self.__check_body_access()
+        if not self.__native:
+            yield from self.iter(cast=False)
+            return
+        yielded = 0
+        try:
+            with self.__open() as csv_file:
+                reader = csv.reader(csv_file, dialect=self.__dialect)
+                # skip the headers row
+                next(reader, None)
+                for row in reader:
+                    yield row
+                    yielded += 1
+        except UnicodeDecodeError:
+            LOGGER.warning('Could not decode "{}" as {}, falling back '
+                           'to tabulator'.format(self.__source, self.__encoding))
+            self.__native = False
+            yield from islice(self.iter(cast=False), yielded, None)
+
+    def __open(self):
+        if self.__compression:
+            return open_text(self.__source, self.__encoding, self.__compression)
+        return open(self.__source, 'r', encoding=self.__encoding,
+                    buffering=config.CSV_READ_BUFFER)
+
+    def __native_headers(self):
+        """Headers as tabulator returns them, aka stripped."""
+        return [header.strip() for header in self.__actual_headers or []]
 
     def __create_headers_4_mipmap(self):
         regexp = r'[`~!@#$%^*&\-+=\s\{\}\[\]\<\>\./\\:;?\(\)\']'
         for header in self.actual_headers:
             self.__headers_4_mipmap[header] = re.sub(regexp, '_', header)
+
+
+# Internal
+
+def _is_local_file(source):
+    if not isinstance(source, str):
+        return False
+    if urlparse(source).scheme in config.REMOTE_SCHEMES:
+        return False
+    return os.path.isfile(source)
+
+
+def _transpose(rows, width):
+    """Transpose rows into width columns. Rows shorter than width are
+    padded with empty strings and extra trailing cells are ignored.
+    """
+    columns = [[] for _ in range(width)]
+    appenders = [column.append for column in columns]
+    for row in rows:
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        for append, value in zip(appenders, row):
+            append(value)
+    return columns
+
+
+def _encode(rows, width):
+    """Transpose rows into width dictionary encoded columns, the rows
+    are transposed in blocks so only the codes of the rows are kept.
+    The high cardinality columns are kept as PlainColumn.
+    """
+    encoders = [ColumnEncoder() for _ in range(width)]
+    rows = iter(rows)
+    while True:
+        block = list(islice(rows, config.ENCODE_BLOCK_ROWS))
+        if not block:
+            break
+        for encoder, column in zip(encoders, _transpose(block, width)):
+            encoder.extend(column)
+    return [encoder.column() for encoder in encoders]
+
+
+def _dialect_params(dialect):
+    """The csv format parameters of a dialect, that can be pickled."""
+    return {
+        'delimiter': dialect.delimiter,
+        'quotechar': dialect.quotechar,
+        'escapechar': dialect.escapechar,
+        'doublequote': dialect.doublequote,
+        'skipinitialspace': dialect.skipinitialspace,
+        'quoting': dialect.quoting,
+        'lineterminator': dialect.lineterminator,
+    }
+
+
+def _parse_range(args):
+    """Parse the rows in a byte range of a csv file into columns,
+    it runs in the processes of the pool.
+    """
+    source, start, end, encoding, dialect, width = args
+    with open(source, 'rb') as binary_file:
+        binary_file.seek(start)
+        text = binary_file.read(end - start).decode(encoding)
+    reader = csv.reader(io.StringIO(text, newline=None), **dialect)
+    columns = []
+    for column in _encode(reader, width):
+        # joined levels are much faster to send back than a list of strings
+        levels = _SEP.join(column.levels)
+        if levels.count(_SEP) != len(column.levels) - 1:
+            levels = column.levels
+        # the plain columns send only their values
+        codes = None if isinstance(column, PlainColumn) else column.codes.tobytes()
+        columns.append((codes, levels))
+    return columns
+
+
+def _is_scannable(dialect, encoding):
+    """The byte scanner works for dialects without escape char and
+    encodings where the csv special characters are single ascii bytes.
+    """
+    if dialect.escapechar:
+        return False
+    special = '\r\n' + dialect.delimiter + (dialect.quotechar or '')
+    try:
+        # the byte order mark is written only at the start of the file
+        if codecs.lookup(encoding).name == 'utf-8-sig':
+            encoding = 'utf-8'
+        return special.encode(encoding) == special.encode('ascii')
+    except (UnicodeError, LookupError):
+        return False
+
+
+def _sniff_dialect(csv_file, sample_lines=config.CSV_SAMPLE_LINES):
+    """Find the dialect of a csv file the same way tabulator does,
+    from a sample of its first lines.
+    """
+    sample = ''.join(islice(csv_file, sample_lines))
+    try:
+        dialect = csv.Sniffer().sniff(sample, config.CSV_DELIMITERS)
+        if not dialect.escapechar:
+            dialect.doublequote = True
+    except csv.Error:
+        dialect = csv.excel
+    return dialect
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# qcvalidator.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from tableschema import config as tableschema_config
+from tableschema.config import DEFAULT_FIELD_FORMAT
+
+from mipqctool.config import VALID, DATATYPE, CONSTRAINT
+from mipqctool.model.qctypes.date import strptime_regex, strptime_date
+
+
+def compile_validator(field):
+    """Compiles a field into a validator function, that returns a tuple
+    (result code, casted value) for a raw value, the result code is one
+    of config.VALID, DATATYPE and CONSTRAINT. The validator gives the same
+    result with Field.cast_value, but it doesn't raise for the invalid
+    values and everything that depends only on the field, the missing
+    values, the format regexes and the casted constraints, is prepared
+    once. A NaN number violates the minimum and maximum constraints,
+    where Field.cast_value raises InvalidOperation.
+
+    Arguments:
+    :param field: a tableschema Field or QcField
+    :return: function value -> (result code, casted value)
+    """
+    missing_values = field._Field__missing_values
+    try:
+        missing_set = frozenset(missing_values)
+    except TypeError:
+        missing_set = None
+    required = bool(field.constraints.get('required'))
+    cast = _compile_cast(field)
+    checks = _compile_checks(field)
+
+    def validate(value):
+        try:
+            missing = value in missing_set
+        except TypeError:
+            missing = value in missing_values
+        if missing:
+            return (CONSTRAINT, None) if required else (VALID, None)
+        casted_value = cast(value)
+        if casted_value is _ERROR:
+            return DATATYPE, None
+        for check in checks:
+            if not check(casted_value):
+                return CONSTRAINT, casted_value
+        return VALID, casted_value
+
+    return validate
+
+
+# Internal
+
+# returned by the compiled casts for the values that can't be casted
+_ERROR = object()
+
+_WHITESPACE = re.compile(r'\s')
+# the strings that int() accepts
+_INTEGER = re.compile(r'\s*[+-]?\d+(?:_\d+)*\s*\Z')
+# int() refuses strings with more digits than sys.get_int_max_str_digits
+_INTEGER_MAX_LENGTH = 4000
+# plain decimal strings, the rest are left for the tableschema cast
+_DECIMAL = re.compile(r'[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]{1,9})?\Z')
+# the email pattern of the frictionless string type
+_EMAIL = re.compile(r'[^@]+@[^@]+\.[^@]+')
+
+
+def _compile_cast(field):
+    """Returns a function that casts a value like the tableschema cast
+    of the field type, and returns _ERROR instead of ERROR.
+    """
+    cast_function = field._Field__cast_function
+    options = cast_function.keywords
+
+    def generic(value):
+        casted_value = cast_function(value)
+        if casted_value == tableschema_config.ERROR:
+            return _ERROR
+        return casted_value
+
+    field_type = field.type
+    # the format of the cast, the descriptor of a field may have none
+    field_format = cast_function.args[0] if cast_function.args else DEFAULT_FIELD_FORMAT
+    if field_type == 'integer' and options.get('bareNumber', True):
+        def cast(value):
+            if type(value) is not str or len(value) > _INTEGER_MAX_LENGTH:
+                return generic(value)
+            if _INTEGER.match(value):
+                return int(value)
+            return _ERROR
+
+    elif field_type == 'number' and options.get('bareNumber', True):
+        decimal_char = options.get('decimalChar', '.')
+        group_char = options.get('groupChar', '')
+
+        def cast(value):
+            if type(value) is not str:
+                return generic(value)
+            number = _WHITESPACE.sub('', value)
+            number = number.replace(decimal_char, '.').replace(group_char, '')
+            if _DECIMAL.match(number):
+                return Decimal(number)
+            return generic(value)
+
+    elif field_type == 'date' and field_format != 'any' and not field_format.startswith('fmt:'):
+        if field_format == DEFAULT_FIELD_FORMAT:
+            field_format = '%Y-%m-%d'
+        regex = strptime_regex(field_format)
+        if regex is None:
+            return generic
+
+        def cast(value):
+            if type(value) is not str:
+                return generic(value)
+            casted_value = strptime_date(value, regex)
+            if casted_value is None:
+                return _ERROR
+            return casted_value
+
+    elif field_type == 'boolean':
+        true_values = options.get('trueValues', _TRUE_VALUES)
+        false_values = options.get('falseValues', _FALSE_VALUES)
+        # a string is never equal to a non string true or false value
+        true_set = frozenset(value for value in true_values if isinstance(value, str))
+        false_set = frozenset(value for value in false_values if isinstance(value, str))
+
+        def cast(value):
+            if type(value) is not str:
+                return generic(value)
+            value = value.strip()
+            if value in true_set:
+                return True
+            if value in false_set:
+                return False
+            return _ERROR
+
+    elif field_type == 'string' and field_format in [DEFAULT_FIELD_FORMAT, 'email']:
+        def cast(value):
+            if not isinstance(value, str):
+                return _ERROR
+            if field_format == 'email' and not _EMAIL.match(value):
+                return _ERROR
+            return value
+
+    else:
+        return generic
+    return cast
+
+
+def _compile_checks(field):
+    """Returns a list with the constraint check functions of the field,
+    they get a casted value that is not None.
+    """
+    checks = []
+    for name, check in field._Field__check_functions.items():
+        # the constraint is already casted for the type of the field
+        constraint = check.args[0]
+        if name in ['required', 'unique']:
+            # they are always satisfied by a value that is not None
+            continue
+        elif name == 'enum':
+            try:
+                enum = frozenset(constraint)
+            except TypeError:
+                enum = constraint
+            checks.append(lambda value, enum=enum: value in enum)
+        elif name == 'minimum':
+            checks.append(lambda value, bound=constraint: _ordered(bound, value))
+        elif name == 'maximum':
+            checks.append(lambda value, bound=constraint: _ordered(value, bound))
+        elif name == 'minLength':
+            checks.append(lambda value, length=constraint: len(value) >= length)
+        elif name == 'maxLength':
+            checks.append(lambda value, length=constraint: len(value) <= length)
+        elif name == 'pattern':
+            try:
+                regex = re.compile('^{0}$'.format(constraint))
+            except re.error:
+                # the check raises the error, like in tableschema
+                checks.append(check)
+                continue
+            checks.append(lambda value, regex=regex: regex.match(value) is not None)
+        else:
+            checks.append(check)
+    return checks
+
+
+def _ordered(low, high):
+    """low <= high, False for the NaN decimals that can't be ordered."""
+    try:
+        return low <= high
+    except InvalidOperation:
+        return False
+
+
+_TRUE_VALUES = ['true', 'True', 'TRUE', '1']
+_FALSE_VALUES = ['false', 'False', 'FALSE', '0']
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# qcviolations.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import json
+import random
+import sqlite3
+import tempfile
+import weakref
+
+from mipqctool import config
+
+
+class ViolationCounter(object):
+    """Counts the rows of each distinct invalid value of a column that is
+    read in blocks, and keeps a uniform sample (reservoir) of the row
+    numbers of each value. The counts are exact. When there are more than
+    max_values distinct values in memory, they are spilled to a temporary
+    sqlite file, so a column with millions of distinct invalid values
+    does not hold them all in memory.
+
+    Arguments:
+    :param sample_rows: max example row numbers kept per value
+    :param max_values: max distinct values kept in memory
+    :param seed: seed of the row sampling
+    """
+    def __init__(self, sample_rows=config.VIOLATION_SAMPLE_ROWS,
+                 max_values=config.VIOLATION_MAX_VALUES,
+                 seed=config.CHUNK_RANDOM_SEED):
+        self.__sample_rows = sample_rows
+        self.__max_values = max_values
+        self.__rng = random.Random(seed)
+        # dict {value: [rows, list with the sampled row numbers]}
+        self.__entries = {}
+        self.__total = 0
+        self.__disk = None
+        self.__finalizer = None
+
+    @property
+    def total(self):
+        """Total number of rows with violations."""
+        return self.__total
+
+    @property
+    def spilled(self):
+        """Are the counts spilled to disk?"""
+        return self.__disk is not None
+
+    def add(self, value, row):
+        """Counts a row with the given invalid value."""
+        entry = self.__entries.get(value)
+        if entry is None:
+            entry = self.__entries[value] = [0, []]
+        entry[0] += 1
+        self.__total += 1
+        sample = entry[1]
+        if len(sample) < self.__sample_rows:
+            sample.append(row)
+        else:
+            # reservoir sampling, each row is kept with equal probability
+            index = self.__rng.randrange(entry[0])
+            if index < self.__sample_rows:
+                sample[index] = row
+        if len(self.__entries) > self.__max_values:
+            self.__flush()
+
+    def update(self, other):
+        """Adds the counts of an other ViolationCounter, with rows that
+        follow the rows of this one.
+        """
+        for value, rows, sample in other.__iter_entries():
+            entry = self.__entries.get(value)
+            if entry is None:
+                self.__entries[value] = [rows, list(sample)]
+            else:
+                entry[1] = self.__merge_samples(entry[0], entry[1], rows, sample)
+                entry[0] += rows
+            if len(self.__entries) > self.__max_values:
+                self.__flush()
+        self.__total += other.__total
+
+    def rows(self, value):
+        """Returns the sorted list with the example row numbers of
+        the given value.
+        """
+        entry = self.__entry(value)
+        return sorted(entry[1]) if entry else []
+
+    def items(self):
+        """Iterator of tupples (value, rows) in the order of the first
+        appearance of the values.
+        """
+        for value, rows, _ in self.__iter_entries():
+            yield value, rows
+
+    def values(self):
+        for _, rows, _ in self.__iter_entries():
+            yield rows
+
+    def close(self):
+        """Deletes the temporary file of the spilled counts."""
+        if self.__finalizer is not None:
+            self.__finalizer()
+
+    def __getitem__(self, value):
+        entry = self.__entry(value)
+        return entry[0] if entry else 0
+
+    def __contains__(self, value):
+        return self.__entry(value) is not None
+
+    def __iter__(self):
+        for value, _, _ in self.__iter_entries():
+            yield value
+
+    def __len__(self):
+        if self.__disk is None:
+            return len(self.__entries)
+        self.__flush()
+        return self.__disk.execute('SELECT COUNT(*) FROM violations').fetchone()[0]
+
+    # Private
+    def __entry(self, value):
+        if self.__disk is None:
+            return self.__entries.get(value)
+        self.__flush()
+        return self.__select(value)
+
+    def __iter_entries(self):
+        """Iterator of tupples (value, rows, sample)."""
+        if self.__disk is None:
+            for value, (rows, sample) in list(self.__entries.items()):
+                yield value, rows, sample
+            return
+        self.__flush()
+        cursor = self.__disk.execute('SELECT value, rows, sample FROM violations ORDER BY rowid')
+        for value, rows, sample in cursor:
+            yield value, rows, json.loads(sample)
+
+    def __select(self, value):
+        result = self.__disk.execute('SELECT rows, sample FROM violations WHERE value = ?',
+                                     (value,)).fetchone()
+        if result is None:
+            return None
+        return [result[0], json.loads(result[1])]
+
+    def __flush(self):
+        """Moves the counts in memory to the sqlite file."""
+        if self.__disk is None:
+            fd, path = tempfile.mkstemp(suffix='.sqlite')
+            os.close(fd)
+            self.__disk = sqlite3.connect(path)
+            self.__disk.execute('CREATE TABLE violations '
+                                '(value TEXT PRIMARY KEY, rows INTEGER, sample TEXT)')
+            self.__finalizer = weakref.finalize(self, _remove_database, self.__disk, path)
+        for value, (rows, sample) in self.__entries.items():
+            entry = self.__select(value)
+            if entry is None:
+                self.__disk.execute('INSERT INTO violations VALUES (?, ?, ?)',
+                                    (value, rows, json.dumps(sample)))
+            else:
+                sample = self.__merge_samples(entry[0], entry[1], rows, sample)
+                self.__disk.execute('UPDATE violations SET rows = ?, sample = ? WHERE value = ?',
+                                    (entry[0] + rows, json.dumps(sample), value))
+        self.__disk.commit()
+        self.__entries.clear()
+
+    def __merge_samples(self, rows, sample, other_rows, other_sample):
+        """Merges two uniform samples of row numbers, each one keeps its
+        share of rows in proportion of the number of rows it represents.
+        """
+        if len(sample) + len(other_sample) <= self.__sample_rows:
+            return sample + other_sample
+        # the positions of a uniform sample of all the rows, the positions
+        # before rows are from the first sample
+        positions = self.__rng.sample(range(rows + other_rows), self.__sample_rows)
+        share = min(sum(1 for position in positions if position < rows), len(sample))
+        other_share = min(self.__sample_rows - share, len(other_sample))
+        return (self.__rng.sample(sample, share) +
+                self.__rng.sample(other_sample, other_share))
+
+
+# Internal
+
+def _remove_database(connection, path):
+    connection.close()
+    if os.path.exists(path):
+        os.remove(path)
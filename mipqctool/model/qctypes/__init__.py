@@ -7,12 +7,20 @@ from __future__ import unicode_literals
 # Module API
 
 from .date import infer_date, describe_date, profile_date
-from .date import suggestc_date, suggestd_date
+from .date import suggestc_date, suggestd_date, validate_date
 from .numerical import infer_numerical, describe_numerical
 from .numerical import get_suffix_numerical, profile_numerical
 from .numerical import suggestc_numerical, suggestd_numerical
+from .numerical import validate_numerical, parse_numbers
+from .outliers import outlier_bounds, outlier_mask, outlier_indexes
+from .outliers import median_absolute_deviation
+from .sketch import QuantileSketch, NumericalSummary
+from .sketch import DistinctCounter, TopValues, TextSummary, IntegerSummary
+from .sketch import DistinctSample
 from .integer import infer_integer, describe_integer, get_suffix_integer
 from .integer import profile_integer, suggestd_integer, suggestc_integer
+from .integer import validate_integer
 from .text import infer_text, describe_text, profile_text, suggestd_text
-from .text import suggestc_text
+from .text import suggestc_text, validate_text
 from .nominal import profile_nominal, suggestd_nominal, suggestc_nominal
+from .nominal import validate_nominal
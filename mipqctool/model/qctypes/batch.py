@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+# batch.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import re
+import math
+import datetime
+from decimal import Decimal
+
+import numpy as np
+
+from mipqctool.config import DATATYPE, CONSTRAINT
+
+
+def validate_values(values, cast=None, **options):
+    """Validates a list of raw values at once. The values are casted
+    with the given batch cast function and the casted values are checked
+    against the field constraints with numpy. The few values that the
+    cast function or the checks can not decide are validated one by one
+    with the fallback function, so the classification is always the
+    same with the one of the field validator.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param cast: batch cast function (values, format, **cast_options),
+                 it gets a numpy string array and returns a tuple
+                 (numpy array with the casted values, bool mask of the
+                 values that can't be casted, bool mask of the undecided
+                 values) or None for validating all values one by one
+    :param format: string with the field format
+    :param cast_options: dict with the field cast options, ie decimalChar
+    :param missing_values: list with the missing values
+    :param constraints: dict {constraint name: casted constraint}
+    :param fallback: function that validates a single value and returns
+                     a tuple (result code, casted value), ie the
+                     compiled validator of the field
+    :return: tuple with the numpy bool masks of the values with datatype
+             violations and of the values with constraint violations
+    """
+    values = list(values)
+    total = len(values)
+    datatype = np.zeros(total, dtype=bool)
+    constraint = np.zeros(total, dtype=bool)
+    undecided = np.ones(total, dtype=bool)
+    constraints = options.get('constraints', {})
+    if (cast is not None and total and set(map(type, values)) == {str}
+            and set(constraints) <= _CONSTRAINTS):
+        array = np.asarray(values, dtype=str)
+        # numpy strings lose their trailing null characters, the values
+        # with null characters are left for the fallback
+        if '\x00' in ''.join(values):
+            exact = np.fromiter(map(_is_exact_string, values), dtype=bool, count=total)
+        else:
+            exact = np.ones(total, dtype=bool)
+        missing_values = [value for value in options.get('missing_values', [])
+                          if _is_exact_string(value)]
+        missing = exact & np.isin(array, missing_values)
+        present = np.flatnonzero(exact & ~missing)
+        undecided = ~exact
+        # numpy string functions fail on empty arrays
+        if len(present):
+            casted, errors, unknown = cast(array[present], options.get('format', 'default'),
+                                           **options.get('cast_options', {}))
+            checked = ~(errors | unknown)
+            rows = present[checked]
+            violations, unknown_checks = _check_constraints(casted[checked], constraints)
+            undecided[present[unknown]] = True
+            undecided[rows[unknown_checks]] = True
+            datatype[present[errors]] = True
+            constraint[rows[violations & ~unknown_checks]] = True
+        if constraints.get('required'):
+            constraint[missing] = True
+    fallback = options.get('fallback')
+    for index in np.flatnonzero(undecided).tolist():
+        result = fallback(values[index])[0]
+        if result == DATATYPE:
+            datatype[index] = True
+        elif result == CONSTRAINT:
+            constraint[index] = True
+    return datatype, constraint
+
+
+def undecided_values(values):
+    """Returns the result of a batch cast function that can not decide
+    for any of the given values.
+    """
+    total = len(values)
+    return (np.zeros(total, dtype=object), np.zeros(total, dtype=bool),
+            np.ones(total, dtype=bool))
+
+
+# Internal
+
+_CONSTRAINTS = set(['required', 'unique', 'enum', 'minimum', 'maximum',
+                    'minLength', 'maxLength', 'pattern'])
+
+
+def _check_constraints(casted, constraints):
+    """Returns a tuple with the bool masks of the casted values that
+    violate a constraint and of the values that can't be checked here.
+    For float arrays, which are approximations of decimal numbers, the
+    values equal to a constraint are left undecided.
+    """
+    total = len(casted)
+    violations = np.zeros(total, dtype=bool)
+    unknown = np.zeros(total, dtype=bool)
+    approximate = casted.dtype.kind == 'f'
+    for name, constraint in constraints.items():
+        if name in ['required', 'unique']:
+            continue
+        if name in ['minLength', 'maxLength', 'pattern']:
+            if casted.dtype.kind != 'U':
+                unknown[:] = True
+            elif name == 'pattern':
+                try:
+                    regex = re.compile('^{0}$'.format(constraint))
+                except re.error:
+                    unknown[:] = True
+                    continue
+                matched = np.fromiter((regex.match(value) is not None
+                                       for value in casted.tolist()),
+                                      dtype=bool, count=total)
+                violations |= ~matched
+            else:
+                lengths = np.char.str_len(casted)
+                if name == 'minLength':
+                    violations |= lengths < constraint
+                else:
+                    violations |= lengths > constraint
+            continue
+        if name == 'enum':
+            items = _comparable([item for item in constraint if item is not None],
+                                casted.dtype)
+        else:
+            items = _comparable([constraint], casted.dtype)
+        if items is None:
+            unknown[:] = True
+        elif name == 'enum':
+            found = np.isin(casted, items)
+            violations |= ~found
+            if approximate:
+                unknown |= found
+        else:
+            bound = items[0]
+            if name == 'minimum':
+                violations |= casted < bound
+            else:
+                violations |= casted > bound
+            if approximate:
+                unknown |= casted == bound
+    return violations, unknown
+
+
+def _comparable(items, dtype):
+    """Returns a numpy array of the given dtype with the given casted
+    constraint values or None if they can't be represented exactly.
+    """
+    kind = dtype.kind
+    if kind == 'i':
+        if all(type(item) in (int, bool) and _INT64_MIN <= item <= _INT64_MAX
+               for item in items):
+            return np.asarray(items, dtype=np.int64)
+    elif kind == 'f':
+        if all(isinstance(item, (int, float, Decimal)) and math.isfinite(item)
+               for item in items):
+            return np.asarray([float(item) for item in items], dtype=np.float64)
+    elif kind == 'M':
+        if all(type(item) is datetime.date for item in items):
+            return np.asarray(items, dtype='datetime64[D]')
+    elif kind == 'U':
+        if all(_is_exact_string(item) for item in items):
+            return np.asarray(items, dtype=str)
+    elif kind == 'b':
+        if all(type(item) is bool for item in items):
+            return np.asarray(items, dtype=bool)
+    return None
+
+
+def _is_exact_string(value):
+    """Is the value a string that numpy stores unchanged?"""
+    return isinstance(value, str) and '\x00' not in value
+
+
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
@@ -7,11 +7,17 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import re
+import math
+import calendar
 import datetime
 from collections import Counter, OrderedDict
+
+import numpy as np
 from tableschema.config import DEFAULT_FIELD_FORMAT
 from mipqctool.config import ERROR, LOGGER, DEFAULT_DATE_FORMAT
 from mipqctool.config import DEFAULT_MISSING_VALUES
+from mipqctool.model.qctypes.batch import validate_values, undecided_values
+from mipqctool.model.qctypes.integer import value_counts, value_mode, counts_quantiles
 
 
 def infer_date(value, **options):
@@ -68,19 +74,58 @@ def describe_date(pattern, **options):
 
 
 def profile_date(pairs, **options):
-    """Return stats for the date field
+    """Return stats for the date field, the dates are converted once
+    to int64 day numbers and the stats are calculated with numpy.
 
     Arguments:
     :param pairs: list with pairs (row, value)
+    :param values: optional numpy datetime64[D] array with the values
+                   of the pairs, so they are not converted again
+    :param summary: optional IntegerSummary of the day numbers of a column
+                    that is read in blocks, then the pairs are not used
+    :param years: Counter {year: rows} of the column, with the summary
+    :param counts: optional Counter {day number: rows} of the values in the
+                   order of their first row, then the pairs are not used
     :return: dictionary with stats
     """
     result = OrderedDict()
-    # Get the values in an numpy array
-    values = [r[1] for r in pairs]
-    c = Counter(values)
-    result['mode'], result['freq'] = c.most_common(1)[0]
-    result['min'] = min(values)
-    result['max'] = max(values)
+    probabilities = [0.25, 0.5, 0.75]
+    summary = options.get('summary')
+    if summary is not None and not summary.exact:
+        mode_day, freq = summary.most_common(1)[0]
+        first_day, last_day = summary.min, summary.max
+        quantiles = summary.quantiles(probabilities)
+    else:
+        if summary is not None or options.get('counts') is not None:
+            c = summary.counts if summary is not None else options['counts']
+            mode_day, freq = c.most_common(1)[0]
+            uniques = np.asarray(sorted(c), dtype=np.int64)
+            counts = np.asarray([c[day] for day in uniques.tolist()], dtype=np.int64)
+        else:
+            # Get the values in an numpy array
+            values = options.get('values')
+            if values is None:
+                values = np.asarray([r[1] for r in pairs], dtype='datetime64[D]')
+            days = values.astype('datetime64[D]').astype(np.int64)
+            uniques, counts = value_counts(days)
+            mode_day, freq = value_mode(days, uniques, counts)
+        first_day, last_day = uniques[0], uniques[-1]
+        quantiles = counts_quantiles(uniques, counts, probabilities)
+    result['mode'], result['freq'] = _day_date(mode_day), freq
+    result['min'] = _day_date(first_day)
+    result['max'] = _day_date(last_day)
+    # the quartiles are rounded down to a day
+    result['q1'], result['median'], result['q3'] = [
+        _day_date(math.floor(quantile)) for quantile in quantiles]
+    # list of tupples (year, rows)
+    if summary is not None:
+        result['years'] = sorted(options['years'].items())
+    else:
+        # the distinct days are sorted
+        years = uniques.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+        year_values, year_starts = np.unique(years, return_index=True)
+        year_rows = np.add.reduceat(counts, year_starts)
+        result['years'] = list(zip(year_values.tolist(), year_rows.tolist()))
 
     return result
 
@@ -116,8 +161,131 @@ def suggestc_date(value, **options):
     null = options.get('missing_values', DEFAULT_MISSING_VALUES)[0]
     return null
 
+
+def validate_date(values, **options):
+    """Validates a list of values of a date field at once.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param type: string, the frictionless type of the field
+    :param options: the options of batch.validate_values
+    :return: tuple with the numpy bool masks of the values with datatype
+             violations and of the values with constraint violations
+    """
+    cast = cast_dates if options.get('type') == 'date' else None
+    return validate_values(values, cast, **options)
+
+
+def cast_dates(values, format='default', **options):
+    """Casts a numpy string array like the frictionless date type,
+    returns a tuple with the datetime64[D] array of the casted values,
+    the bool mask of the values that are not dates and the bool mask of
+    the values that are left for the frictionless cast. The values are
+    matched with the regex of datetime.strptime and the days are checked
+    with numpy, only formats with the %d %m %Y %y directives are casted.
+    """
+    if format == DEFAULT_FIELD_FORMAT:
+        format = '%Y-%m-%d'
+    # any date with dateutil and the deprecated fmt: prefix
+    if format == 'any' or format.startswith('fmt:'):
+        return undecided_values(values)
+    regex = strptime_regex(format)
+    if regex is None:
+        return undecided_values(values)
+    total = len(values)
+    matched = np.zeros(total, dtype=bool)
+    # strptime defaults for the directives that are not in the format
+    years = np.full(total, 1900, dtype=np.int64)
+    months = np.ones(total, dtype=np.int64)
+    days = np.ones(total, dtype=np.int64)
+    for index, value in enumerate(values.tolist()):
+        match = regex.match(value)
+        if match is None or match.end() != len(value):
+            continue
+        matched[index] = True
+        found = match.groupdict()
+        if 'Y' in found:
+            years[index] = int(found['Y'])
+        elif 'y' in found:
+            year = int(found['y'])
+            years[index] = year + 2000 if year <= 68 else year + 1900
+        if 'm' in found:
+            months[index] = int(found['m'])
+        if 'd' in found:
+            days[index] = int(found['d'])
+    # the year 0 is valid for numpy but not for python dates
+    valid = matched & (years >= datetime.MINYEAR)
+    years[~valid] = 1970
+    starts = ((years - 1970) * 12 + months - 1).astype('datetime64[M]')
+    month_days = (starts + 1).astype('datetime64[D]') - starts.astype('datetime64[D]')
+    valid &= days <= month_days.astype(np.int64)
+    casted = starts.astype('datetime64[D]') + (days - 1)
+    return casted, ~valid, np.zeros(total, dtype=bool)
+
+
+def strptime_regex(format):
+    """Returns the compiled regex that datetime.strptime matches for
+    the given format, or None if the format has other directives.
+    """
+    format = re.sub(r"([\\.^$*+?\(\){}\[\]|])", r"\\\1", format)
+    format = re.sub(r'\s+', r'\\s+', format)
+    pattern = ''
+    directives = []
+    while '%' in format:
+        index = format.index('%') + 1
+        if index == len(format) or format[index] not in _STRPTIME_DIRECTIVES:
+            return None
+        directive = format[index]
+        if directive != '%':
+            directives.append(directive)
+        pattern += format[:index - 1] + _STRPTIME_DIRECTIVES[directive]
+        format = format[index + 1:]
+    # repeated directives and both years are left for strptime
+    if len(set(directives)) != len(directives) or set('Yy') <= set(directives):
+        return None
+    return re.compile(pattern + format, re.IGNORECASE)
+
+
+def strptime_date(value, regex):
+    """Casts a string like datetime.strptime with a regex returned by
+    strptime_regex, returns the date or None if the value is not a date.
+    """
+    match = regex.match(value)
+    if match is None or match.end() != len(value):
+        return None
+    found = match.groupdict()
+    year = 1900
+    if 'Y' in found:
+        year = int(found['Y'])
+    elif 'y' in found:
+        year = int(found['y'])
+        year += 2000 if year <= 68 else 1900
+    month = int(found.get('m', 1))
+    day = int(found.get('d', 1))
+    if year < datetime.MINYEAR or day > calendar.monthrange(year, month)[1]:
+        return None
+    return datetime.date(year, month, day)
+
+
 # Internal
 
+_EPOCH = datetime.date(1970, 1, 1)
+
+# regex patterns of datetime.strptime for the batch supported directives
+_STRPTIME_DIRECTIVES = {
+    'd': r"(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])",
+    'm': r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    'Y': r"(?P<Y>\d\d\d\d)",
+    'y': r"(?P<y>\d\d)",
+    '%': '%'
+}
+
+
+def _day_date(day):
+    """The date of a day number, the days since 1970-01-01."""
+    return _EPOCH + datetime.timedelta(days=int(day))
+
+
 # Date regex expressions
 
 # %d %m %Y, dd-mm-yyyy, dd/mm/yyyy,dd.mm.yyyy
@@ -7,9 +7,11 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import re
+import math
 import numpy as np
 from collections import Counter, OrderedDict
 from mipqctool.config import ERROR, LOGGER, DEFAULT_MISSING_VALUES
+from mipqctool.model.qctypes.batch import validate_values, undecided_values
 # Regex unicode support
 
 
@@ -108,20 +110,96 @@ def profile_integer(pairs, **options):
 
     Arguments:
     :param pairs: list with pairs (row, value)
+    :param values: optional numpy int64 array with the values of the
+                   pairs, so they are not converted again
+    :param summary: optional IntegerSummary of a column that is read in
+                    blocks, then the pairs are not used
+    :param counts: optional Counter {value: rows} of the values in the
+                   order of their first row, then the pairs are not used
     :return: dictionary with stats
     """
     result = OrderedDict()
-    # Get the values in an numpy array
-    values = np.asarray([r[1] for r in pairs])
-    c = Counter(values)
-    result['mode'], result['freq'] = c.most_common(1)[0]
-    result['min'] = np.min(values)
-    result['max'] = np.max(values)
+    probabilities = [0.25, 0.5, 0.75]
+    summary = options.get('summary')
+    if summary is not None and not summary.exact:
+        result['mode'], result['freq'] = summary.most_common(1)[0]
+        result['min'] = summary.min
+        result['max'] = summary.max
+        quantiles = summary.quantiles(probabilities)
+    else:
+        if summary is not None or options.get('counts') is not None:
+            c = summary.counts if summary is not None else options['counts']
+            mode_value, freq = c.most_common(1)[0]
+            order = sorted(c)
+            uniques = np.asarray(order)
+            counts = np.asarray([c[value] for value in order], dtype=np.int64)
+        else:
+            # Get the values in an numpy array
+            values = options.get('values')
+            if values is None:
+                values = np.asarray([r[1] for r in pairs])
+            uniques, counts = value_counts(values)
+            mode_value, freq = value_mode(values, uniques, counts)
+        result['mode'], result['freq'] = mode_value, freq
+        result['min'] = uniques[0]
+        result['max'] = uniques[-1]
+        quantiles = counts_quantiles(uniques, counts, probabilities)
     # convert those stats to integer in case of zeros values
-    result['q1'] = int(np.quantile(values, 0.25))
-    result['median'] = int(np.median(values))
-    result['q3'] = int(np.quantile(values, 0.75))
+    result['q1'], result['median'], result['q3'] = [int(quantile) for quantile in quantiles]
+
+    return result
+
+
+def value_counts(values):
+    """Returns a tuple with the numpy arrays of the sorted distinct
+    values and of the count of each one. Integers within a small range,
+    ie ages or scores, are counted with bincount without sorting.
+    """
+    if values.dtype.kind == 'i' and len(values):
+        low = int(values.min())
+        high = int(values.max())
+        if high - low < max(_BINCOUNT_MAX_RANGE, len(values)):
+            counts = np.bincount(values - low)
+            present = np.flatnonzero(counts)
+            return (present + low).astype(values.dtype), counts[present]
+    return np.unique(values, return_counts=True)
+
+
+def value_mode(values, uniques, counts):
+    """Returns a tuple (mode, rows) of the values from their sorted
+    distinct values and counts, when there are more modes it is the
+    first one in the order of the values, like Counter.most_common.
+    """
+    freq = int(counts.max())
+    modes = uniques[counts == freq]
+    if len(modes) > 1:
+        modes = values[np.flatnonzero(np.isin(values, modes))[:1]]
+    return modes[0], freq
+
 
+def counts_quantiles(uniques, counts, probabilities):
+    """Quantiles of the sorted distinct values with the given counts,
+    with linear interpolation, the same as numpy.quantile of the
+    expanded values.
+    """
+    cumulative = np.cumsum(counts)
+    total = int(cumulative[-1])
+    result = []
+    for q in probabilities:
+        position = (total - 1) * q
+        lower = int(math.floor(position))
+        lower_value = uniques[np.searchsorted(cumulative, lower, side='right')]
+        upper_value = uniques[np.searchsorted(cumulative, min(lower + 1, total - 1),
+                                              side='right')]
+        if uniques.dtype.kind != 'O':
+            lower_value, upper_value = float(lower_value), float(upper_value)
+        # the lerp of numpy.quantile
+        fraction = position - lower
+        difference = upper_value - lower_value
+        if fraction >= 0.5:
+            result.append(upper_value - difference * (1 - fraction))
+        else:
+            result.append(lower_value + difference * fraction)
     return result
 
 
@@ -144,8 +222,50 @@ def suggestd_integer(value, **options):
 
     return suggested
 
+
+def validate_integer(values, **options):
+    """Validates a list of values of an integer field at once.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param type: string, the frictionless type of the field
+    :param options: the options of batch.validate_values
+    :return: tuple with the numpy bool masks of the values with datatype
+             violations and of the values with constraint violations
+    """
+    cast = cast_integers if options.get('type') == 'integer' else None
+    return validate_values(values, cast, **options)
+
+
+def cast_integers(values, format='default', **options):
+    """Casts a numpy string array like the frictionless integer type,
+    returns a tuple with the int64 array of the casted values, the bool
+    mask of the values that are not integers and the bool mask of the
+    values that are left for the frictionless cast.
+    """
+    if not options.get('bareNumber', True):
+        return undecided_values(values)
+    stripped = np.char.strip(values)
+    digits = np.char.lstrip(stripped, '+-')
+    signs = np.char.str_len(stripped) - np.char.str_len(digits)
+    # int() accepts surrounding whitespace, one sign and unicode digits
+    # with underscores between them
+    integers = (signs <= 1) & np.char.isdecimal(np.char.replace(digits, '_', ''))
+    # ascii digits that fit in int64 are casted by numpy
+    fast = (integers & (np.char.str_len(digits) <= 18) &
+            (np.char.str_len(np.char.strip(digits, _DIGITS)) == 0))
+    casted = np.zeros(len(values), dtype=np.int64)
+    casted[fast] = stripped[fast].astype(np.int64)
+    return casted, ~integers, integers & ~fast
+
 # Internal
 
+_DIGITS = '0123456789'
+
+# max range of values counted with bincount instead of sorting
+_BINCOUNT_MAX_RANGE = 2 ** 20
+
+
 _INT = (r'^(?P<sign>[+-])?\d+'
         r'(?P<suffix>(\s?[^0-9\s^&!*\-_+=~,\.`@\"\'\\\/]{1,5}\d?)\)?)?$')
 
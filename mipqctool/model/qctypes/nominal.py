@@ -8,8 +8,14 @@ from __future__ import unicode_literals
 
 import operator
 from collections import Counter, OrderedDict
+import numpy as np
 from nltk import edit_distance
 from mipqctool.config import DEFAULT_MISSING_VALUES
+from mipqctool.model.qctypes.batch import validate_values, undecided_values
+from mipqctool.model.qctypes.integer import cast_integers
+from mipqctool.model.qctypes.numerical import cast_numbers
+from mipqctool.model.qctypes.date import cast_dates
+from mipqctool.model.qctypes.text import cast_strings
 
 
 def profile_nominal(pairs, **options):
@@ -17,11 +23,15 @@ def profile_nominal(pairs, **options):
 
     Arguments:
     :param pairs: list with pairs (row, value)
+    :param counts: Counter {value: rows} of the values, if given
+                   it is used instead of the pairs
     :return: dictionary with stats
     """
     result = OrderedDict()
-    values = [r[1] for r in pairs]
-    c = Counter(values)
+    c = options.get('counts')
+    if c is None:
+        values = [r[1] for r in pairs]
+        c = Counter(values)
     result['top'], result['freq'] = c.most_common(1)[0]
     categories = list(c)
     categories.sort()
@@ -64,3 +74,51 @@ def suggestd_nominal(value, **options):
     """
     null = options.get('missing_values', DEFAULT_MISSING_VALUES)[0]
     return null
+
+
+def validate_nominal(values, **options):
+    """Validates a list of values of a nominal field at once, the
+    values are casted with the frictionless type of the field.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param type: string, the frictionless type of the field
+    :param options: the options of batch.validate_values
+    :return: tuple with the numpy bool masks of the values with datatype
+             violations and of the values with constraint violations
+    """
+    cast = _CASTS.get(options.get('type'))
+    return validate_values(values, cast, **options)
+
+
+def cast_booleans(values, format='default', **options):
+    """Casts a numpy string array like the frictionless boolean type,
+    returns a tuple with the bool array of the casted values, the bool
+    mask of the values that are not true or false values and the bool
+    mask of the values that are left for the frictionless cast.
+    """
+    true_values = options.get('trueValues', _TRUE_VALUES)
+    false_values = options.get('falseValues', _FALSE_VALUES)
+    # a string value is never equal to a non string true or false value
+    true_values = [value for value in true_values if isinstance(value, str)]
+    false_values = [value for value in false_values if isinstance(value, str)]
+    if any('\x00' in value for value in true_values + false_values):
+        return undecided_values(values)
+    stripped = np.char.strip(values)
+    trues = np.isin(stripped, true_values)
+    falses = ~trues & np.isin(stripped, false_values)
+    return trues, ~(trues | falses), np.zeros(len(values), dtype=bool)
+
+
+# Internal
+
+_TRUE_VALUES = ['true', 'True', 'TRUE', '1']
+_FALSE_VALUES = ['false', 'False', 'FALSE', '0']
+
+_CASTS = {
+    'integer': cast_integers,
+    'number': cast_numbers,
+    'date': cast_dates,
+    'string': cast_strings,
+    'boolean': cast_booleans,
+}
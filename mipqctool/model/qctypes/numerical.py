@@ -7,9 +7,16 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import re
+import math
+from decimal import Decimal
+
 import numpy as np
 from collections import OrderedDict
-from mipqctool.config import ERROR, LOGGER, DEFAULT_MISSING_VALUES
+from mipqctool.config import ERROR, LOGGER, DEFAULT_MISSING_VALUES, DEFAULT_OUTLIER_METHOD
+from mipqctool.model.qctypes.batch import validate_values, undecided_values
+from mipqctool.model.qctypes.outliers import outlier_bounds, outlier_indexes
+from mipqctool.model.qctypes.outliers import median_absolute_deviation, check_outlier_method
+from mipqctool.model.qctypes.integer import counts_quantiles
 
 
 def infer_numerical(value, **options):
@@ -75,29 +82,82 @@ def profile_numerical(pairs, threshold=3, **options):
 
     Arguments:
     :param pairs: list with pairs (row, value)
-    :param threshold: lenght in std, outside of which a value is consider outlier 
+    :param threshold: lenght in the units of the outlier method, outside of
+                      which a value is consider outlier
+    :param method: outlier method, one of config.OUTLIER_METHODS, zscore
+                   by default
+    :param values: optional numpy float64 array with the values of the
+                   pairs, so they are not converted again
+    :param summary: optional NumericalSummary of a column that is read in
+                    blocks, then the pairs are not used and the outliers
+                    are counted in a second pass with outlier_mask
+    :param counts: optional Counter {float value: rows} of the values, then
+                   the pairs are not used and the outliers are left to
+                   the caller, like with the summary
+    :param moments: optional tuple (rows, mean, sum of squared differences)
+                    of the counted values that the caller keeps up to date,
+                    with the counts, else they are calculated from the counts
     :return: dictionary with stats
     """
     result = OrderedDict()
-    # Get the values in an numpy array
-    values = np.asarray([float(r[1]) for r in pairs])
-
-    result['mean'] = np.mean(values)
-    # sample stadard deviation with 1 degree of freedom
-    result['std'] = np.std(values, ddof=1)
-    result['min'] = np.min(values)
-    result['max'] = np.max(values)
-    result['q1'] = np.quantile(values, 0.25)
-    result['median'] = np.median(values)
-    result['q3'] = np.quantile(values, 0.75)
-    high = result['mean'] + threshold * result['std']
+    method = options.get('method', DEFAULT_OUTLIER_METHOD)
+    check_outlier_method(method)
+    summary = options.get('summary')
+    if summary is not None:
+        result['mean'] = summary.mean
+        result['std'] = summary.std
+        result['min'] = summary.min
+        result['max'] = summary.max
+        result['q1'], result['median'], result['q3'] = summary.quantiles([0.25, 0.5, 0.75])
+        if method == 'mad':
+            result['mad'] = summary.median_absolute_deviation()
+    elif options.get('counts') is not None:
+        counts = options['counts']
+        uniques = np.asarray(sorted(counts), dtype=np.float64)
+        rows = np.asarray([counts[value] for value in uniques.tolist()], dtype=np.int64)
+        moments = options.get('moments')
+        if moments is None:
+            total = int(rows.sum())
+            mean = float(np.dot(uniques, rows)) / total
+            m2 = float(np.dot(rows, (uniques - mean) ** 2))
+        else:
+            total, mean, m2 = moments
+        result['mean'] = mean
+        # sample standard deviation with 1 degree of freedom
+        result['std'] = math.sqrt(max(m2, 0.0) / (total - 1)) if total > 1 else float('nan')
+        result['min'] = uniques[0]
+        result['max'] = uniques[-1]
+        result['q1'], result['median'], result['q3'] = counts_quantiles(uniques, rows,
+                                                                         [0.25, 0.5, 0.75])
+        if method == 'mad':
+            deviations = np.abs(uniques - result['median'])
+            order = np.argsort(deviations, kind='stable')
+            result['mad'] = counts_quantiles(deviations[order], rows[order], [0.5])[0]
+    else:
+        # Get the values in an numpy array
+        values = options.get('values')
+        if values is None:
+            values = np.asarray([float(r[1]) for r in pairs])
+        result['mean'] = np.mean(values)
+        # sample stadard deviation with 1 degree of freedom
+        result['std'] = np.std(values, ddof=1)
+        result['min'] = np.min(values)
+        result['max'] = np.max(values)
+        # one partition of the values for all the quantiles
+        result['q1'], result['median'], result['q3'] = np.quantile(values, [0.25, 0.5, 0.75])
+        if method == 'mad':
+            result['mad'] = median_absolute_deviation(values, result['median'])
+    low, high = outlier_bounds(result, method, threshold)
     result['upperbound'] = high
-    low = result['mean'] - threshold * result['std']
     result['lowerbound'] = low
-    outlier_rows = list(filter(lambda x:
-                               x[1] >= high or x[1] <= low, pairs))
+    if summary is not None or options.get('counts') is not None:
+        outlier_rows = []
+    else:
+        indexes = outlier_indexes(values, low, high, method)
+        outlier_rows = [pairs[index] for index in indexes.tolist()]
     result['outliers'] = len(outlier_rows)
     result['outliersrows'] = outlier_rows
+    result['outliermethod'] = '{} (threshold {})'.format(method, threshold)
 
     return result
 
@@ -114,8 +174,123 @@ def suggestd_numerical(value, **options):
     """
     null = options.get('missing_values', DEFAULT_MISSING_VALUES)[0]
     return null
+
+
+def validate_numerical(values, **options):
+    """Validates a list of values of a numerical field at once.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param type: string, the frictionless type of the field
+    :param options: the options of batch.validate_values
+    :return: tuple with the numpy bool masks of the values with datatype
+             violations and of the values with constraint violations
+    """
+    cast = cast_numbers if options.get('type') == 'number' else None
+    return validate_values(values, cast, **options)
+
+
+def cast_numbers(values, format='default', **options):
+    """Casts a numpy string array like the frictionless number type,
+    returns a tuple with the float64 array of the casted values, the
+    bool mask of the values that are not numbers and the bool mask of
+    the values that are left for the frictionless cast. The float values
+    are approximations of the decimal ones, so the constraint checks
+    leave the values equal to a constraint for the frictionless cast.
+    """
+    decimal_char = options.get('decimalChar', '.')
+    group_char = options.get('groupChar', '')
+    if (not options.get('bareNumber', True) or len(decimal_char) != 1 or
+            len(group_char) > 1 or re.search(r'\s', decimal_char + group_char)):
+        return undecided_values(values)
+    numbers = np.char.replace(values, decimal_char, '.')
+    if group_char:
+        numbers = np.char.replace(numbers, group_char, '')
+    digits = np.char.lstrip(numbers, '+-')
+    signs = np.char.str_len(numbers) - np.char.str_len(digits)
+    dots = np.char.count(digits, '.')
+    # plain decimal notation, with only ascii digits and a point
+    plain = np.char.str_len(np.char.strip(digits, _DIGITS + '.')) == 0
+    fast = plain & (signs <= 1) & (dots <= 1) & (np.char.str_len(digits) > dots)
+    casted = np.zeros(len(values), dtype=np.float64)
+    casted[fast] = numbers[fast].astype(np.float64)
+    # with no exponent, infinity or nan any other ascii number is invalid
+    errors = ~fast & (np.char.str_len(np.char.strip(numbers, _DIGITS + '.+-')) == 0)
+    others = np.flatnonzero(~(fast | errors))
+    errors[others] = [_NOT_DECIMAL.search(value) is not None
+                      for value in numbers[others].tolist()]
+    return casted, errors, ~(fast | errors)
+
+
+def parse_numbers(values, **options):
+    """Parses a list of raw values of a number field straight into a
+    numpy float64 array, without the Decimal values of the frictionless
+    cast. The values are parsed all together with numpy and only the
+    ones with exponents, whitespace etc are parsed one by one.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param decimalChar: string with the decimal separator
+    :param groupChar: string with the thousands separator
+    :param bareNumber: if False the non digit characters in the start
+                       and the end of the values are ignored
+    :param suffix: string with the unit suffix of the values, ie 'cm'
+    :param missing_values: list with the missing values
+    :return: numpy float64 array, nan for the missing values and for the
+             values that are not numbers
+    """
+    missing_values = set(options.get('missing_values', []))
+    decimal_char = options.get('decimalChar', '.')
+    group_char = options.get('groupChar', '')
+    bare_number = options.get('bareNumber', True)
+    suffix = options.get('suffix')
+    strings = []
+    for value in values:
+        if value in missing_values or not isinstance(value, str):
+            strings.append('')
+            continue
+        if not bare_number:
+            if suffix and value.rstrip().endswith(suffix):
+                value = value.rstrip()[:-len(suffix)]
+            value = _NOT_BARE.sub('', _WHITESPACE.sub('', value))
+        strings.append(value)
+    total = len(strings)
+    result = np.full(total, np.nan, dtype=np.float64)
+    if not total:
+        return result
+    array = np.asarray(strings, dtype=str)
+    casted, errors, undecided = cast_numbers(array, decimalChar=decimal_char,
+                                             groupChar=group_char)
+    parsed = ~(errors | undecided)
+    result[parsed] = casted[parsed]
+    for index in np.flatnonzero(undecided).tolist():
+        result[index] = _parse_number(strings[index], decimal_char, group_char)
+    return result
+
 # Internal
 
+_DIGITS = '0123456789'
+
+_WHITESPACE = re.compile(r'\s')
+# the characters that the frictionless cast ignores when bareNumber is false
+_NOT_BARE = re.compile(r'((^\D*)|(\D*$))')
+
+
+def _parse_number(value, decimal_char, group_char):
+    """Parses a single value like the frictionless number cast, returns
+    nan if the value is not a number.
+    """
+    value = _WHITESPACE.sub('', value)
+    value = value.replace(decimal_char, '.').replace(group_char, '')
+    try:
+        return float(Decimal(value))
+    except Exception:
+        return np.nan
+
+# a character that can't be in a Decimal string, ie a number with
+# exponent, underscores, infinity or nan
+_NOT_DECIMAL = re.compile(r'[^\s\d._+\-eEiInNfFtTyYaAsS]')
+
 _NUM = (r'^(?P<sign>[+-])?\d+(?P<decpart>(?P<decchar>[,\.])\d*)'
         r'(?P<suffix>(\s?[^0-9\s^&!*-+=~,\.`@\"\'\\\/]{1,10}\d{0,3})\)?)?$')
 
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# outliers.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from mipqctool.config import OUTLIER_METHODS
+from mipqctool.exceptions import QCToolException
+
+
+def outlier_bounds(stats, method='zscore', threshold=3):
+    """Returns a tuple (lower bound, upper bound) of the values that are
+    not outliers with the given method.
+    zscore: mean -/+ threshold * std
+    iqr: the Tukey fences q1 - threshold * iqr and q3 + threshold * iqr
+    mad: median -/+ threshold * 1.4826 * mad, the scaled median absolute
+         deviation is the std of normally distributed values
+
+    Arguments:
+    :param stats: dict with the stats of profile_numerical, mean and std
+                  for zscore, q1 and q3 for iqr, median and mad for mad
+    :param method: string, one of config.OUTLIER_METHODS
+    :param threshold: the width of the bounds in the units of the method
+    :return: tuple of floats
+    """
+    check_outlier_method(method)
+    if method == 'zscore':
+        center, scale = stats['mean'], stats['std']
+        return center - threshold * scale, center + threshold * scale
+    if method == 'iqr':
+        iqr = stats['q3'] - stats['q1']
+        return stats['q1'] - threshold * iqr, stats['q3'] + threshold * iqr
+    scale = _MAD_SCALE * stats['mad']
+    return stats['median'] - threshold * scale, stats['median'] + threshold * scale
+
+
+def outlier_mask(values, low, high, method='zscore'):
+    """Returns a numpy bool mask of the outliers of the given values.
+    The zscore bounds are outliers themselves, the iqr and mad ones not,
+    so a column with zero spread has no iqr or mad outliers.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if method == 'zscore':
+        return (values >= high) | (values <= low)
+    return (values > high) | (values < low)
+
+
+def outlier_indexes(values, low, high, method='zscore'):
+    """Returns a numpy int64 array with the indexes of the outliers."""
+    return np.flatnonzero(outlier_mask(values, low, high, method))
+
+
+def median_absolute_deviation(values, median):
+    """Median of the absolute deviations of the values from the median."""
+    return float(np.median(np.abs(np.asarray(values, dtype=np.float64) - median)))
+
+
+def check_outlier_method(method):
+    if method not in OUTLIER_METHODS:
+        raise QCToolException('Unknown outlier method "{}", the methods are {}'.format(
+            method, ', '.join(OUTLIER_METHODS)))
+
+
+# Internal
+
+# the mad of normally distributed values times this is their std
+_MAD_SCALE = 1.4826
@@ -0,0 +1,596 @@
+# -*- coding: utf-8 -*-
+# sketch.py
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import heapq
+import hashlib
+from collections import Counter
+from operator import itemgetter
+
+import numpy as np
+
+from mipqctool import config
+
+
+class QuantileSketch(object):
+    """KLL quantile sketch of a stream of numbers. The numbers are kept
+    in levels, the numbers of level h stand for 2^h numbers each. When
+    a level is full it is sorted and every other number, starting from
+    a random one, is promoted to the next level. The sketch holds
+    O(1/error) numbers and the rank of a quantile is off by about
+    error * count; up to the capacity of the first level the quantiles
+    are exact. Sketches of consecutive blocks can be merged.
+
+    Arguments:
+    :param error: the rank error bound as a fraction of the count
+    :param seed: seed of the compactions
+    """
+    def __init__(self, error=config.QUANTILE_ERROR, seed=config.CHUNK_RANDOM_SEED):
+        self.__error = error
+        self.__k = max(int(math.ceil(_KLL_ERROR_CONSTANT / error)), _MIN_CAPACITY)
+        self.__levels = [np.empty(0)]
+        self.__count = 0
+        self.__rng = np.random.default_rng(seed)
+
+    @property
+    def error(self):
+        return self.__error
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def size(self):
+        """Number of the numbers kept in the sketch."""
+        return sum(len(items) for items in self.__levels)
+
+    def update(self, values):
+        """Adds the numbers of a numpy float array or a list."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.__levels[0] = np.concatenate([self.__levels[0], values])
+        self.__count += len(values)
+        self.__compress()
+
+    def merge(self, other):
+        """Adds the numbers of an other QuantileSketch."""
+        for level, items in enumerate(other.__levels):
+            if level == len(self.__levels):
+                self.__levels.append(np.empty(0))
+            self.__levels[level] = np.concatenate([self.__levels[level], items])
+        self.__count += other.__count
+        self.__compress()
+
+    def quantiles(self, probabilities):
+        """Returns a list with the quantiles of the given probabilities,
+        with linear interpolation like numpy.quantile.
+        """
+        if not self.__count:
+            return [float('nan')] * len(probabilities)
+        items, weights = self.__weighted_items()
+        return _weighted_quantiles(items, weights, probabilities)
+
+    def deviation_quantile(self, center, q):
+        """Returns the quantile of the absolute deviations of the numbers
+        from the given center, ie the median absolute deviation for the
+        median and 0.5.
+        """
+        if not self.__count:
+            return float('nan')
+        items, weights = self.__weighted_items()
+        return _weighted_quantiles(np.abs(items - center), weights, [q])[0]
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    # Private
+    def __weighted_items(self):
+        """Returns a tuple with the numpy arrays of the kept numbers and
+        of the number of the numbers that each one stands for.
+        """
+        items = np.concatenate(self.__levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.int64)
+                                  for level, items in enumerate(self.__levels)])
+        return items, weights
+
+    def __capacity(self, level):
+        depth = len(self.__levels) - level - 1
+        return max(int(math.ceil(self.__k * _CAPACITY_DECAY ** depth)), _MIN_CAPACITY)
+
+    def __compress(self):
+        """Compacts the full levels, until every level fits its capacity,
+        which gets smaller as levels are added on top.
+        """
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self.__levels)):
+                items = self.__levels[level]
+                if len(items) <= self.__capacity(level):
+                    continue
+                if level + 1 == len(self.__levels):
+                    self.__levels.append(np.empty(0))
+                items = np.sort(items)
+                # with an odd number one number stays, so the total
+                # weight of the sketch is always the count
+                odd = len(items) % 2
+                offset = int(self.__rng.integers(2))
+                promoted = items[odd + offset::2]
+                self.__levels[level + 1] = np.concatenate([self.__levels[level + 1], promoted])
+                self.__levels[level] = items[:odd]
+                compacted = True
+
+
+class NumericalSummary(object):
+    """Mergeable summary of a stream of numbers for profile_numerical,
+    the count, mean and sum of squared differences of the Welford
+    algorithm, the exact min and max and a QuantileSketch. It holds
+    O(1/error) numbers whatever the count.
+
+    Arguments:
+    :param error: the rank error bound of the quantiles
+    """
+    def __init__(self, error=config.QUANTILE_ERROR):
+        self.__count = 0
+        self.__mean = 0.0
+        self.__m2 = 0.0
+        self.__min = None
+        self.__max = None
+        self.__sketch = QuantileSketch(error)
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def mean(self):
+        return self.__mean
+
+    @property
+    def std(self):
+        """Sample standard deviation with 1 degree of freedom."""
+        if self.__count > 1:
+            return math.sqrt(self.__m2 / (self.__count - 1))
+        return float('nan')
+
+    @property
+    def min(self):
+        return self.__min
+
+    @property
+    def max(self):
+        return self.__max
+
+    @property
+    def sketch(self):
+        return self.__sketch
+
+    def update(self, values):
+        """Adds a block of numbers, a numpy float array or a list."""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        mean = float(np.mean(values))
+        m2 = float(np.sum((values - mean) ** 2))
+        self.__merge_moments(len(values), mean, m2,
+                             float(np.min(values)), float(np.max(values)))
+        self.__sketch.update(values)
+
+    def merge(self, other):
+        """Adds the numbers of an other NumericalSummary."""
+        self.__merge_moments(other.__count, other.__mean, other.__m2,
+                             other.__min, other.__max)
+        self.__sketch.merge(other.__sketch)
+
+    def quantiles(self, probabilities):
+        return self.__sketch.quantiles(probabilities)
+
+    def median_absolute_deviation(self):
+        median = self.__sketch.quantile(0.5)
+        return self.__sketch.deviation_quantile(median, 0.5)
+
+    # Private
+    def __merge_moments(self, count, mean, m2, min_value, max_value):
+        """Chan et al. parallel form of the Welford algorithm."""
+        if count == 0:
+            return
+        total = self.__count + count
+        delta = mean - self.__mean
+        self.__mean += delta * count / total
+        self.__m2 += m2 + delta ** 2 * self.__count * count / total
+        self.__count = total
+        if self.__min is None or min_value < self.__min:
+            self.__min = min_value
+        if self.__max is None or max_value > self.__max:
+            self.__max = max_value
+
+
+class DistinctCounter(object):
+    """HyperLogLog estimate of the number of distinct values of a stream,
+    with 2^precision registers, the relative error is about
+    1.04 / sqrt(2^precision).
+
+    Arguments:
+    :param precision: number of the hash bits that select the register
+    """
+    def __init__(self, precision=config.HLL_PRECISION):
+        self.__precision = precision
+        self.__registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Adds the given values, only their string form matters."""
+        hashes = np.fromiter((_hash64(value) for value in values), dtype=np.uint64)
+        if not len(hashes):
+            return
+        precision = self.__precision
+        indexes = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+        # the position of the first 1 bit in the remaining bits
+        ranks = (64 - precision - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.__registers, indexes, ranks)
+
+    def merge(self, other):
+        np.maximum(self.__registers, other.__registers, out=self.__registers)
+
+    def estimate(self):
+        registers = self.__registers
+        size = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size ** 2 / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            # linear counting for the small cardinalities
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+
+class TopValues(object):
+    """Space-Saving summary of the most frequent values of a stream. It
+    keeps at most capacity values with an overestimated count and the
+    max overestimation of each count. A value with more than
+    count / capacity rows is always kept.
+
+    Arguments:
+    :param capacity: max number of values kept
+    """
+    def __init__(self, capacity=config.TEXT_TOP_VALUES):
+        self.__capacity = capacity
+        # dict {value: [count, error]} in the order of first appearance
+        self.__entries = {}
+        # max count of a value that is not kept
+        self.__floor = 0
+
+    def update(self, counts):
+        """Adds the values of a Counter {value: rows}."""
+        self.__merge(counts.items(), 0)
+
+    def merge(self, other):
+        self.__merge(((value, entry[0], entry[1]) for value, entry in other.__entries.items()),
+                     other.__floor)
+
+    def most_common(self, n):
+        """List of the n tupples (value, count) with the greatest counts."""
+        return heapq.nlargest(n, ((value, entry[0]) for value, entry in self.__entries.items()),
+                              key=itemgetter(1))
+
+    # Private
+    def __merge(self, items, other_floor):
+        entries = self.__entries
+        floor = self.__floor
+        merged = {}
+        for item in items:
+            value, count = item[0], item[1]
+            error = item[2] if len(item) > 2 else 0
+            entry = entries.get(value)
+            if entry is None:
+                # the value may have been dropped here with up to floor rows
+                entry = [floor, floor]
+            merged[value] = [entry[0] + count, entry[1] + error]
+        for value, entry in entries.items():
+            if value not in merged:
+                merged[value] = [entry[0] + other_floor, entry[1] + other_floor]
+        new_floor = floor + other_floor
+        if len(merged) > self.__capacity:
+            kept = heapq.nlargest(self.__capacity + 1, merged.items(),
+                                  key=lambda item: item[1][0])
+            new_floor = max(new_floor, kept.pop()[1][0])
+            kept = set(value for value, _ in kept)
+            merged = {value: entry for value, entry in merged.items() if value in kept}
+        # the old values first, so the order of first appearance is kept
+        self.__entries = {value: merged[value] for value in list(entries) + list(merged)
+                          if value in merged}
+        self.__floor = new_floor
+
+
+class DistinctSample(object):
+    """Bottom-k sample of the distinct values of a stream, the size values
+    with the smallest hashes, with the exact rows of each one. A value
+    enters the sample at its first row or never, so the rows of the kept
+    values are exact and, since most of the distinct values of a long
+    tail are rare, the least frequent of them are rare values too.
+
+    Arguments:
+    :param size: number of distinct values kept
+    """
+    def __init__(self, size=config.TEXT_SAMPLE_VALUES):
+        self.__size = size
+        # dict {value: [hash, rows]}
+        self.__entries = {}
+        # max hash that can be kept, None while the sample is not full
+        self.__threshold = None
+
+    def update(self, counts):
+        """Adds the values of a Counter {value: rows}."""
+        entries = self.__entries
+        for value, rows in counts.items():
+            entry = entries.get(value)
+            if entry is not None:
+                entry[1] += rows
+                continue
+            value_hash = _hash64(value)
+            if self.__threshold is None or value_hash < self.__threshold:
+                entries[value] = [value_hash, rows]
+        self.__prune()
+
+    def merge(self, other):
+        entries = self.__entries
+        for value, (value_hash, rows) in other.__entries.items():
+            entry = entries.get(value)
+            if entry is None:
+                entries[value] = [value_hash, rows]
+            else:
+                entry[1] += rows
+        thresholds = [threshold for threshold in (self.__threshold, other.__threshold)
+                      if threshold is not None]
+        if thresholds:
+            # the values above the lower threshold were dropped by one side
+            self.__threshold = min(thresholds)
+            self.__entries = {value: entry for value, entry in entries.items()
+                              if entry[0] <= self.__threshold}
+        self.__prune()
+
+    def least_common(self, n):
+        """List of the n tupples (value, rows) of the kept values with the
+        least rows, the rows are exact.
+        """
+        items = [(value, entry[1]) for value, entry in self.__entries.items()]
+        return heapq.nsmallest(n, items, key=itemgetter(1))
+
+    # Private
+    def __prune(self):
+        """Keeps the size values with the smallest hashes, it runs when
+        the values are twice the size so it costs O(1) per value.
+        """
+        if len(self.__entries) <= 2 * self.__size:
+            return
+        kept = heapq.nsmallest(self.__size, self.__entries.items(),
+                               key=lambda item: item[1][0])
+        self.__threshold = kept[-1][1][0]
+        self.__entries = dict(kept)
+
+
+class TextSummary(object):
+    """Mergeable summary of a stream of text values for profile_text.
+    While the values are up to exact_values distinct they are counted
+    exactly in a Counter. Above that the distinct values are estimated
+    with a DistinctCounter, the most frequent ones are kept in a
+    TopValues summary and a DistinctSample keeps rare values for the
+    least frequent ones, so the memory doesn't grow with the values.
+
+    Arguments:
+    :param exact_values: max distinct values counted exactly
+    """
+    def __init__(self, exact_values=config.TEXT_EXACT_VALUES):
+        self.__exact_values = exact_values
+        self.__counts = Counter()
+        self.__distinct = None
+        self.__top = None
+        self.__sample = None
+
+    @property
+    def exact(self):
+        """Are the values counted exactly?"""
+        return self.__counts is not None
+
+    @property
+    def unique(self):
+        """Number of distinct values, estimated when not exact."""
+        if self.exact:
+            return len(self.__counts)
+        return self.__distinct.estimate()
+
+    def update(self, values):
+        """Adds a block of values."""
+        self.update_counts(Counter(values))
+
+    def update_counts(self, counts):
+        """Adds the values of a Counter {value: rows}."""
+        if self.exact:
+            self.__counts.update(counts)
+            if len(self.__counts) > self.__exact_values:
+                self.__to_sketch()
+        else:
+            self.__distinct.update(counts)
+            self.__top.update(counts)
+            self.__sample.update(counts)
+
+    def merge(self, other):
+        """Adds the values of an other TextSummary."""
+        if other.exact:
+            self.update_counts(other.__counts)
+            return
+        if self.exact:
+            self.__to_sketch()
+        self.__distinct.merge(other.__distinct)
+        self.__top.merge(other.__top)
+        self.__sample.merge(other.__sample)
+
+    def most_common(self, n):
+        """List of the n tupples (value, rows) with the most rows, like
+        Counter.most_common, the rows are overestimated when not exact.
+        """
+        if self.exact:
+            return self.__counts.most_common(n)
+        return self.__top.most_common(n)
+
+    def least_common(self, n):
+        """List of the n tupples (value, rows) with the least rows, the
+        same as the last n of Counter.most_common() in reverse order.
+        When not exact they are the least frequent values of a sample
+        of the distinct values, with their exact rows.
+        """
+        if self.exact:
+            return least_common(self.__counts, n)
+        return self.__sample.least_common(n)
+
+    # Private
+    def __to_sketch(self):
+        self.__distinct = DistinctCounter()
+        self.__top = TopValues()
+        self.__sample = DistinctSample()
+        counts = self.__counts
+        self.__counts = None
+        self.update_counts(counts)
+
+
+class IntegerSummary(object):
+    """Mergeable summary of a stream of integers for profile_integer,
+    and of the day numbers of the dates for profile_date. The numbers
+    always update a NumericalSummary. While they are up to exact_values
+    distinct they are also counted exactly in a Counter, above that only
+    the most frequent ones are kept in a TopValues summary for the mode
+    and the quantiles come from the sketch of the NumericalSummary.
+
+    Arguments:
+    :param exact_values: max distinct values counted exactly
+    """
+    def __init__(self, exact_values=config.INTEGER_EXACT_VALUES):
+        self.__exact_values = exact_values
+        self.__counts = Counter()
+        self.__top = None
+        self.__summary = NumericalSummary()
+
+    @property
+    def exact(self):
+        """Are the values counted exactly?"""
+        return self.__counts is not None
+
+    @property
+    def counts(self):
+        """Counter {value: rows} in the order of first appearance,
+        None when not exact.
+        """
+        return self.__counts
+
+    @property
+    def count(self):
+        return self.__summary.count
+
+    @property
+    def min(self):
+        return int(self.__summary.min)
+
+    @property
+    def max(self):
+        return int(self.__summary.max)
+
+    def update(self, values):
+        """Adds a block of integers, a list."""
+        self.__summary.update(values)
+        counts = Counter(values)
+        if self.exact:
+            self.__counts.update(counts)
+            if len(self.__counts) > self.__exact_values:
+                self.__to_sketch()
+        else:
+            self.__top.update(counts)
+
+    def merge(self, other):
+        """Adds the values of an other IntegerSummary."""
+        self.__summary.merge(other.__summary)
+        if other.exact and self.exact:
+            self.__counts.update(other.__counts)
+            if len(self.__counts) > self.__exact_values:
+                self.__to_sketch()
+            return
+        if self.exact:
+            self.__to_sketch()
+        if other.exact:
+            self.__top.update(other.__counts)
+        else:
+            self.__top.merge(other.__top)
+
+    def most_common(self, n):
+        """List of the n tupples (value, rows) with the most rows, like
+        Counter.most_common, the rows are overestimated when not exact.
+        """
+        if self.exact:
+            return self.__counts.most_common(n)
+        return self.__top.most_common(n)
+
+    def quantiles(self, probabilities):
+        """The quantiles of the sketch, use the counts when exact."""
+        return self.__summary.quantiles(probabilities)
+
+    # Private
+    def __to_sketch(self):
+        self.__top = TopValues()
+        self.__top.update(self.__counts)
+        self.__counts = None
+
+
+def least_common(counter, n):
+    """The last n items of counter.most_common() in reverse order, with
+    a bounded heap instead of sorting all the items.
+    """
+    return heapq.nsmallest(n, reversed(list(counter.items())), key=itemgetter(1))
+
+
+# Internal
+
+# the rank error of a KLL sketch with first level capacity k is about 1.7 / k
+_KLL_ERROR_CONSTANT = 1.7
+_CAPACITY_DECAY = 2 / 3
+_MIN_CAPACITY = 8
+
+
+def _weighted_quantiles(items, weights, probabilities):
+    """Quantiles of numbers that each one stands for weight numbers,
+    with the linear interpolation of numpy.quantile.
+    """
+    order = np.argsort(items, kind='stable')
+    items = items[order]
+    cumulative = np.cumsum(weights[order])
+    total = int(cumulative[-1])
+    result = []
+    for q in probabilities:
+        position = (total - 1) * q
+        lower = int(math.floor(position))
+        lower_value = items[np.searchsorted(cumulative, lower, side='right')]
+        upper_value = items[np.searchsorted(cumulative, min(lower + 1, total - 1),
+                                            side='right')]
+        result.append(float(lower_value + (upper_value - lower_value) * (position - lower)))
+    return result
+
+
+def _hash64(value):
+    """Stable 64 bit hash of the string form of a value, the same in
+    every process unlike hash().
+    """
+    digest = hashlib.blake2b(str(value).encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _bit_length(values):
+    """Bit length of each number of a numpy uint64 array."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    # frexp gives the exact exponent of numbers below 2^53
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
@@ -7,8 +7,11 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import re
+import numpy as np
 from collections import Counter, OrderedDict
 from mipqctool.config import ERROR, LOGGER, PANDAS_NANS, DEFAULT_MISSING_VALUES
+from mipqctool.model.qctypes.batch import validate_values, undecided_values
+from mipqctool.model.qctypes.sketch import least_common
 
 
 def infer_text(value, **options):
@@ -64,16 +67,31 @@ def profile_text(pairs, **options):
 
     Arguments:
     :param pairs: list with pairs (row, value)
+    :param counts: Counter {value: rows} of the values, if given
+                   it is used instead of the pairs
+    :param summary: TextSummary of a column that is read in blocks, if
+                    given it is used instead of the pairs
     :return: dictionary with stats
     """
     result = OrderedDict()
-    # Get the values in an numpy array
-    values = [r[1] for r in pairs]
-    c = Counter(values)
-    result['unique'] = len(list(c))
-    result['top'], result['freq'] = c.most_common(1)[0]
-    result['top5'] = [count[0] for count in c.most_common(5)]
-    result['bottom5'] = [count[0] for count in c.most_common()[:-6:-1]]
+    summary = options.get('summary')
+    if summary is not None:
+        result['unique'] = summary.unique
+        top5 = summary.most_common(5)
+        bottom5 = summary.least_common(5)
+    else:
+        c = options.get('counts')
+        if c is None:
+            # Get the values in an numpy array
+            values = [r[1] for r in pairs]
+            c = Counter(values)
+        result['unique'] = len(c)
+        top5 = c.most_common(5)
+        # a bounded heap instead of sorting all the values
+        bottom5 = least_common(c, 5)
+    result['top'], result['freq'] = top5[0]
+    result['top5'] = [count[0] for count in top5]
+    result['bottom5'] = [count[0] for count in bottom5]
 
     return result
 
@@ -90,3 +108,39 @@ def suggestd_text(value, **options):
     """
     null = options.get('missing_values', DEFAULT_MISSING_VALUES)[0]
     return null
+
+
+def validate_text(values, **options):
+    """Validates a list of values of a text field at once.
+
+    Arguments:
+    :param values: list with the raw string values
+    :param type: string, the frictionless type of the field
+    :param options: the options of batch.validate_values
+    :return: tuple with the numpy bool masks of the values with datatype
+             violations and of the values with constraint violations
+    """
+    cast = cast_strings if options.get('type') == 'string' else None
+    return validate_values(values, cast, **options)
+
+
+def cast_strings(values, format='default', **options):
+    """Casts a numpy string array like the frictionless string type,
+    returns a tuple with the casted values, the bool mask of the values
+    with invalid format and the bool mask of the values that are left
+    for the frictionless cast (uri, uuid and binary formats).
+    """
+    total = len(values)
+    if format == 'email':
+        emails = np.fromiter((_EMAIL.match(value) is not None for value in values.tolist()),
+                             dtype=bool, count=total)
+        return values, ~emails, np.zeros(total, dtype=bool)
+    elif format in ['uri', 'uuid', 'binary']:
+        return undecided_values(values)
+    return values, np.zeros(total, dtype=bool), np.zeros(total, dtype=bool)
+
+
+# Internal
+
+# the email pattern of the frictionless string type
+_EMAIL = re.compile(r'[^@]+@[^@]+\.[^@]+')
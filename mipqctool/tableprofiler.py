@@ -8,9 +8,9 @@ from __future__ import unicode_literals
 
 from copy import deepcopy
 from collections import namedtuple
-from tableschema.exceptions import CastError
 from tableschema import Schema
 from mipqctool import config
+from mipqctool.model.qcfrictionless.qcmemo import ValueMemo
 
 config.debug(True)
 ErrorType = namedtuple('ErrorType', ['type', 'desc'])
@@ -24,6 +24,9 @@ class TableProfiler(object):
         :param schema: QcSchema descriptor - dictonary """
 
         self.__schema = Schema(schema)
+        # each field is compiled into a validator and its distinct
+        # values are validated once
+        self.__memos = [ValueMemo(field) for field in self.__schema.fields]
         self.__unique_fields_cache = _create_unique_fields_cache(self.schema)
         self.__reset_table_stats()
 
@@ -134,6 +137,7 @@ class TableProfiler(object):
                         and unique constraints
         """
         fields = self.schema.fields
+        memos = self.__memos
         missingvalues = self.schema.descriptor.get('missingValues',
                                                    config.DEFAULT_MISSING_VALUES)
         valid_row = True
@@ -146,15 +150,15 @@ class TableProfiler(object):
             for index, value in enumerate(row):
                 field = fields[index]
                 validated.append({'name': field.name})
-                try:
-                    casted_value = field.cast_value(value)
+                result, casted_value = memos[index].validate(value)
+                if result == config.VALID:
                     validated[index]['value'] = casted_value
                     if casted_value:
                         validated[index]['result'] = 'valid'
                     else:
                         validated[index]['result'] = 'na'
                         na_values += 1
-                except CastError:
+                else:
                     valid_row = False
                     # case of required constraint violation
                     if value in missingvalues:
@@ -0,0 +1,88 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import pytest
+from mipqctool.model.qcfrictionless import QcCache, PlainColumn
+
+HEADERS = ['id', 'name']
+COLUMNS = [['1', '2', '3'], ['alice', '', 'bob "b", jr']]
+
+
+def write_csv(path, content='id,name\n1,alice\n2,\n3,"bob ""b"", jr"\n'):
+    with open(path, 'w') as csv_file:
+        csv_file.write(content)
+    return str(path)
+
+
+def test_store_load(tmp_path):
+    source = write_csv(tmp_path / 'data.csv')
+    cache = QcCache(str(tmp_path / 'cache'))
+    assert cache.load(source, 'utf-8') is None
+    cache.store(source, 'utf-8', HEADERS, COLUMNS)
+    entry = cache.load(source, 'utf-8')
+    assert entry.headers == HEADERS
+    assert entry.total_rows == 3
+    assert [entry.column(0), entry.column(1)] == COLUMNS
+
+
+def test_store_plain(tmp_path):
+    source = write_csv(tmp_path / 'data.csv')
+    cache = QcCache(str(tmp_path / 'cache'))
+    cache.store(source, 'utf-8', HEADERS, [PlainColumn(COLUMNS[0]), COLUMNS[1]])
+    entry = cache.load(source, 'utf-8')
+    assert isinstance(entry.encoded_column(0), PlainColumn)
+    assert not isinstance(entry.encoded_column(1), PlainColumn)
+    assert [entry.column(0), entry.column(1)] == COLUMNS
+
+
+@pytest.mark.parametrize('content, encoding', [
+    ('id,name\n1,alice\n2,\n3,"bob ""b"", jr"\n4,eve\n', 'utf-8'),
+    ('id,name\n1,alice\n2,\n3,"bob ""b"", jr"\n', 'latin-1'),
+])
+def test_stale_entry(tmp_path, content, encoding):
+    source = write_csv(tmp_path / 'data.csv')
+    cache = QcCache(str(tmp_path / 'cache'))
+    cache.store(source, 'utf-8', HEADERS, COLUMNS)
+    write_csv(source, content)
+    assert cache.load(source, encoding) is None
+
+
+def test_stale_entry_same_stat(tmp_path):
+    # a file larger than a few fingerprint blocks edited in place
+    source = str(tmp_path / 'data.csv')
+    content = bytearray(b'id,name\n' + b'1,alice\n' * (1024 ** 2 // 2))
+    with open(source, 'wb') as csv_file:
+        csv_file.write(content)
+    stat = os.stat(source)
+    cache = QcCache(str(tmp_path / 'cache'))
+    cache.store(source, 'utf-8', HEADERS, COLUMNS)
+    # outside the first, the middle and the last block of the file
+    content[3 * len(content) // 10] = ord('b')
+    with open(source, 'r+b') as csv_file:
+        csv_file.write(content)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.stat(source).st_size == stat.st_size
+    assert os.stat(source).st_mtime_ns == stat.st_mtime_ns
+    assert cache.load(source, 'utf-8') is None
+
+
+def test_evict(tmp_path):
+    cache = QcCache(str(tmp_path / 'cache'), max_size=300)
+    first = write_csv(tmp_path / 'first.csv')
+    second = write_csv(tmp_path / 'second.csv')
+    cache.store(first, 'utf-8', HEADERS, COLUMNS)
+    os.utime(os.path.join(cache.entry_path(first), 'meta.json'), (0, 0))
+    cache.store(second, 'utf-8', HEADERS, COLUMNS)
+    assert cache.load(first, 'utf-8') is None
+    assert cache.load(second, 'utf-8') is not None
+
+
+def test_separator_not_cached(tmp_path):
+    source = write_csv(tmp_path / 'data.csv')
+    cache = QcCache(str(tmp_path / 'cache'))
+    assert cache.store(source, 'utf-8', HEADERS, [['1', '2', '3'], ['a\x00', 'b', 'c']]) is None
+    assert cache.load(source, 'utf-8') is None
+    assert os.listdir(cache.cache_dir) == []
@@ -0,0 +1,85 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from mipqctool.model.qcfrictionless import CategoricalColumn, PlainColumn, TypedColumn
+from mipqctool.model.qcfrictionless.qccolumn import ColumnEncoder, typed_array
+
+
+@pytest.mark.parametrize('values, levels, counts', [
+    (['b', 'a', 'b', '', 'a', 'b'], ['b', 'a', ''], [3, 2, 1]),
+    (['1', '1', '1'], ['1'], [3]),
+    ([], [], []),
+])
+def test_encode(values, levels, counts):
+    column = CategoricalColumn.encode(values)
+    assert column.levels == levels
+    assert column.counts.tolist() == counts
+    assert column.tolist() == values
+    assert len(column) == len(values)
+    assert list(column) == values
+
+
+def test_encoder_blocks():
+    encoder = ColumnEncoder()
+    encoder.extend(['x', 'y'])
+    encoder.extend_encoded(np.array([1, 0, 1]), ['z', 'x'])
+    encoder.extend(['z'])
+    column = encoder.column()
+    assert column.levels == ['x', 'y', 'z']
+    assert column.tolist() == ['x', 'y', 'x', 'z', 'x', 'z']
+
+
+@pytest.mark.parametrize('values, plain', [
+    (['a', 'b', 'a', 'b', 'a', 'b'], False),
+    (['a', 'b', 'c', 'a', 'd', 'e'], True),
+])
+def test_encoder_plain(values, plain):
+    encoder = ColumnEncoder(max_distinct_ratio=0.5, min_rows=4)
+    encoder.extend(values[:4])
+    encoder.extend_encoded(np.array([0, 1]), values[4:])
+    column = encoder.column()
+    assert isinstance(column, PlainColumn) == plain
+    assert column.tolist() == values
+    assert column.take([3, 0]) == [values[3], values[0]]
+    # the rows of a plain column are levels of their own
+    assert column.value_codes('a') == ([0, 3] if plain else [0])
+    assert column.rows('a').tolist() == [i for i, value in enumerate(values) if value == 'a']
+    assert column.counts.sum() == len(values)
+    replaced = column.replace({code: 'z' for code in column.value_codes('a')})
+    assert replaced.tolist() == ['z' if value == 'a' else value for value in values]
+
+
+def test_replace():
+    column = CategoricalColumn.encode(['a', 'b', 'c', 'b'])
+    replaced = column.replace({column.code('b'): 'a'})
+    assert replaced.tolist() == ['a', 'a', 'c', 'a']
+    assert replaced.levels == ['a', 'c']
+    assert column.code('d') is None
+    assert column.take([3, 0]) == ['b', 'a']
+
+
+@pytest.mark.parametrize('values, nulls, dtype', [
+    ([1, 2, None], [False, False, True], np.int64),
+    ([datetime.date(2019, 1, 2), None], [False, True], np.dtype('datetime64[D]')),
+    ([Decimal('1.2'), None], [False, True], object),
+    ([2 ** 70, 1], [False, False], object),
+])
+def test_typed_array(values, nulls, dtype):
+    array = typed_array(values, np.array(nulls))
+    assert array.dtype == dtype
+    present = [value for value, null in zip(values, nulls) if not null]
+    assert array[~np.array(nulls)].tolist() == present
+
+
+def test_typed_from_levels():
+    typed = TypedColumn.from_levels(np.array([0, 1, 0, 2]), [5, None, 7],
+                                    np.array([False, True, False]))
+    assert typed.values[~typed.nulls].tolist() == [5, 5, 7]
+    assert typed.not_nulls_total == 3
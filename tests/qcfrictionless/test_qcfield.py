@@ -118,3 +118,45 @@ def test_suggestd(descriptor, value, result):
     with pytest.warns(None) as recorded:
         assert testfield.suggestd(value) == result
         assert recorded.list == []
+
+
+def _violations(field, values):
+    """Returns the datatype and constraint violations of validate."""
+    datatype, constraint = [], []
+    for value in values:
+        try:
+            field.validate(value)
+            datatype.append(False)
+            constraint.append(False)
+        except DataTypeError:
+            datatype.append(True)
+            constraint.append(False)
+        except ConstraintViolationError:
+            datatype.append(False)
+            constraint.append(True)
+    return datatype, constraint
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (DATE_DESC, ['2019-12-12', '2019-02-29', '2020-02-29', '0000-01-01',
+                 '12-3-2018', '2019-1-5', '2019-12-12 ', '', 'NA']),
+    (dict(DATE_DESC, format='%d/%m/%y'), ['31/5/80', ' 5/5/80', '31/4/80',
+                                          '1/1/1980', 'NOTDATE', '']),
+    (NUMERICAL_DESC, ['3.1', '10', '10.0', '10.000001', '0', '-0', '-.1',
+                      '1e1', '1 0', '1,5', 'NOTNUMBER', '', 'NA']),
+    (dict(NUMERICAL_DESC, decimalChar=',', groupChar='.'), ['3,1', '1.000,5', '3.1',
+                                                            '3,1,1', '']),
+    (INTEGER_DESC, ['3', '+5', '-1', '6', ' 4 ', '0004', '1_0', '١', '1.23',
+                    '99999999999999999999', '', 'NA']),
+    (NOMINAL_DESC, ['Category1', 'CATegory1', 'Another3 ', '', 'NA']),
+    (dict(NOMINAL_DESC, type='integer', constraints={'enum': ['1', '2']}),
+     ['1', '01', '2', '3', 'a', '']),
+    (dict(NOMINAL_DESC, type='boolean', trueValues=['1'], falseValues=['0'],
+          constraints={'required': True}), ['1', '0', ' 1', 'true', '', 'NA']),
+    (dict(NOMINAL_DESC, MIPType='text', constraints={'minLength': 2, 'pattern': '[a-z]+'}),
+     ['abc', 'a', 'ABC', 'abc\n', '', 'NA']),
+])
+def test_validate_values(descriptor, values):
+    testfield = QcField(descriptor, missing_values=['', 'NA'])
+    datatype, constraint = testfield.validate_values(values)
+    assert (datatype.tolist(), constraint.tolist()) == _violations(testfield, values)
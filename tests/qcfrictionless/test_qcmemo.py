@@ -0,0 +1,66 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+from tableschema.exceptions import CastError
+from mipqctool.model.qcfrictionless import QcField, ValueMemo
+from mipqctool.model.qcfrictionless.qcmemo import VALID, DATATYPE, CONSTRAINT
+
+INTEGER_DESC = {'name': 'testvar',
+                'format': 'default',
+                'type': 'integer',
+                'MIPType': 'integer',
+                'constraints': {
+                    'minimum': 3,
+                    'maximum': 5
+                    }
+                }
+
+
+@pytest.mark.parametrize('values, result', [
+    (['3', 'a', '6', '3', '', '3'], [VALID, DATATYPE, CONSTRAINT, VALID, VALID, VALID]),
+    ([], []),
+])
+def test_statuses(values, result):
+    memo = ValueMemo(QcField(INTEGER_DESC))
+    assert memo.statuses(values).tolist() == result
+    # the second time every distinct value is found in the memo
+    misses = memo.misses
+    assert memo.statuses(values).tolist() == result
+    assert memo.misses == misses
+    assert len(memo) == len(set(values))
+
+
+def test_cast():
+    memo = ValueMemo(QcField(INTEGER_DESC))
+    assert memo.cast('4') == 4
+    assert memo.cast('4') == 4
+    assert memo.cast('') is None
+    assert memo.cast('') is None
+    for _ in range(2):
+        with pytest.raises(CastError):
+            memo.cast('a')
+    assert (memo.hits, memo.misses) == (3, 3)
+
+
+def test_suggest():
+    memo = ValueMemo(QcField(INTEGER_DESC))
+    assert memo.suggest('4.2', DATATYPE) == '4'
+    assert memo.suggest('8', CONSTRAINT) == ''
+    assert memo.suggest('4.2', DATATYPE) == '4'
+    assert memo.hits == 1
+
+
+def test_eviction():
+    memo = ValueMemo(QcField(INTEGER_DESC), maxsize=2)
+    memo.cast('3')
+    memo.cast('4')
+    memo.cast('3')
+    memo.cast('5')
+    # the least recently used value is evicted
+    assert len(memo) == 2
+    assert '4' not in memo
+    assert '3' in memo and '5' in memo
+    assert memo.statuses(['3', '4', '5', '6']).tolist() == [VALID, VALID, VALID, CONSTRAINT]
@@ -4,11 +4,17 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import os
+import bz2
+import gzip
+import lzma
 import pytest
 import csv
+import numpy as np
 from pathlib import Path
 from unittest.mock import Mock, patch
-from mipqctool.model.qcfrictionless import QcTable
+from mipqctool import config
+from mipqctool.model.qcfrictionless import QcTable, QcCache, QcSchema
+from mipqctool.model.qcfrictionless import CategoricalColumn, PlainColumn
 from mipqctool.exceptions import QCToolException
 
 TESTS_BASE_DIR = Path(__file__).resolve().parent.parent
@@ -16,6 +22,7 @@ TESTS_BASE_DIR = Path(__file__).resolve().parent.parent
 EMPTY_FILEPATH = os.path.join(str(TESTS_BASE_DIR), 'test_datasets', 'empty.csv')
 SIMPLE_FILEPATH = os.path.join(str(TESTS_BASE_DIR), 'test_datasets', 'simple.csv')
 TEST_DATASET_FILEPATH = os.path.join(str(TESTS_BASE_DIR), 'test_datasets', 'test_dataset.csv')
+SPECIAL_CHAR_FILEPATH = os.path.join(str(TESTS_BASE_DIR), 'test_datasets', 'columns_with_special_char.csv')
 
 DATA_MIN = [('key', 'value'), ('one', '1'), ('two', '2')]
 SCHEMA_MIN = {'fields': [{'name': 'key', },
@@ -85,6 +92,250 @@ def test_column_values(path, column_name):
         assert table.column_values(column_name) == result
 
 
+@pytest.mark.parametrize('path', [
+    SIMPLE_FILEPATH,
+    TEST_DATASET_FILEPATH,
+])
+def test_columns_single_pass(path):
+    table = QcTable(path, schema=None)
+    with patch.object(table, '_QcTable__iter_rows',
+                      wraps=table._QcTable__iter_rows) as mocked_iter:
+        columns = [table.column_values(name) for name in table.actual_headers]
+        assert mocked_iter.call_count == 1
+    assert all(len(column) == table.total_rows for column in columns)
+
+
+@pytest.mark.parametrize('path', [
+    SIMPLE_FILEPATH,
+    TEST_DATASET_FILEPATH,
+    SPECIAL_CHAR_FILEPATH,
+])
+def test_native_reader(path):
+    table = QcTable(path, schema=None)
+    assert table.native
+    tabulator_rows = [row for row in table.iter(cast=False)]
+    assert table.raw_rows == tabulator_rows
+    assert table.total_rows == len(tabulator_rows)
+
+
+@pytest.mark.parametrize('content, total_rows', [
+    ('a,b\n1,2\n3,4\n', 2),
+    ('a,b\n1,2\n3,4', 2),
+    ('a,b\r\n1,"multi\r\nline"\r\n3,4\r\n', 2),
+    ('a,b\n1,"quoted ""\n"" value"\n\n5\'11",4\n', 3),
+    ('a,b\n', 0),
+    ('', 0),
+])
+def test_total_rows(tmp_path, content, total_rows):
+    path = tmp_path / 'rows.csv'
+    path.write_bytes(content.encode('utf-8'))
+    table = QcTable(str(path), schema=None)
+    assert table.total_rows == total_rows
+    assert table.total_rows == len(table.raw_rows)
+
+
+@pytest.mark.parametrize('content, rows', [
+    ('a,b\n1,2\n3,4', [['1', '2'], ['3', '4']]),
+    ('a,b\r\n1,"multi\r\nline"\r\n3,4\r\n', [['1', 'multi\nline'], ['3', '4']]),
+    ('a;b\n"x;""y"";z";\xe9\n\n5\'11";4\n', [['x;"y";z', '\xe9'], [], ['5\'11"', '4']]),
+    ('a,b\n', []),
+    ('', []),
+])
+def test_fetch_rows(tmp_path, content, rows):
+    path = tmp_path / 'rows.csv'
+    path.write_bytes(content.encode('utf-8'))
+    cache = QcCache(str(tmp_path / 'cache'))
+    table = QcTable(str(path), schema=None, cache=cache)
+    assert table.fetch_rows(list(range(len(rows), 0, -1))) == rows[::-1]
+    assert table.total_rows == len(rows)
+    with pytest.raises(QCToolException):
+        table.fetch_row(len(rows) + 1)
+    cached = QcTable(str(path), schema=None, cache=cache)
+    with patch('mipqctool.model.qcfrictionless.qctable.index_records') as mocked_index:
+        assert cached.fetch_rows(list(range(1, len(rows) + 1))) == rows
+        assert mocked_index.call_count == 0
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_fetch_rows_quoted_crlf(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr('mipqctool.config.PARSE_PARALLEL_MIN_SIZE', 0)
+    path = tmp_path / 'crlf.csv'
+    path.write_bytes(b'a,b\r\n1,"multi\r\nline"\r\n3,"cr\ronly"\r\n')
+    table = QcTable(str(path), schema=None, workers=workers)
+    assert table.column_values('b') == ['multi\nline', 'cr\nonly']
+    assert [row[1] for row in table.fetch_rows([1, 2])] == table.column_values('b')
+
+
+@pytest.mark.parametrize('path', [
+    SIMPLE_FILEPATH,
+    TEST_DATASET_FILEPATH,
+    SPECIAL_CHAR_FILEPATH,
+])
+def test_parallel_columns(path, monkeypatch):
+    monkeypatch.setattr('mipqctool.config.PARSE_PARALLEL_MIN_SIZE', 0)
+    serial = QcTable(path, schema=None)
+    parallel = QcTable(path, schema=None, workers=3)
+    with patch.object(parallel, '_QcTable__iter_rows') as mocked_iter:
+        assert parallel.columns == serial.columns
+        assert mocked_iter.call_count == 0
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_plain_columns(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr('mipqctool.config.PARSE_PARALLEL_MIN_SIZE', 0)
+    path = tmp_path / 'ids.csv'
+    rows = 3 * config.ENCODE_PLAIN_MIN_ROWS
+    path.write_text('id,group\n' + ''.join('id{},g{}\n'.format(row, row % 3)
+                                          for row in range(rows)))
+    cache = QcCache(str(tmp_path / 'cache'))
+    table = QcTable(str(path), schema=None, cache=cache, workers=workers)
+    # the unique ids are not dictionary encoded
+    assert isinstance(table.encoded_column('id'), PlainColumn)
+    assert isinstance(table.encoded_column('group'), CategoricalColumn)
+    assert table.column_values('id') == ['id{}'.format(row) for row in range(rows)]
+    cached = QcTable(str(path), schema=None, cache=cache)
+    assert isinstance(cached.encoded_column('id'), PlainColumn)
+    assert cached.columns == table.columns
+
+
+@pytest.mark.parametrize('compress', [
+    gzip.compress,
+    bz2.compress,
+    lzma.compress,
+    # multi-member gzip file
+    lambda data: gzip.compress(data[:100]) + gzip.compress(data[100:]),
+])
+def test_compressed(tmp_path, compress):
+    table = QcTable(TEST_DATASET_FILEPATH, schema=None)
+    path = tmp_path / 'compressed.csv.gz'
+    with open(TEST_DATASET_FILEPATH, 'rb') as csv_file:
+        path.write_bytes(compress(csv_file.read()))
+    compressed = QcTable(str(path), schema=None)
+    assert compressed.compression is not None
+    assert compressed.actual_headers == table.actual_headers
+    assert compressed.columns == table.columns
+    assert compressed.total_rows == table.total_rows
+    assert compressed.infer() == table.infer()
+    with pytest.raises(QCToolException):
+        compressed.fetch_row(1)
+
+
+@pytest.mark.parametrize('compress', [gzip.compress, bz2.compress, lzma.compress])
+def test_truncated_compressed(tmp_path, compress):
+    data = b'a,b\n' + b''.join(b'%d,%d\n' % (i, i * 7) for i in range(100000))
+    compressed = compress(data)
+    short = tmp_path / 'short.csv.gz'
+    short.write_bytes(compressed[:20])
+    with pytest.raises(QCToolException, match='Could not read'):
+        QcTable(str(short), schema=None)
+    # the body ends early
+    truncated = tmp_path / 'truncated.csv.gz'
+    truncated.write_bytes(compressed[:len(compressed) // 2])
+    with pytest.raises(QCToolException, match='Could not read'):
+        QcTable(str(truncated), schema=None).columns
+
+
+def test_corrupt_gzip(tmp_path):
+    path = tmp_path / 'corrupt.csv.gz'
+    path.write_bytes(b'\x1f\x8b' + b'garbage' * 10)
+    with pytest.raises(QCToolException, match='Could not read'):
+        QcTable(str(path), schema=None)
+
+
+def test_infer_whole_file(tmp_path, monkeypatch):
+    path = tmp_path / 'late_text.csv'
+    rows = ['id,score,code'] + ['{},{},{}'.format(i, i % 50, i) for i in range(1, 301)]
+    rows[-1] = '300,unknown,300'
+    path.write_text('\n'.join(rows) + '\n')
+    head_sample = QcTable(str(path), schema=None).infer(limit=100)
+    assert head_sample['fields'][1]['MIPType'] == 'integer'
+    monkeypatch.setattr('mipqctool.config.INFER_MAX_DISTINCT', 60)
+    table = QcTable(str(path), schema=None)
+    descriptor = table.infer(limit=100, whole_file=True)
+    assert table.actual_headers == ['id', 'score', 'code']
+    assert descriptor['fields'][1]['MIPType'] == 'text'
+    # the columns with too many values count the guessed qctypes of all the rows
+    assert descriptor['fields'][0]['MIPType'] == 'integer'
+    assert descriptor['fields'][2]['MIPType'] == 'integer'
+
+
+def test_infer_whole_file_overflow(tmp_path, monkeypatch):
+    path = tmp_path / 'late_codes.csv'
+    rows = ['id,code'] + ['{},{}'.format(i, i) for i in range(1, 101)]
+    rows += ['{},{}'.format(i, 'NA' if i % 10 == 0 else 'c{}'.format(i)) for i in range(101, 401)]
+    path.write_text('\n'.join(rows) + '\n')
+    exact = QcTable(str(path), schema=None).infer(whole_file=True)
+    assert exact['fields'][1]['MIPType'] == 'text'
+    assert 'NA' in exact['missingValues']
+    monkeypatch.setattr('mipqctool.config.INFER_MAX_DISTINCT', 60)
+    table = QcTable(str(path), schema=None)
+    with patch('mipqctool.model.qcfrictionless.qctable.QcSchema.guess_qctype',
+               wraps=QcSchema.guess_qctype) as mocked_guess:
+        assert table.infer(whole_file=True) == exact
+        # the values past the first 60 distinct ones, the NA is counted after its first guess
+        assert mocked_guess.call_count == 2 * 340 - 29
+
+
+def test_headers_only():
+    table = QcTable(SIMPLE_FILEPATH, schema=None, headers_only=True)
+    assert table.actual_headers == ['id', 'name', 'diagnosis']
+    with patch.object(table, '_QcTable__open', wraps=table._QcTable__open) as mocked_open:
+        with pytest.raises(QCToolException):
+            table.column_values('id')
+        with pytest.raises(QCToolException):
+            table.total_rows
+        with pytest.raises(QCToolException):
+            table.infer()
+        assert mocked_open.call_count == 0
+
+
+def test_cache(tmp_path):
+    cache = QcCache(str(tmp_path))
+    table = QcTable(TEST_DATASET_FILEPATH, schema=None, cache=cache)
+    columns = table.columns
+    total_rows = table.total_rows
+    cached = QcTable(TEST_DATASET_FILEPATH, schema=None, cache=cache)
+    with patch.object(cached, '_QcTable__iter_rows') as mocked_iter:
+        assert cached.total_rows == total_rows
+        assert cached.column_values('Gender_num') == columns[2]
+        assert cached.columns == columns
+        assert mocked_iter.call_count == 0
+
+
+def test_cache_fingerprint_once(tmp_path):
+    cache = QcCache(str(tmp_path))
+    fingerprint = 'mipqctool.model.qcfrictionless.qccache._fingerprint'
+    table = QcTable(TEST_DATASET_FILEPATH, schema=None, cache=cache)
+    with patch(fingerprint, return_value='key') as mocked_fingerprint:
+        # the rows are counted without the cache
+        total_rows = table.total_rows
+        assert mocked_fingerprint.call_count == 0
+        table.columns
+        table.row_offsets
+        assert mocked_fingerprint.call_count == 1
+    cached = QcTable(TEST_DATASET_FILEPATH, schema=None, cache=cache)
+    with patch(fingerprint, return_value='key') as mocked_fingerprint:
+        assert cached.columns == table.columns
+        assert cached.total_rows == total_rows
+        assert len(cached.row_offsets) == total_rows + 1
+        assert mocked_fingerprint.call_count == 1
+        # the codes of the cached columns are memory mapped
+        codes = cached.encoded_column('Gender_num').codes
+        assert isinstance(codes.base, np.memmap)
+        assert not codes.flags.writeable
+
+
+def test_infer_whole_file_cache(tmp_path):
+    cache = QcCache(str(tmp_path))
+    expected = QcTable(TEST_DATASET_FILEPATH, schema=None).infer(whole_file=True)
+    table = QcTable(TEST_DATASET_FILEPATH, schema=None, cache=cache)
+    assert table.infer(whole_file=True) == expected
+    cached = QcTable(TEST_DATASET_FILEPATH, schema=None, cache=cache)
+    with patch.object(cached, '_QcTable__iter_rows') as mocked_iter:
+        assert cached.infer(whole_file=True) == expected
+        assert mocked_iter.call_count == 0
+
+
 @pytest.mark.parametrize('path, column_name', [
     (SIMPLE_FILEPATH, 'non_exist_column'),
     (SIMPLE_FILEPATH, 'on exist column with spaces')
@@ -120,7 +371,6 @@ MIPMAPCOLUMNS1 = [
     'col17_23_', 'col18_', 'col19_',
     'col20_', 'col21_', 'col_22'
 ]
-SPECIAL_CHAR_FILEPATH = os.path.join(str(TESTS_BASE_DIR), 'test_datasets', 'columns_with_special_char.csv')
 
 @pytest.mark.parametrize('filepath, result', [
     (SPECIAL_CHAR_FILEPATH, MIPMAPCOLUMNS1)
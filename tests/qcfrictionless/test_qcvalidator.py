@@ -0,0 +1,89 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+from datetime import date
+from tableschema import Field
+from tableschema.exceptions import CastError
+from mipqctool.config import VALID, DATATYPE, CONSTRAINT
+from mipqctool.model.qcfrictionless import QcSchema, QcField
+from mipqctool.model.qcfrictionless.qcvalidator import compile_validator
+
+MISSING_VALUES = ['', 'NA']
+
+
+def _cast_result(field, value):
+    """Returns the result code and the casted value of cast_value."""
+    type_error_msg = ('Field "{field.name}" can\'t cast value "{value}" '
+                      'for type "{field.type}" with format "{field.format}"'
+                      ).format(field=field, value=value)
+    try:
+        return VALID, field.cast_value(value)
+    except CastError as e:
+        if str(e) == type_error_msg:
+            return DATATYPE, None
+        # the validator returns the casted value of the constraint violations
+        return CONSTRAINT, field.cast_value(value, constraints=False)
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    ({'name': 'v', 'type': 'integer', 'constraints': {'minimum': 3, 'maximum': 5}},
+     ['3', ' +4 ', '1_0', '٣', '6', '4.0', '', 'NA', 4, 'x']),
+    ({'name': 'v', 'type': 'integer', 'bareNumber': False}, ['3 cm', 'cm', '']),
+    ({'name': 'v', 'type': 'number', 'constraints': {'minimum': 0.5, 'enum': ['1', '2.5', '1e3']}},
+     ['1', '1.0', '2.50', '1000', ' 1 ', '0.4', '1,5', 'x', '']),
+    ({'name': 'v', 'type': 'number', 'decimalChar': ',', 'groupChar': '.'},
+     ['1.000,5', '1,5', '1.5', ',5', '']),
+    ({'name': 'v', 'type': 'date', 'constraints': {'maximum': '2020-01-01'}},
+     ['2019-12-12', '2019-2-29', '2020-02-29', '0000-01-01', '2019-12-12 ', '']),
+    ({'name': 'v', 'type': 'date', 'format': '%d/%m/%y'},
+     ['31/5/80', ' 5/5/80', '31/4/80', '1/1/1980', '']),
+    ({'name': 'v', 'type': 'date', 'format': 'any'}, ['2019-12-12', 'not a date']),
+    ({'name': 'v', 'type': 'boolean', 'trueValues': ['1'], 'falseValues': ['0'],
+      'constraints': {'required': True}}, ['1', ' 0', 'true', '', 'NA']),
+    ({'name': 'v', 'type': 'string', 'constraints': {'enum': ['a', 'b']}}, ['a', 'c', 'A', '']),
+    ({'name': 'v', 'type': 'string', 'constraints': {'minLength': 2, 'pattern': '[a-z]+'}},
+     ['abc', 'a', 'ABC', 'abc\n', '']),
+    ({'name': 'v', 'type': 'string', 'format': 'email'}, ['a@b.gr', 'a@b', '']),
+])
+def test_compile_validator(descriptor, values):
+    field = Field(descriptor, missing_values=MISSING_VALUES)
+    validator = compile_validator(field)
+    for value in values:
+        result, casted_value = validator(value)
+        assert (result, casted_value) == _cast_result(field, value)
+        assert type(casted_value) == type(_cast_result(field, value)[1])
+
+
+def test_schema_validators():
+    schema = QcSchema({'fields': [
+        {'name': 'age', 'type': 'integer', 'MIPType': 'integer',
+         'constraints': {'minimum': 0}},
+        {'name': 'sex', 'type': 'string', 'MIPType': 'nominal',
+         'constraints': {'enum': ['M', 'F']}},
+    ]})
+    validators = schema.validators
+    assert validators['age']('32') == (VALID, 32)
+    assert validators['age']('-1') == (CONSTRAINT, -1)
+    assert validators['age']('x') == (DATATYPE, None)
+    assert validators['sex']('F') == (VALID, 'F')
+    assert validators['sex']('f') == (CONSTRAINT, 'f')
+    assert validators['sex']('') == (VALID, None)
+
+
+def test_field_without_format():
+    field = QcField({'name': 'v', 'type': 'date', 'MIPType': 'date'})
+    validator = compile_validator(field)
+    assert validator('2019-12-12') == (VALID, date(2019, 12, 12))
+    assert validator('12/12/2019') == (DATATYPE, None)
+
+
+@pytest.mark.parametrize('constraints', [{'minimum': 0}, {'maximum': 5}])
+def test_nan_constraints(constraints):
+    field = Field({'name': 'v', 'type': 'number', 'constraints': constraints},
+                  missing_values=MISSING_VALUES)
+    result, casted_value = compile_validator(field)('nan')
+    assert result == CONSTRAINT
+    assert casted_value.is_nan()
@@ -0,0 +1,56 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import random
+from collections import Counter, defaultdict
+
+import pytest
+from mipqctool.model.qcfrictionless import ViolationCounter
+
+VALUES = ['a', 'b', 'a', 'c', 'a', 'd', 'b', 'a', 'e', 'a', 'f', 'a', 'g', 'a']
+RANDOM_VALUES = [str(random.Random(1).randint(0, 30)) for _ in range(500)]
+
+
+@pytest.mark.parametrize('values', [VALUES, RANDOM_VALUES])
+@pytest.mark.parametrize('max_values', [1, 3, 100])
+@pytest.mark.parametrize('chunk_rows', [1, 7, 1000])
+def test_counts(values, max_values, chunk_rows):
+    violations = ViolationCounter(sample_rows=3, max_values=max_values)
+    for start in range(0, len(values), chunk_rows):
+        chunk = ViolationCounter(sample_rows=3, max_values=max_values)
+        for index, value in enumerate(values[start:start + chunk_rows]):
+            chunk.add(value, start + index + 1)
+        violations.update(chunk)
+    counts = Counter(values)
+    rows = defaultdict(set)
+    for row, value in enumerate(values, 1):
+        rows[value].add(row)
+    assert violations.spilled == (len(counts) > max_values)
+    assert violations.total == len(values)
+    assert len(violations) == len(counts)
+    # the values are in the order of their first appearance
+    assert list(violations.items()) == list(counts.items())
+    for value, count in counts.items():
+        assert value in violations
+        assert violations[value] == count
+        example_rows = violations.rows(value)
+        assert len(example_rows) == min(count, 3)
+        assert set(example_rows) <= rows[value]
+    assert 'not_value' not in violations
+    assert violations.rows('not_value') == []
+    violations.close()
+
+
+def test_uniform_rows():
+    """Every row of a value has the same chance to be an example row."""
+    hits = Counter()
+    for seed in range(200):
+        violations = ViolationCounter(sample_rows=2, max_values=1, seed=seed)
+        for row in range(1, 11):
+            violations.add('x', row)
+            violations.add(str(row), row)
+        hits.update(violations.rows('x'))
+    assert set(hits) == set(range(1, 11))
+    assert max(hits.values()) < 3 * min(hits.values())
@@ -5,8 +5,11 @@ from __future__ import unicode_literals
 
 import pytest
 import csv
+import numpy as np
+from collections import Counter
 from datetime import datetime, date
 from mipqctool.model import qctypes
+from mipqctool.model.qctypes.date import cast_dates
 from mipqctool.config import ERROR, DEFAULT_DATE_FORMAT
 from mipqctool.config import DEFAULT_MISSING_VALUES
 
@@ -51,11 +54,17 @@ def test_describe_date(pattern, result):
     ('tests/test_datasets/dates.csv', 1, '%Y-%m-%d',
      {'mode': date(2001, 5, 31), 'freq': 6,
       'min': date(2001, 5, 31),
-      'max': date(2001, 6, 26)}),
+      'max': date(2001, 6, 26),
+      'q1': date(2001, 6, 1),
+      'median': date(2001, 6, 9),
+      'q3': date(2001, 6, 17)}),
     ('tests/test_datasets/dates.csv', 2, '%d/%m/%Y',
      {'mode': date(2011, 6, 16), 'freq': 2,
       'min': date(1936, 6, 4),
-      'max': date(2019, 5, 31)}),
+      'max': date(2019, 5, 31),
+      'q1': date(1980, 8, 24),
+      'median': date(1998, 5, 3),
+      'q3': date(2006, 5, 10)}),
 ])
 def test_profile_date(path, variable, format, result):
     pairs = []
@@ -72,8 +81,17 @@ def test_profile_date(path, variable, format, result):
             finally:
                 row_count += 1
     with pytest.warns(None) as recorded:
-        assert qctypes.profile_date(pairs) == result
+        stats = qctypes.profile_date(pairs)
+        years = stats.pop('years')
+        assert stats == result
         assert recorded.list == []
+    assert years == sorted(Counter(pair[1].year for pair in pairs).items())
+    summary = qctypes.IntegerSummary()
+    summary.update([(pair[1] - date(1970, 1, 1)).days for pair in pairs])
+    counted = qctypes.profile_date(None, summary=summary,
+                                   years=Counter(pair[1].year for pair in pairs))
+    assert counted.pop('years') == years
+    assert counted == stats
 
 
 @pytest.mark.parametrize('value, formatd, result', [
@@ -91,3 +109,29 @@ def test_suggestd_date(value, formatd, result):
     with pytest.warns(None) as recorded:
         assert qctypes.suggestd_date(value, format=formatd) == result
         assert recorded.list == []
+
+
+@pytest.mark.parametrize('dateformat, values', [
+    ('%Y-%m-%d', ['2019-12-12', '2019-2-29', '2020-02-29', '0000-01-01', '2019-12-12x']),
+    ('%d/%m/%Y', ['31/5/1980', ' 5/05/1980', '31/4/1980', '5/5/80', '5/13/1980']),
+    ('%d.%m.%y', ['31.5.80', '1.1.68', '1.1.69', '1.1.1969', '29.2.00']),
+    ('%d %m %Y', ['31  5 1980', '31 5 1980', '315 1980', '31 5 ١٩٨٠']),
+    ('%m%d%Y', ['1231980', '12311980', '2291980']),
+])
+def test_cast_dates(dateformat, values):
+    casted, errors, undecided = cast_dates(np.asarray(values), dateformat)
+    for value, casted_value, error in zip(values, casted.tolist(), errors.tolist()):
+        try:
+            expected = datetime.strptime(value, dateformat).date()
+        except ValueError:
+            expected = None
+        assert error == (expected is None)
+        if not error:
+            assert casted_value == expected
+    assert not undecided.any()
+
+
+@pytest.mark.parametrize('dateformat', ['any', 'fmt:%Y', '%d %b %Y', '%Y %y'])
+def test_cast_dates_undecided(dateformat):
+    _, _, undecided = cast_dates(np.asarray(['1 Jan 2000']), dateformat)
+    assert undecided.all()
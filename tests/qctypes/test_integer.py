@@ -5,8 +5,11 @@ from __future__ import unicode_literals
 
 import pytest
 import csv
+import numpy as np
 from random import randint
+from collections import Counter
 from mipqctool.model import qctypes
+from mipqctool.model.qctypes.integer import cast_integers
 from mipqctool.config import ERROR
 
 # Tests
@@ -129,3 +132,44 @@ def test_profile_integer(path, variable, result):
     with pytest.warns(None) as recorded:
         assert qctypes.profile_integer(pairs) == result
         assert recorded.list == []
+
+
+@pytest.mark.parametrize('value, result, error, undecided', [
+    ('12', 12, False, False),
+    (' -12 ', -12, False, False),
+    ('+0012', 12, False, False),
+    ('1.2', 0, True, False),
+    ('--1', 0, True, False),
+    ('', 0, True, False),
+    ('1_000', 0, False, True),
+    ('١٢', 0, False, True),
+    ('1234567890123456789', 0, False, True),
+])
+def test_cast_integers(value, result, error, undecided):
+    casted, errors, undecideds = cast_integers(np.asarray([value]))
+    assert (casted[0], errors[0], undecideds[0]) == (result, error, undecided)
+
+
+@pytest.mark.parametrize('values', [
+    [5],
+    [3, 1, 2, 1, 2],
+    [2, 1, 1, 2, -7],
+    list(np.random.default_rng(0).integers(0, 100, 1000)),
+    list(np.random.default_rng(0).integers(-2 ** 62, 2 ** 62, 1000)),
+    [2 ** 70, 1, 1, 2 ** 70, 3],
+])
+def test_profile_integer_counts(values):
+    """The same stats with the Counter and numpy.quantile ones, the
+    mode is the first one in the order of the values."""
+    array = np.asarray(values)
+    mode, freq = Counter(values).most_common(1)[0]
+    result = {'mode': mode, 'freq': freq,
+              'min': min(values), 'max': max(values),
+              'q1': int(np.quantile(array, 0.25)),
+              'median': int(np.median(array)),
+              'q3': int(np.quantile(array, 0.75))}
+    pairs = list(enumerate(values, 1))
+    assert qctypes.profile_integer(pairs) == result
+    summary = qctypes.IntegerSummary()
+    summary.update(values)
+    assert qctypes.profile_integer(None, summary=summary) == result
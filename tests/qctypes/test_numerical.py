@@ -5,8 +5,10 @@ from __future__ import unicode_literals
 
 import pytest
 import csv
+import numpy as np
 from copy import copy
 from mipqctool.model import qctypes
+from mipqctool.model.qctypes.numerical import cast_numbers, parse_numbers
 from mipqctool.config import ERROR
 
 
@@ -89,7 +91,8 @@ def test_get_suffix_numerical(pattern, result):
       'q1': -0.773279829, 'median': -0.0678199662,
       'q3': 0.610162354, 'upperbound': 2.7816056467,
       'lowerbound': -2.8271230549, 'outliers': 1,
-      'outliersrows': [(93, 3.0881165577)]}),
+      'outliersrows': [(93, 3.0881165577)],
+      'outliermethod': 'zscore (threshold 3)'}),
     ('tests/test_datasets/random_numeric.csv', 3,
      {'mean': 3.6610246582, 'std': 2.6826183943,
       'min': 0.0189946653, 'max': 14.5695842802,
@@ -97,7 +100,8 @@ def test_get_suffix_numerical(pattern, result):
       'q3': 4.6617991592, 'upperbound': 11.7088798411,
       'lowerbound': -4.3868305247, 'outliers': 2,
       'outliersrows': [(49, 14.5695842802),
-                       (93, 14.049638643)]})
+                       (93, 14.049638643)],
+      'outliermethod': 'zscore (threshold 3)'})
 ])
 def test_profile_numerical(path, variable, result):
     pairs = []
@@ -114,3 +118,34 @@ def test_profile_numerical(path, variable, result):
     with pytest.warns(None) as recorded:
         assert rounded == result
         assert recorded.list == []
+
+
+@pytest.mark.parametrize('value, options, result, error, undecided', [
+    ('1.5', {}, 1.5, False, False),
+    ('-.5', {}, -0.5, False, False),
+    ("1'000,5", {'decimalChar': ',', 'groupChar': "'"}, 1000.5, False, False),
+    ('1.2.3', {}, 0, True, False),
+    ('1x', {}, 0, True, False),
+    ('', {}, 0, True, False),
+    ('1e3', {}, 0, False, True),
+    ('1 000', {}, 0, False, True),
+    ('1.5', {'bareNumber': False}, 0, False, True),
+])
+def test_cast_numbers(value, options, result, error, undecided):
+    casted, errors, undecideds = cast_numbers(np.asarray([value]), **options)
+    assert (casted[0], errors[0], undecideds[0]) == (result, error, undecided)
+
+
+@pytest.mark.parametrize('values, options, result', [
+    (['1.5', '-.5', '1e3', ' 2 ', '1_0'], {}, [1.5, -0.5, 1000.0, 2.0, 10.0]),
+    (["1'000,5", '2,5'], {'decimalChar': ',', 'groupChar': "'"}, [1000.5, 2.5]),
+    (['1.5 cm', '2cm', '3.5'], {'bareNumber': False, 'suffix': 'cm'}, [1.5, 2.0, 3.5]),
+    (['1,5 m2', '2,5'], {'decimalChar': ',', 'bareNumber': False, 'suffix': 'm2'}, [1.5, 2.5]),
+    (['NA', '', 'x', '1.2.3', '1'], {'missing_values': ['NA']},
+     [np.nan, np.nan, np.nan, np.nan, 1.0]),
+    ([], {}, []),
+])
+def test_parse_numbers(values, options, result):
+    parsed = parse_numbers(values, **options)
+    assert parsed.dtype == np.float64
+    np.testing.assert_array_equal(parsed, np.asarray(result, dtype=np.float64))
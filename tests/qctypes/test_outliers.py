@@ -0,0 +1,44 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+import numpy as np
+from mipqctool.model import qctypes
+from mipqctool.model.qctypes import outlier_bounds, outlier_indexes
+from mipqctool.exceptions import QCToolException
+
+VALUES = [1.0, 2.0, 2.5, 3.0, 3.0, 3.5, 4.0, 5.0, 40.0, -30.0]
+
+
+@pytest.mark.parametrize('method, threshold, low, high, indexes', [
+    ('zscore', 1, np.mean(VALUES) - np.std(VALUES, ddof=1),
+     np.mean(VALUES) + np.std(VALUES, ddof=1), [8, 9]),
+    ('iqr', 1.5, 2.125 - 1.5 * 1.75, 3.875 + 1.5 * 1.75, [8, 9]),
+    ('mad', 3, 3.0 - 3 * 1.4826 * 1.0, 3.0 + 3 * 1.4826 * 1.0, [8, 9]),
+    ('mad', 1, 3.0 - 1.4826, 3.0 + 1.4826, [0, 7, 8, 9]),
+])
+def test_outlier_methods(method, threshold, low, high, indexes):
+    stats = qctypes.profile_numerical(list(enumerate(VALUES, 1)), threshold, method=method)
+    assert (stats['lowerbound'], stats['upperbound']) == pytest.approx((low, high))
+    assert outlier_indexes(VALUES, low, high, method).tolist() == indexes
+    assert stats['outliersrows'] == [(index + 1, VALUES[index]) for index in indexes]
+    assert stats['outliermethod'] == '{} (threshold {})'.format(method, threshold)
+
+
+@pytest.mark.parametrize('method, outliers', [
+    ('zscore', 4),
+    ('iqr', 0),
+    ('mad', 0),
+])
+def test_zero_spread(method, outliers):
+    """The robust bounds are not outliers, the zscore ones are."""
+    stats = {'mean': 2.0, 'std': 0.0, 'q1': 2.0, 'q3': 2.0, 'median': 2.0, 'mad': 0.0}
+    low, high = outlier_bounds(stats, method)
+    assert len(outlier_indexes([2.0] * 4, low, high, method)) == outliers
+
+
+def test_unknown_method():
+    with pytest.raises(QCToolException):
+        qctypes.profile_numerical([(1, 1.0), (2, 2.0)], method='grubbs')
@@ -0,0 +1,217 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+import numpy as np
+from collections import Counter
+from mipqctool import config
+from mipqctool.model import qctypes
+from mipqctool.model.qctypes import QuantileSketch, NumericalSummary
+from mipqctool.model.qctypes import DistinctCounter, TopValues, TextSummary, IntegerSummary
+from mipqctool.model.qctypes import DistinctSample
+
+PROBABILITIES = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1]
+
+
+def random_values(size):
+    return np.random.default_rng(0).lognormal(size=size)
+
+
+@pytest.mark.parametrize('size', [1, 2, 10, 500])
+@pytest.mark.parametrize('chunk_rows', [1, 7, 1000])
+def test_exact_quantiles(size, chunk_rows):
+    """Up to the capacity of the first level the quantiles are exact."""
+    values = random_values(size)
+    sketch = QuantileSketch(error=0.001)
+    for start in range(0, size, chunk_rows):
+        chunk = QuantileSketch(error=0.001)
+        chunk.update(values[start:start + chunk_rows])
+        sketch.merge(chunk)
+    assert sketch.count == size
+    assert sketch.quantiles(PROBABILITIES) == pytest.approx(np.quantile(values, PROBABILITIES))
+
+
+@pytest.mark.parametrize('error', [0.01, 0.001])
+@pytest.mark.parametrize('chunk_rows', [1000, 100000])
+def test_quantile_error(error, chunk_rows):
+    values = random_values(200000)
+    sketch = QuantileSketch(error=error)
+    for start in range(0, len(values), chunk_rows):
+        chunk = QuantileSketch(error=error)
+        chunk.update(values[start:start + chunk_rows])
+        sketch.merge(chunk)
+    assert sketch.count == len(values)
+    assert sketch.size < 10 / error
+    ordered = np.sort(values)
+    for q, quantile in zip(PROBABILITIES, sketch.quantiles(PROBABILITIES)):
+        rank = np.searchsorted(ordered, quantile) / len(values)
+        assert abs(rank - q) <= 2 * error
+
+
+@pytest.mark.parametrize('size, chunk_rows', [
+    (1, 1),
+    (100, 3),
+    (100000, 10000)
+])
+def test_numerical_summary(size, chunk_rows):
+    values = random_values(size) * 1e6 + 1e9
+    summary = NumericalSummary()
+    for start in range(0, size, chunk_rows):
+        chunk = NumericalSummary()
+        chunk.update(values[start:start + chunk_rows])
+        summary.merge(chunk)
+    assert summary.count == size
+    assert summary.mean == pytest.approx(np.mean(values))
+    assert summary.min == np.min(values)
+    assert summary.max == np.max(values)
+    if size > 1:
+        assert summary.std == pytest.approx(np.std(values, ddof=1))
+    stats = qctypes.profile_numerical(None, summary=summary)
+    assert stats['median'] == pytest.approx(np.median(values), rel=1e-3)
+    assert stats['outliers'] == 0
+
+
+def zipf_texts(size):
+    ranks = np.random.default_rng(0).zipf(1.5, size=size)
+    return ['text{}'.format(rank) for rank in ranks.tolist()]
+
+
+@pytest.mark.parametrize('distinct', [0, 1, 100, 10000, 200000])
+def test_distinct_counter(distinct):
+    counter = DistinctCounter()
+    values = ['value{}'.format(index) for index in range(distinct)]
+    counter.update(values[:distinct // 2])
+    other = DistinctCounter()
+    # the repeated values are not counted twice
+    other.update(values[distinct // 3:])
+    counter.merge(other)
+    assert counter.estimate() == pytest.approx(distinct, rel=0.03)
+
+
+@pytest.mark.parametrize('chunk_rows', [100, 10000])
+def test_top_values(chunk_rows):
+    values = zipf_texts(100000)
+    top = TopValues(capacity=100)
+    for start in range(0, len(values), chunk_rows):
+        chunk = TopValues(capacity=100)
+        chunk.update(Counter(values[start:start + chunk_rows]))
+        top.merge(chunk)
+    exact = Counter(values).most_common(5)
+    result = top.most_common(5)
+    assert [value for value, _ in result] == [value for value, _ in exact]
+    for (_, count), (_, exact_count) in zip(result, exact):
+        # the counts are overestimated by at most the rows / capacity
+        assert exact_count <= count <= exact_count + len(values) / 100
+
+
+@pytest.mark.parametrize('values', [
+    ['a', 'b', 'a', 'c', 'd', 'b', 'a', 'e', 'f', 'g'],
+    ['text{}'.format(index % 50) for index in range(1000)]
+])
+@pytest.mark.parametrize('chunk_rows', [1, 3, 1000])
+def test_exact_text_summary(values, chunk_rows):
+    """With few distinct values the stats are the same with the Counter ones."""
+    summary = TextSummary()
+    for start in range(0, len(values), chunk_rows):
+        chunk = TextSummary()
+        chunk.update(values[start:start + chunk_rows])
+        summary.merge(chunk)
+    assert summary.exact
+    pairs = list(enumerate(values, 1))
+    assert qctypes.profile_text(None, summary=summary) == qctypes.profile_text(pairs)
+    counts = Counter(values)
+    assert summary.least_common(5) == counts.most_common()[:-6:-1]
+
+
+def test_text_summary():
+    values = zipf_texts(100000)
+    summary = TextSummary(exact_values=1000)
+    for start in range(0, len(values), 5000):
+        summary.update(values[start:start + 5000])
+    assert not summary.exact
+    exact = qctypes.profile_text(list(enumerate(values, 1)))
+    stats = qctypes.profile_text(None, summary=summary)
+    assert stats['unique'] == pytest.approx(exact['unique'], rel=0.03)
+    assert stats['top'] == exact['top']
+    assert stats['top5'] == exact['top5']
+    assert len(stats['bottom5']) == 5
+    # the least frequent values are rare values, not frequent ones
+    counts = Counter(values)
+    assert [counts[value] for value in stats['bottom5']] == [1] * 5
+
+
+@pytest.mark.parametrize('chunk_rows', [1000, 100000])
+def test_distinct_sample(chunk_rows):
+    values = zipf_texts(100000)
+    sample = DistinctSample(size=100)
+    for start in range(0, len(values), chunk_rows):
+        chunk = DistinctSample(size=100)
+        chunk.update(Counter(values[start:start + chunk_rows]))
+        sample.merge(chunk)
+    counts = Counter(values)
+    kept = sample.least_common(len(counts))
+    assert 100 <= len(kept) <= 200
+    # the rows of the kept values are exact
+    assert all(rows == counts[value] for value, rows in kept)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 1000])
+def test_exact_integer_summary(chunk_rows):
+    """With few distinct values the stats are the same with the exact ones."""
+    values = np.random.default_rng(0).integers(-50, 50, 1000).tolist()
+    summary = IntegerSummary()
+    for start in range(0, len(values), chunk_rows):
+        chunk = IntegerSummary()
+        chunk.update(values[start:start + chunk_rows])
+        summary.merge(chunk)
+    assert summary.exact
+    assert summary.count == len(values)
+    pairs = list(enumerate(values, 1))
+    assert qctypes.profile_integer(None, summary=summary) == qctypes.profile_integer(pairs)
+
+
+@pytest.mark.parametrize('method', ['zscore', 'iqr', 'mad'])
+def test_counts_profiles(method):
+    """The stats from the rows of each distinct value are the same with
+    the stats of the values.
+    """
+    values = np.random.default_rng(0).integers(-50, 50, 1000).tolist()
+    pairs = list(enumerate(values, 1))
+    counts = Counter(values)
+    assert qctypes.profile_integer(None, counts=counts) == qctypes.profile_integer(pairs)
+    days = Counter(value + 18000 for value in values)
+    dates = [(row, np.datetime64(value + 18000, 'D').item()) for row, value in pairs]
+    assert qctypes.profile_date(None, counts=days) == qctypes.profile_date(dates)
+    numbers = Counter(value / 4 for value in values)
+    expected = qctypes.profile_numerical([(row, value / 4) for row, value in pairs],
+                                         method=method)
+    stats = qctypes.profile_numerical(None, counts=numbers, method=method)
+    for key in ['mean', 'std', 'min', 'max', 'q1', 'median', 'q3', 'upperbound', 'lowerbound']:
+        assert stats[key] == pytest.approx(expected[key])
+    if method == 'mad':
+        assert stats['mad'] == pytest.approx(expected['mad'])
+
+
+@pytest.mark.parametrize('exact_chunks', [True, False])
+def test_integer_summary(exact_chunks):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 100000, 100000)
+    # a frequent value for the mode
+    values[rng.integers(0, len(values), 2000)] = 4242
+    values = values.tolist()
+    summary = IntegerSummary(exact_values=1000)
+    for start in range(0, len(values), 5000):
+        chunk = IntegerSummary(exact_values=10000 if exact_chunks else 1000)
+        chunk.update(values[start:start + 5000])
+        summary.merge(chunk)
+    assert not summary.exact
+    assert summary.count == len(values)
+    exact = qctypes.profile_integer(list(enumerate(values, 1)))
+    stats = qctypes.profile_integer(None, summary=summary)
+    assert (stats['mode'], stats['min'], stats['max']) == (exact['mode'], exact['min'], exact['max'])
+    # the rows of the mode are overestimated by at most the rows / capacity
+    assert exact['freq'] <= stats['freq'] <= exact['freq'] + len(values) / config.TEXT_TOP_VALUES
+    for key in ['q1', 'median', 'q3']:
+        assert abs(stats[key] - exact[key]) <= 3 * config.QUANTILE_ERROR * 100000
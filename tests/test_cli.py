@@ -0,0 +1,43 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import os
+import shutil
+import pytest
+from unittest.mock import patch
+from click.testing import CliRunner
+from mipqctool import cli
+from mipqctool.model.qcfrictionless import QcTable
+
+
+APP_PATH = os.path.abspath(os.path.dirname(__file__))
+DATASET1_PATH = os.path.join(APP_PATH, 'test_datasets/test_dataset.csv')
+METADATA1_PATH = os.path.join(APP_PATH, 'test_datasets/test_dataset.json')
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_csv_jobs(tmp_path, monkeypatch, jobs):
+    monkeypatch.setattr('mipqctool.config.PARSE_PARALLEL_MIN_SIZE', 0)
+    csvpath = shutil.copy(DATASET1_PATH, str(tmp_path))
+    runner = CliRunner()
+    with patch('mipqctool.cli.QcTable', wraps=QcTable) as mocked_table:
+        result = runner.invoke(cli.main, ['csv', csvpath, METADATA1_PATH,
+                                          '-m', 'qc', '-j', str(jobs)])
+    assert result.exit_code == 0, result.output
+    assert mocked_table.call_args[1]['workers'] == jobs
+    assert os.path.isfile(str(tmp_path / 'test_dataset_report.xlsx'))
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_infercsv_jobs(tmp_path, monkeypatch, jobs):
+    monkeypatch.setattr('mipqctool.config.PARSE_PARALLEL_MIN_SIZE', 0)
+    csvpath = shutil.copy(DATASET1_PATH, str(tmp_path))
+    runner = CliRunner()
+    with patch('mipqctool.cli.QcTable', wraps=QcTable) as mocked_table:
+        result = runner.invoke(cli.main, ['infercsv', '--schema_spec', 'qc',
+                                          '-j', str(jobs), csvpath])
+    assert result.exit_code == 0, result.output
+    assert mocked_table.call_args[1]['workers'] == jobs
+    assert os.path.isfile(str(tmp_path / 'test_dataset_qcschema.json'))
@@ -5,9 +5,11 @@ from __future__ import unicode_literals
 
 import pytest
 import os
+import pickle
+import numpy as np
 from pathlib import Path
 from mipqctool.controller.columnreport import ColumnReport
-from mipqctool.model.qcfrictionless import QcField
+from mipqctool.model.qcfrictionless import QcField, CategoricalColumn, PlainColumn, TypedColumn
 from mipqctool.config import ERROR
 
 # Tests
@@ -58,6 +60,18 @@ DATE_VALUES = ['1/12/2019', '1-21-2013', '15 Aug 2012', '20011212', '',
 NOMINAL_VALUES = ['cAtegory1', 'not_value', 'Category1', 'Category2',
                   'anoter1', '', '', 'Category2', 'CATEGOR2']
 
+
+def assert_same_stats(stats, expected):
+    """The moments of the corrected edits are updated incrementally,
+    so the float stats may differ in the last digits.
+    """
+    assert list(stats) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert stats[key] == pytest.approx(value, nan_ok=True)
+        else:
+            assert stats[key] == value
+
 @pytest.mark.parametrize('descriptor, values, result', [
     (INTEGER_DESC, INTEGER_VALUES, [8]),
     (NUMERICAL_DESC, NUMERICAL_VALUES, [7, 8]),
@@ -278,6 +292,260 @@ def test_corrected_values(descriptor, values, result):
         assert recorded.list == []
 
 
+@pytest.mark.parametrize('descriptor, values', [
+    (INTEGER_DESC, INTEGER_VALUES),
+    (NUMERICAL_DESC, NUMERICAL_VALUES),
+    (DATE_DESC, DATE_VALUES),
+    (NOMINAL_DESC, NOMINAL_VALUES)
+])
+def test_encoded_values(descriptor, values):
+    testcolumn = ColumnReport(values, QcField(descriptor))
+    testcolumn.validate()
+    encodedcolumn = ColumnReport(CategoricalColumn.encode(values), QcField(descriptor))
+    encodedcolumn.validate()
+    encodedcolumn.apply_corrections()
+    testcolumn.apply_corrections()
+    with pytest.warns(None) as recorded:
+        assert encodedcolumn.stats == testcolumn.stats
+        assert encodedcolumn.corrected_values == testcolumn.corrected_values
+        assert encodedcolumn.null_row_numbers == testcolumn.null_row_numbers
+        typed = encodedcolumn.typed_values
+        assert len(typed) == len(values)
+        assert typed.not_nulls_total == encodedcolumn.not_nulls_total
+        assert recorded.list == []
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (INTEGER_DESC, INTEGER_VALUES),
+    (NUMERICAL_DESC, NUMERICAL_VALUES),
+    (DATE_DESC, DATE_VALUES),
+    (NOMINAL_DESC, NOMINAL_VALUES)
+])
+def test_restored_validation(descriptor, values):
+    testcolumn = ColumnReport(values, QcField(descriptor))
+    testcolumn.validate()
+    result = pickle.loads(pickle.dumps(testcolumn.validation_result))
+    restored = ColumnReport(values, QcField(descriptor))
+    restored.validate(result)
+    assert restored.stats == testcolumn.stats
+    assert restored.all_corrections == testcolumn.all_corrections
+    assert restored.null_row_numbers == testcolumn.null_row_numbers
+    assert restored.invalid_rows == testcolumn.invalid_rows
+    assert restored.typed_values.values.tolist() == testcolumn.typed_values.values.tolist()
+    for column in [testcolumn, restored]:
+        for value in column.dnulls | column.cnulls:
+            column.update_correction(value, 'NULL')
+        column.apply_corrections()
+    with pytest.warns(None) as recorded:
+        assert restored.stats == testcolumn.stats
+        assert restored.corrected_values == testcolumn.corrected_values
+        assert restored.filled_row_numbers == testcolumn.filled_row_numbers
+        assert recorded.list == []
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (INTEGER_DESC, INTEGER_VALUES + ['not_int']),
+    (NUMERICAL_DESC, NUMERICAL_VALUES + ['not_num']),
+    (DATE_DESC, DATE_VALUES + ['not_date']),
+    (NOMINAL_DESC, NOMINAL_VALUES + ['not_value'])
+])
+def test_plain_values(descriptor, values):
+    testcolumn = ColumnReport(values, QcField(descriptor))
+    testcolumn.validate()
+    plaincolumn = ColumnReport(PlainColumn(values), QcField(descriptor))
+    plaincolumn.validate()
+    assert plaincolumn.stats == testcolumn.stats
+    assert plaincolumn.all_corrections == testcolumn.all_corrections
+    invalid = values[-1]
+    assert plaincolumn.example_rows(invalid) == testcolumn.example_rows(invalid)
+    # the correction of a repeated value is set on all its rows
+    for column in [testcolumn, plaincolumn]:
+        column.update_correction(invalid, 'NULL')
+        column.apply_corrections()
+    with pytest.warns(None) as recorded:
+        assert plaincolumn.stats == testcolumn.stats
+        assert plaincolumn.corrected_values == testcolumn.corrected_values
+        assert plaincolumn.null_row_numbers == testcolumn.null_row_numbers
+        assert recorded.list == []
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (INTEGER_DESC, INTEGER_VALUES),
+    (NUMERICAL_DESC, NUMERICAL_VALUES),
+    (DATE_DESC, DATE_VALUES),
+    (NOMINAL_DESC, NOMINAL_VALUES)
+])
+def test_cast_once(descriptor, values):
+    testfield = QcField(descriptor)
+    casted = []
+    cast_value = testfield.cast_value
+
+    def counted_cast_value(value, **options):
+        if not options:
+            casted.append(value)
+        return cast_value(value, **options)
+
+    testfield.cast_value = counted_cast_value
+    testcolumn = ColumnReport(values, testfield)
+    testcolumn.validate()
+    # each distinct valid value is casted once
+    assert len(casted) == len(set(casted))
+    valid_casts = len(casted)
+    testcolumn.apply_corrections()
+    for value in testcolumn.dnulls | testcolumn.cnulls:
+        testcolumn.update_correction(value, 'NULL')
+    # then only the new corrected values are casted
+    assert len(casted) == len(set(casted))
+    assert len(casted) - valid_casts <= len(set(values))
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (INTEGER_DESC, INTEGER_VALUES),
+    (NUMERICAL_DESC, NUMERICAL_VALUES),
+    (DATE_DESC, DATE_VALUES),
+    (NOMINAL_DESC, NOMINAL_VALUES),
+])
+@pytest.mark.parametrize('applied', [True, False])
+def test_row_masks(descriptor, values, applied):
+    testfield = QcField(descriptor)
+    testcolumn = ColumnReport(values, testfield)
+    testcolumn.validate()
+    if applied:
+        testcolumn.apply_corrections()
+    masks = [testcolumn.invalid_mask, testcolumn.valid_mask,
+             testcolumn.null_mask, testcolumn.filled_mask]
+    for mask in masks:
+        assert mask.dtype == bool
+        assert len(mask) == len(values)
+    invalid, valid, nulls, filled = [set((np.flatnonzero(mask) + 1).tolist()) for mask in masks]
+    assert invalid == testcolumn.invalid_rows
+    assert valid == testcolumn.valid_rows
+    assert nulls == testcolumn.null_row_numbers
+    assert filled == testcolumn.filled_row_numbers
+    assert nulls | filled == valid
+    assert len(nulls) == testcolumn.nulls_total
+    assert len(filled) == testcolumn.not_nulls_total
+
+
+@pytest.mark.parametrize('descriptor, values, edits', [
+    (INTEGER_DESC, INTEGER_VALUES, [('5.6', 'NULL'), ('2.5', '4'), ('not_int', '3')]),
+    (NUMERICAL_DESC, NUMERICAL_VALUES, [('-0.12', '0.5'), ('21/12/2019', '7')]),
+    (DATE_DESC, DATE_VALUES, [('1/12/2019', 'NULL'), ('31', '31/12/2019')]),
+    (NOMINAL_DESC, NOMINAL_VALUES, [('not_value', 'Category1'), ('cAtegory1', 'NULL')]),
+])
+@pytest.mark.parametrize('applied', [True, False])
+def test_incremental_corrections(descriptor, values, edits, applied):
+    testfield = QcField(descriptor)
+    testcolumn = ColumnReport(values, testfield)
+    testcolumn.validate()
+    if applied:
+        testcolumn.apply_corrections()
+    for value, newvalue in edits:
+        testcolumn.update_correction(value, newvalue)
+    if not applied:
+        testcolumn.delete_correction(edits[0][0])
+        testcolumn.update_correction(*edits[0])
+    stats = testcolumn.stats
+    general = testcolumn.prettygeneral
+    null_rows = testcolumn.null_row_numbers
+    filled_rows = testcolumn.filled_row_numbers
+    # the stats are calculated again from all the rows
+    testcolumn.apply_corrections()
+    if applied:
+        assert_same_stats(stats, testcolumn.stats)
+        assert null_rows == testcolumn.null_row_numbers
+        assert filled_rows == testcolumn.filled_row_numbers
+        assert general == testcolumn.prettygeneral
+    # the correction attempts are counted per row of the corrected values
+    corrections = testcolumn.dcorrections | testcolumn.ccorrections
+    nulls = testcolumn.dnulls | testcolumn.cnulls
+    general = testcolumn.prettygeneral
+    assert (general['Number of successful correction attempts of constraint violations'] +
+            general['Number of successful correction attempts of datatype violations'] ==
+            sum(values.count(value) for value, _ in corrections))
+    assert (general['Total number of violations replaced by null'] ==
+            sum(values.count(value) for value in nulls))
+
+
+@pytest.mark.parametrize('descriptor, values, value, newvalue', [
+    (INTEGER_DESC, INTEGER_VALUES, '2.5', '4'),
+    (NUMERICAL_DESC, NUMERICAL_VALUES, '21/12/2019', '7'),
+    (dict(NUMERICAL_DESC, constraints={}, outlierMethod='iqr'),
+     ['-20', '300', '1', '2', 'x', '2.5', '3'], 'x', '2'),
+    (DATE_DESC, DATE_VALUES, '31', '31/12/2019'),
+    (NOMINAL_DESC, NOMINAL_VALUES, 'not_value', 'Category1'),
+])
+def test_corrected_edit_rows(monkeypatch, descriptor, values, value, newvalue):
+    """An edit of an applied correction patches the rows of the value,
+    the rows of the column are not scanned and the typed values are
+    not expanded again.
+    """
+    values = values * 100
+    testcolumn = ColumnReport(values, QcField(descriptor))
+    testcolumn.validate()
+    testcolumn.apply_corrections()
+    scanned = []
+    expanded = []
+    flatnonzero = np.flatnonzero
+    from_levels = TypedColumn.from_levels
+
+    def recorded_flatnonzero(array):
+        scanned.append(len(array))
+        return flatnonzero(array)
+
+    def recorded_from_levels(*args):
+        expanded.append(args)
+        return from_levels(*args)
+
+    monkeypatch.setattr(np, 'flatnonzero', recorded_flatnonzero)
+    monkeypatch.setattr(TypedColumn, 'from_levels', recorded_from_levels)
+    testcolumn.update_correction(value, newvalue)
+    monkeypatch.undo()
+    assert all(size <= len(set(values)) for size in scanned)
+    assert expanded == []
+    expected = ColumnReport(values, QcField(descriptor))
+    expected.validate()
+    expected.update_correction(value, newvalue)
+    expected.apply_corrections()
+    with pytest.warns(None) as recorded:
+        assert_same_stats(testcolumn.stats, expected.stats)
+        assert testcolumn.outlier_rows.tolist() == expected.outlier_rows.tolist()
+        assert testcolumn.not_nulls_total == expected.not_nulls_total
+        assert testcolumn.nulls_total == expected.nulls_total
+        typed, expected_typed = testcolumn.typed_values, expected.typed_values
+        filled = ~expected_typed.nulls
+        assert typed.nulls.tolist() == expected_typed.nulls.tolist()
+        assert typed.values.dtype == expected_typed.values.dtype
+        assert typed.values[filled].tolist() == expected_typed.values[filled].tolist()
+        assert recorded.list == []
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (NUMERICAL_DESC, NUMERICAL_VALUES),
+    (NUMERICAL_DESC, ['1.5', '0', '2.25', '7', '1e1', ' 3 ', '11', '']),
+    (dict(NUMERICAL_DESC, decimalChar=',', bareNumber=False, suffix='cm'),
+     ['1,5cm', '2,25 cm', '3', 'x', '', '4,5cm']),
+])
+def test_float_numbers(descriptor, values):
+    testfield = QcField(descriptor, missing_values=MISSING_VALUES)
+    decimalcolumn = ColumnReport(values, testfield)
+    decimalcolumn.validate()
+    floatcolumn = ColumnReport(values, testfield, float_numbers=True)
+    floatcolumn.validate()
+    assert floatcolumn.typed_values.values.dtype == np.float64
+    assert floatcolumn.filled_row_numbers == decimalcolumn.filled_row_numbers
+    assert floatcolumn.null_row_numbers == decimalcolumn.null_row_numbers
+    for key, value in decimalcolumn.stats.items():
+        if key == 'outliersrows':
+            assert [row for row, _ in floatcolumn.stats[key]] == [row for row, _ in value]
+        else:
+            assert floatcolumn.stats[key] == pytest.approx(value)
+    decimalcolumn.apply_corrections()
+    floatcolumn.apply_corrections()
+    assert floatcolumn.stats.keys() == decimalcolumn.stats.keys()
+    assert floatcolumn.not_nulls_total == decimalcolumn.not_nulls_total
+
+
 @pytest.mark.parametrize('descriptor, values, resnulls, rescorr', [
     (INTEGER_DESC, INTEGER_VALUES,
      set(['2.5', 'not_int']), set([('5.6', '5')])),
@@ -322,3 +590,24 @@ def test_cnulls(descriptor, values, resnulls, rescorr, path):
         assert testcolumn.cnulls == resnulls
         assert testcolumn.ccorrections == rescorr
         assert recorded.list == []
+
+
+@pytest.mark.parametrize('method, threshold, rows', [
+    (None, None, [2]),
+    ('zscore', 1, [2]),
+    ('iqr', 1.5, [1, 2]),
+    ('mad', 10, [1, 2]),
+])
+def test_outlier_rows(method, threshold, rows):
+    descriptor = dict(NUMERICAL_DESC, constraints={})
+    if method:
+        descriptor['outlierMethod'] = method
+    if threshold:
+        descriptor['outlierThreshold'] = threshold
+    values = ['-20', '300', '1', '2', '', '2.5', '3', '2', '1.5', '2', '2.5', '3', '1']
+    testcolumn = ColumnReport(values, QcField(descriptor), threshold=2)
+    testcolumn.validate()
+    assert testcolumn.outlier_rows.tolist() == rows
+    assert [row for row, _ in testcolumn.stats['outliersrows']] == rows
+    assert testcolumn.stats['outliermethod'] == '{} (threshold {})'.format(method or 'zscore',
+                                                                          threshold or 2)
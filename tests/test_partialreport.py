@@ -0,0 +1,126 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import pytest
+import functools
+from unittest.mock import patch
+from mipqctool import config
+from mipqctool.controller.columnreport import ColumnReport
+from mipqctool.controller.partialreport import PartialColumnReport
+from mipqctool.model.qcfrictionless import QcField
+from mipqctool.model.qctypes import IntegerSummary
+
+from .test_columnreport import DATE_DESC, NOMINAL_DESC, NUMERICAL_DESC, INTEGER_DESC
+from .test_columnreport import DATE_VALUES, NOMINAL_VALUES, NUMERICAL_VALUES, INTEGER_VALUES
+
+TEXT_DESC = {'name': 'testvar',
+             'format': 'default',
+             'type': 'string',
+             'MIPType': 'text',
+             'constraints': {
+                 'maxLength': 5
+                 }
+             }
+TEXT_VALUES = ['a', 'bb', 'a', '', 'too_long', 'ccc', 'bb', 'a', 'dd', 'e', 'f', 'too_long']
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (INTEGER_DESC, INTEGER_VALUES),
+    (NUMERICAL_DESC, NUMERICAL_VALUES),
+    (DATE_DESC, DATE_VALUES),
+    (NOMINAL_DESC, NOMINAL_VALUES),
+    (TEXT_DESC, TEXT_VALUES)
+])
+@pytest.mark.parametrize('chunk_rows', [1, 3, 100])
+def test_merge(descriptor, values, chunk_rows):
+    columnreport = ColumnReport(values, QcField(descriptor))
+    columnreport.validate()
+    partial = PartialColumnReport(QcField(descriptor))
+    for start in range(0, len(values), chunk_rows):
+        chunk = PartialColumnReport(QcField(descriptor))
+        chunk.update(values[start:start + chunk_rows], start_row=start + 1)
+        partial.merge(chunk)
+    partial.finalize()
+    for start in range(0, len(values), chunk_rows):
+        partial.update_outliers(values[start:start + chunk_rows], start_row=start + 1)
+    assert partial.total_rows == columnreport.total_rows
+    assert partial.invalid_rows == columnreport.invalid_rows
+    assert partial.prettygeneral == columnreport.prettygeneral
+    assert partial.dcorrections == columnreport.dcorrections
+    assert partial.cnulls == columnreport.cnulls
+    assert partial.stats == pytest.approx(columnreport.stats)
+    for value, _ in columnreport.dcorrections | columnreport.ccorrections:
+        rows = set(row for row, row_value in enumerate(values, 1) if row_value == value)
+        assert set(partial.example_rows(value)) <= rows
+        assert len(partial.example_rows(value)) == min(len(rows), 5)
+        assert columnreport.example_rows(value) == sorted(rows)[:5]
+
+
+@pytest.mark.parametrize('descriptor, values, value, newvalue', [
+    (INTEGER_DESC, INTEGER_VALUES, '2.5', '4'),
+    (NOMINAL_DESC, NOMINAL_VALUES, 'not_value', 'NULL'),
+])
+def test_corrections(descriptor, values, value, newvalue):
+    partial = PartialColumnReport(QcField(descriptor))
+    partial.update(values)
+    partial.finalize()
+    partial.update_correction(value, newvalue)
+    corrected = PartialColumnReport(QcField(descriptor), corrections=partial.corrections)
+    corrected.update(values)
+    corrected.finalize()
+    assert corrected.corrected
+    assert corrected.all_corrections == partial.all_corrections
+    assert corrected.not_nulls_total + corrected.nulls_total == len(values)
+
+
+@pytest.mark.parametrize('method', ['zscore', 'iqr', 'mad'])
+@pytest.mark.parametrize('chunk_rows', [1, 4, 100])
+def test_outliers(method, chunk_rows):
+    descriptor = dict(NUMERICAL_DESC, constraints={}, outlierMethod=method, outlierThreshold=1.5)
+    values = ['-20', '300', '1', '2', '', '2.5', '3', '2', '1.5', 'x', '2', '2.5', '3', '1']
+    columnreport = ColumnReport(values, QcField(descriptor))
+    columnreport.validate()
+    partial = PartialColumnReport(QcField(descriptor))
+    for start in range(0, len(values), chunk_rows):
+        chunk = PartialColumnReport(QcField(descriptor))
+        chunk.update(values[start:start + chunk_rows], start_row=start + 1)
+        partial.merge(chunk)
+    partial.finalize()
+    for start in range(0, len(values), chunk_rows):
+        partial.update_outliers(values[start:start + chunk_rows], start_row=start + 1)
+    assert partial.stats == pytest.approx(columnreport.stats)
+    assert partial.outlier_rows.tolist() == columnreport.outlier_rows.tolist()
+
+
+@pytest.mark.parametrize('descriptor, values', [
+    (dict(INTEGER_DESC, constraints={}),
+     [str(value) for value in range(3000)] + ['7'] * 50),
+    (dict(DATE_DESC, constraints={}),
+     ['{}/{}/{}'.format(day % 28 + 1, day % 12 + 1, 1950 + day % 60) for day in range(3000)] +
+     ['15/06/1990'] * 50),
+])
+def test_sketched_values(descriptor, values):
+    """Above the exact values the integers and the dates are summarized
+    with the quantile sketch and the Space-Saving mode."""
+    columnreport = ColumnReport(values, QcField(descriptor))
+    columnreport.validate()
+    summary = functools.partial(IntegerSummary, exact_values=100)
+    with patch('mipqctool.controller.partialreport.IntegerSummary', summary):
+        report = PartialColumnReport(QcField(descriptor))
+        for start in range(0, len(values), 500):
+            chunk = PartialColumnReport(QcField(descriptor))
+            chunk.update(values[start:start + 500], start_row=start + 1)
+            report.merge(chunk)
+    report.finalize()
+    stats = report.stats
+    exact = columnreport.stats
+    for key in ['mode', 'min', 'max']:
+        assert stats[key] == exact[key]
+    # the rows of the mode are overestimated by at most the rows / capacity
+    assert exact['freq'] <= stats['freq'] <= exact['freq'] + len(values) / config.TEXT_TOP_VALUES
+    for key in ['q1', 'median', 'q3']:
+        assert abs(stats[key] - exact[key]) <= (exact['max'] - exact['min']) * 0.01
+    if 'years' in exact:
+        assert stats['years'] == exact['years']
@@ -6,7 +6,8 @@ from __future__ import unicode_literals
 import pytest
 import os
 import json
-from mipqctool.controller.tablereport import TableReport
+from mipqctool import config
+from mipqctool.controller.tablereport import TableReport, _LongitudinalDuplicates
 from mipqctool.model.qcfrictionless import QcTable
 from mipqctool.model.qcfrictionless import QcSchema
 
@@ -141,3 +142,124 @@ def test_corrected_filled_rows_stats(datasetpath, schemapath, id_column, result)
     with pytest.warns(None) as recorded:
         assert testreport.filled_rows_stats == result
         assert recorded.list == []
+
+
+@pytest.mark.parametrize('datasetpath, schemapath', [
+    (DATASET1_PATH, METADATA1_PATH),
+    (os.path.join(APP_PATH, 'test_datasets/test_dataset3.csv'),
+     os.path.join(APP_PATH, 'test_datasets/test_dataset3.json'))
+])
+@pytest.mark.parametrize('chunk_rows', [1, 7, 1000])
+def test_chunked_report(datasetpath, schemapath, chunk_rows, tmp_path):
+    with open(schemapath) as json_file:
+        dict_schema = json.load(json_file)
+    testreport = TableReport.from_disc(datasetpath, dict_schema)
+    chunkedreport = TableReport.from_disc(datasetpath, dict_schema, chunk_rows=chunk_rows)
+    assert chunkedreport.total_rows == testreport.total_rows
+    assert chunkedreport.filled_rows_stats == testreport.filled_rows_stats
+    assert chunkedreport.valid_rows_stats == testreport.valid_rows_stats
+    assert chunkedreport.isvalid == testreport.isvalid
+    for name, columnreport in testreport.columnreports.items():
+        partial = chunkedreport.columnreports[name]
+        assert partial.prettygeneral == columnreport.prettygeneral
+        assert sorted(partial.all_corrections) == sorted(columnreport.all_corrections)
+        assert partial.stats == pytest.approx(columnreport.stats)
+    testreport.apply_corrections()
+    chunkedreport.apply_corrections()
+    assert chunkedreport.filled_rows_stats == testreport.filled_rows_stats
+    testreport.save_corrected(str(tmp_path / 'corrected.csv'))
+    chunkedreport.save_corrected(str(tmp_path / 'chunked.csv'))
+    assert (tmp_path / 'chunked.csv').read_text() == (tmp_path / 'corrected.csv').read_text()
+
+
+@pytest.mark.parametrize('datasetpath, schemapath', [
+    (DATASET1_PATH, METADATA1_PATH),
+    (os.path.join(APP_PATH, 'test_datasets/test_dataset3.csv'),
+     os.path.join(APP_PATH, 'test_datasets/test_dataset3.json'))
+])
+def test_parallel_report(datasetpath, schemapath, tmp_path):
+    with open(schemapath) as json_file:
+        dict_schema = json.load(json_file)
+    testreport = TableReport.from_disc(datasetpath, dict_schema)
+    parallelreport = TableReport.from_disc(datasetpath, dict_schema, jobs=2)
+    assert list(parallelreport.columnreports) == list(testreport.columnreports)
+    assert parallelreport.filled_rows_stats == testreport.filled_rows_stats
+    assert parallelreport.valid_rows_stats == testreport.valid_rows_stats
+    for name, columnreport in testreport.columnreports.items():
+        parallel = parallelreport.columnreports[name]
+        assert parallel.prettygeneral == columnreport.prettygeneral
+        assert parallel.all_corrections == columnreport.all_corrections
+        assert parallel.stats == columnreport.stats
+    testreport.apply_corrections()
+    parallelreport.apply_corrections()
+    testreport.save_corrected(str(tmp_path / 'corrected.csv'))
+    parallelreport.save_corrected(str(tmp_path / 'parallel.csv'))
+    assert (tmp_path / 'parallel.csv').read_text() == (tmp_path / 'corrected.csv').read_text()
+
+
+def test_parallel_plain_column(tmp_path):
+    """A high cardinality column is validated as plain values."""
+    path = str(tmp_path / 'ids.csv')
+    rows = 3 * config.ENCODE_PLAIN_MIN_ROWS
+    with open(path, 'w') as csv_file:
+        csv_file.write('id,group\n')
+        for row in range(rows):
+            # a repeated invalid id every 1000 rows
+            csv_file.write('{},{}\n'.format('x' if row % 1000 == 0 else row, row % 3))
+    dict_schema = {'fields': [
+        {'name': 'id', 'type': 'integer', 'format': 'default', 'MIPType': 'integer'},
+        {'name': 'group', 'type': 'integer', 'format': 'default', 'MIPType': 'integer'},
+    ]}
+    testreport = TableReport.from_disc(path, dict_schema)
+    parallelreport = TableReport.from_disc(path, dict_schema, jobs=2)
+    for report in [testreport, parallelreport]:
+        idreport = report.columnreports['id']
+        assert idreport.example_rows('x') == [1 + 1000 * index for index
+                                              in range(config.VIOLATION_SAMPLE_ROWS)]
+        idreport.update_correction('x', '0')
+        assert idreport.dcorrections == {('x', '0')}
+        report.apply_corrections()
+    assert parallelreport.columnreports['id'].stats == testreport.columnreports['id'].stats
+    assert parallelreport.columnreports['id'].corrected_values.count('0') == rows // 1000
+
+
+@pytest.mark.parametrize('datasetpath, schemapath, chunk_rows', [
+    (DATASET1_PATH, METADATA1_PATH, None),
+    (DATASET1_PATH, METADATA1_PATH, 7),
+    (os.path.join(APP_PATH, 'test_datasets/test_dataset3.csv'),
+     os.path.join(APP_PATH, 'test_datasets/test_dataset3.json'), None)
+])
+def test_columns_distribution(datasetpath, schemapath, chunk_rows):
+    with open(schemapath) as json_file:
+        dict_schema = json.load(json_file)
+    testreport = TableReport.from_disc(datasetpath, dict_schema, chunk_rows=chunk_rows)
+    total_columns = testreport.total_columns
+    for columns, distribution, stats in [
+            ('filled', testreport.filled_columns_distribution, testreport.filled_rows_stats),
+            ('valid', testreport.valid_columns_distribution, testreport.valid_rows_stats)]:
+        assert list(distribution) == list(range(total_columns + 1))
+        assert sum(distribution.values()) == testreport.total_rows
+        assert stats[columns + '_100'] == distribution[total_columns]
+        assert sum(stats.values()) == testreport.total_rows
+
+
+@pytest.mark.parametrize('max_keys', [1, 3, 1000])
+@pytest.mark.parametrize('chunk_rows', [1, 4, 100])
+def test_longitudinal_duplicates(max_keys, chunk_rows):
+    subjects = ['s{}'.format(row % 7) for row in range(50)]
+    visits = ['v{}'.format(row % 5) for row in range(50)]
+    expected = set()
+    first_rows = {}
+    for row, key in enumerate(zip(subjects, visits), start=1):
+        first_row = first_rows.setdefault(key, row)
+        if first_row != row:
+            expected.update([first_row, row])
+    duplicates = _LongitudinalDuplicates(['id', 'subject', 'visit'], ['subject', 'visit'],
+                                         max_keys=max_keys)
+    for start in range(0, 50, chunk_rows):
+        columns = [[], subjects[start:start + chunk_rows], visits[start:start + chunk_rows]]
+        duplicates.update(columns, start + 1)
+    # the memory holds at most max_keys pairs, plus the pairs of a block
+    assert duplicates.spilled == (max_keys < 35)
+    assert duplicates.rows == sorted(expected)
+    duplicates.close()